@@ -1,14 +1,13 @@
-import asyncio
-
 from nonebot import logger, require
 from nonebot.plugin import PluginMetadata, inherit_supported_adapters
 
 require("nonebot_plugin_alconna")
 require("nonebot_plugin_uninfo")
 
-from .utils import safe_unlink
 from .config import Config, pconfig
-from .matchers import clear_result_cache
+from .download import DOWNLOADER
+from .matchers import prune_result_cache, prune_result_store
+from .renders.cache import CARD_CACHE
 
 __plugin_meta__ = PluginMetadata(
     name="链接分享解析 Alconna 版",
@@ -29,21 +28,23 @@ require("nonebot_plugin_apscheduler")
 from nonebot_plugin_apscheduler import scheduler
 
 
-@scheduler.scheduled_job("cron", hour=1, minute=0, id="parser-clean-local-cache")
+@scheduler.scheduled_job(
+    "interval",
+    seconds=pconfig.cache_evict_interval,
+    id="parser-clean-local-cache",
+    max_instances=1,
+    coalesce=True,
+)
 async def clean_plugin_cache():
-    try:
-        files = [f for f in pconfig.cache_dir.iterdir() if f.is_file()]
-        if not files:
-            logger.info("No cache files to clean")
-            return
-
-        # 并发删除文件
-        tasks = [safe_unlink(file) for file in files]
-        await asyncio.gather(*tasks)
-
-        logger.success(f"Successfully cleaned {len(files)} cache files")
-    except Exception:
-        logger.exception("Error while cleaning cache files")
-
-    # 资源清理完毕后，清理 result 缓存
-    clear_result_cache()
+    """按预算淘汰最久未使用的缓存文件, 并回收失效的 blob 和解析结果"""
+    freed = await DOWNLOADER.evictor.evict()
+    if freed:
+        logger.success(f"Successfully evicted {freed / 1024 / 1024:.2f} MB cache files")
+    # 渲染卡片使用独立的预算
+    await CARD_CACHE.evict()
+
+    # 回收不再被引用的 blob
+    await DOWNLOADER.store.collect()
+    # 清理媒体文件已被淘汰的解析结果
+    prune_result_cache()
+    await prune_result_store()
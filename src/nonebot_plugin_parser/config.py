@@ -6,7 +6,7 @@ from apilmoji import ELK_SH_CDN, EmojiStyle
 from pydantic import BaseModel
 from bilibili_api.video import VideoCodecs, VideoQuality
 
-from .constants import RenderType, PlatformEnum
+from .constants import CardFormat, RenderType, DeliveryMode, PlatformEnum
 
 require("nonebot_plugin_localstore")
 import nonebot_plugin_localstore as _store
@@ -33,6 +33,8 @@ class Config(BaseModel):
     """是否需要上传音频文件"""
     parser_use_base64: bool = False
     """是否使用 base64 编码发送图片，音频，视频"""
+    parser_base64_max_size: int = 32
+    """使用 base64 发送的媒体最大大小, 超过时使用文件路径发送 单位: MB"""
     parser_card_only: bool = False
     """是否仅发送卡片（仅对图片渲染器生效）"""
     parser_only_send_card: bool = False
@@ -61,10 +63,60 @@ class Config(BaseModel):
     """自定义字体"""
     parser_need_forward_contents: bool = True
     """是否需要转发媒体内容"""
+    parser_delivery_mode: DeliveryMode = DeliveryMode.ordered
+    """媒体内容发送顺序"""
+    parser_forward_quorum: int = 4
+    """按完成顺序发送时, 攒够该数量的图片即合并发送"""
+    parser_forward_deadline: float = 10
+    """按完成顺序发送时, 首张图片下载完成后最多等待的时间 单位: 秒"""
     parser_emoji_cdn: str = ELK_SH_CDN
     """Pilmoji 表情 CDN"""
     parser_emoji_style: EmojiStyle = EmojiStyle.FACEBOOK
     """Pilmoji 表情样式"""
+    parser_emoji_bundle: str | None = None
+    """离线 emoji 图片目录(位于插件数据目录下), 文件名为 {emoji}.png"""
+    parser_result_cache_ttl: int = 3 * 24 * 60 * 60
+    """解析结果持久化缓存有效期 单位: 秒"""
+    parser_result_cache_platform_ttl: dict[PlatformEnum, int] = {}
+    """各平台解析结果缓存有效期 单位: 秒, 未配置的平台使用 parser_result_cache_ttl"""
+    parser_result_cache_max_entries: int = 1000
+    """解析结果持久化缓存最大条目数"""
+    parser_result_cache_max_size: int = 2048
+    """解析结果持久化缓存最大大小(含引用的媒体文件) 单位: MB"""
+    parser_cache_max_size: int = 4096
+    """媒体缓存目录大小预算 单位: MB"""
+    parser_cache_min_age: int = 10 * 60
+    """媒体缓存最短保留时间 单位: 秒"""
+    parser_cache_evict_interval: int = 5 * 60
+    """媒体缓存淘汰间隔 单位: 秒"""
+    parser_download_segments: int = 4
+    """分段下载的分段数, 为 1 时禁用分段下载"""
+    parser_download_segment_threshold: int = 16
+    """启用分段下载的最小文件大小 单位: MB"""
+    parser_download_retries: int = 2
+    """下载中断后的重试次数, 支持续传时从断点继续"""
+    parser_download_concurrency: int = 16
+    """同时进行的最大下载数"""
+    parser_download_host_concurrency: int = 4
+    """同一域名同时进行的最大下载数"""
+    parser_stream_mux: bool = True
+    """音视频分离的视频边下载边通过管道合并, 关闭或失败时下载完成后再合并"""
+    parser_render_avatar_timeout: float = 5
+    """渲染卡片时等待头像下载的最长时间 单位: 秒, 超时使用占位符"""
+    parser_render_media_timeout: float = 60
+    """渲染卡片时等待封面及图片下载的最长时间 单位: 秒, 超时不绘制"""
+    parser_render_workers: int = 4
+    """渲染线程数, 图片解码, 缩放, 编码在渲染线程中执行"""
+    parser_card_format: CardFormat = CardFormat.auto
+    """卡片图片格式"""
+    parser_card_quality: int = 90
+    """卡片图片 jpeg/webp 质量 1-100"""
+    parser_card_compress_level: int = 6
+    """卡片图片 png 压缩等级 0-9, 越小编码越快, 文件越大"""
+    parser_thumbnail_cache_size: int = 256
+    """内存中缓存的头像, 封面, 网格图等处理结果数量"""
+    parser_card_cache_max_size: int = 256
+    """渲染卡片缓存目录大小预算 单位: MB"""
 
     @property
     def nickname(self) -> str:
@@ -146,6 +198,11 @@ class Config(BaseModel):
         """是否使用 base64 编码发送图片，音频，视频"""
         return self.parser_use_base64
 
+    @property
+    def base64_max_size(self) -> int:
+        """使用 base64 发送的媒体最大大小 单位: MB"""
+        return self.parser_base64_max_size
+
     @property
     def card_only(self) -> bool:
         """是否仅发送卡片（仅对图片渲染器生效）"""
@@ -171,6 +228,21 @@ class Config(BaseModel):
         """是否需要转发媒体内容"""
         return self.parser_need_forward_contents
 
+    @property
+    def delivery_mode(self) -> DeliveryMode:
+        """媒体内容发送顺序"""
+        return self.parser_delivery_mode
+
+    @property
+    def forward_quorum(self) -> int:
+        """按完成顺序发送时, 合并发送的图片数量"""
+        return self.parser_forward_quorum
+
+    @property
+    def forward_deadline(self) -> float:
+        """按完成顺序发送时, 图片合并发送的最长等待时间 单位: 秒"""
+        return self.parser_forward_deadline
+
     @property
     def emoji_cdn(self) -> str:
         """Pilmoji 表情 CDN"""
@@ -181,6 +253,113 @@ class Config(BaseModel):
         """Pilmoji 表情样式"""
         return self.parser_emoji_style
 
+    @property
+    def emoji_bundle(self) -> Path | None:
+        """离线 emoji 图片目录"""
+        return (self.data_dir / self.parser_emoji_bundle) if self.parser_emoji_bundle else None
+
+    def result_cache_ttl(self, platform: str) -> int:
+        """解析结果持久化缓存有效期"""
+        for _platform, ttl in self.parser_result_cache_platform_ttl.items():
+            if _platform == platform:
+                return ttl
+        return self.parser_result_cache_ttl
+
+    @property
+    def result_cache_max_entries(self) -> int:
+        """解析结果持久化缓存最大条目数"""
+        return self.parser_result_cache_max_entries
+
+    @property
+    def result_cache_max_size(self) -> int:
+        """解析结果持久化缓存最大大小 单位: MB"""
+        return self.parser_result_cache_max_size
+
+    @property
+    def cache_max_size(self) -> int:
+        """媒体缓存目录大小预算 单位: MB"""
+        return self.parser_cache_max_size
+
+    @property
+    def cache_min_age(self) -> int:
+        """媒体缓存最短保留时间 单位: 秒"""
+        return self.parser_cache_min_age
+
+    @property
+    def cache_evict_interval(self) -> int:
+        """媒体缓存淘汰间隔 单位: 秒"""
+        return self.parser_cache_evict_interval
+
+    @property
+    def download_segments(self) -> int:
+        """分段下载的分段数"""
+        return self.parser_download_segments
+
+    @property
+    def download_segment_threshold(self) -> int:
+        """启用分段下载的最小文件大小 单位: MB"""
+        return self.parser_download_segment_threshold
+
+    @property
+    def download_retries(self) -> int:
+        """下载中断后的重试次数"""
+        return self.parser_download_retries
+
+    @property
+    def download_concurrency(self) -> int:
+        """同时进行的最大下载数"""
+        return self.parser_download_concurrency
+
+    @property
+    def download_host_concurrency(self) -> int:
+        """同一域名同时进行的最大下载数"""
+        return self.parser_download_host_concurrency
+
+    @property
+    def stream_mux(self) -> bool:
+        """音视频分离的视频边下载边合并"""
+        return self.parser_stream_mux
+
+    @property
+    def render_avatar_timeout(self) -> float:
+        """渲染卡片时等待头像下载的最长时间 单位: 秒"""
+        return self.parser_render_avatar_timeout
+
+    @property
+    def render_media_timeout(self) -> float:
+        """渲染卡片时等待封面及图片下载的最长时间 单位: 秒"""
+        return self.parser_render_media_timeout
+
+    @property
+    def render_workers(self) -> int:
+        """渲染线程数"""
+        return self.parser_render_workers
+
+    @property
+    def card_format(self) -> CardFormat:
+        """卡片图片格式"""
+        return self.parser_card_format
+
+    @property
+    def card_quality(self) -> int:
+        """卡片图片 jpeg/webp 质量"""
+        return self.parser_card_quality
+
+    @property
+    def card_compress_level(self) -> int:
+        """卡片图片 png 压缩等级"""
+        return self.parser_card_compress_level
+
+    @property
+    def thumbnail_cache_size(self) -> int:
+        """内存中缓存的图片处理结果数量"""
+        return self.parser_thumbnail_cache_size
+
+    @property
+    def card_cache_max_size(self) -> int:
+        """渲染卡片缓存目录大小预算 单位: MB"""
+        return self.parser_card_cache_max_size
+
 
 pconfig: Config = get_plugin_config(Config)
 """插件配置"""
@@ -1,7 +1,7 @@
 from enum import Enum
 from typing import Final
 
-from httpx import Timeout
+from httpx import Limits, Timeout
 
 COMMON_HEADER: Final[dict[str, str]] = {
     "User-Agent": (
@@ -28,6 +28,8 @@ COMMON_TIMEOUT: Final[Timeout] = Timeout(connect=15.0, read=20.0, write=10.0, po
 
 DOWNLOAD_TIMEOUT: Final[Timeout] = Timeout(connect=15.0, read=240.0, write=10.0, pool=10.0)
 
+COMMON_LIMITS: Final[Limits] = Limits(max_connections=32, max_keepalive_connections=8, keepalive_expiry=30.0)
+
 
 class PlatformEnum(str, Enum):
     ACFUN = "acfun"
@@ -50,3 +52,20 @@ class RenderType(str, Enum):
     common = "common"
     htmlkit = "htmlkit"
     htmlrender = "htmlrender"
+
+
+class CardFormat(str, Enum):
+    auto = "auto"
+    """含图片的卡片使用 jpeg, 纯文本卡片使用 png8"""
+    png = "png"
+    png8 = "png8"
+    """调色板量化的 png"""
+    jpeg = "jpeg"
+    webp = "webp"
+
+
+class DeliveryMode(str, Enum):
+    ordered = "ordered"
+    """按内容顺序发送媒体"""
+    completion = "completion"
+    """按下载完成顺序发送媒体, 图片按数量或等待时间分批合并"""
@@ -1,18 +1,58 @@
+import os
 import asyncio
+from typing import Literal
+from asyncio import Task
 from pathlib import Path
 
 import aiofiles
-from httpx import HTTPError, HTTPStatusError, AsyncClient
+from httpx import Response, HTTPError, HTTPStatusError, AsyncClient
 from nonebot import logger
 from tqdm.asyncio import tqdm
 
-from .task import auto_task
-from ..utils import merge_av, safe_unlink, generate_file_name
+from .task import LazyTask, auto_task, orphaned
+from .evict import CacheEvictor
+from .store import MediaStore
+from .journal import DownloadJournal
+from .scheduler import Priority, DownloadScheduler
+from ..utils import fmt_size, merge_av, safe_unlink, merge_av_cmd, generate_file_name
 from ..config import pconfig
 from ..constants import COMMON_HEADER, DOWNLOAD_TIMEOUT
 from ..exception import DownloadException, ZeroSizeException, SizeLimitException
 
 
+def _preallocate(path: Path, size: int) -> None:
+    """预分配文件空间"""
+    with path.open("wb") as f:
+        if hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(f.fileno(), 0, size)
+                return
+            except OSError:
+                pass
+        f.truncate(size)
+
+
+MediaKind = Literal["video", "audio", "image"]
+
+
+class LazyMedia(LazyTask[Path]):
+    """延迟下载的媒体, 记录 url, 请求头及类型, 首次等待或预取时才开始下载"""
+
+    __slots__ = ("ext_headers", "kind", "url")
+
+    def __init__(
+        self,
+        downloader: "StreamDownloader",
+        kind: MediaKind,
+        url: str,
+        ext_headers: dict[str, str] | None = None,
+    ):
+        self.kind: MediaKind = kind
+        self.url = url
+        self.ext_headers = ext_headers
+        super().__init__(lambda: downloader.download(kind, url, ext_headers=ext_headers), name=f"{kind} | {url}")
+
+
 class StreamDownloader:
     """Downloader class for downloading files with stream"""
 
@@ -20,6 +60,17 @@ class StreamDownloader:
         self.headers: dict[str, str] = COMMON_HEADER.copy()
         self.cache_dir: Path = pconfig.cache_dir
         self.client: AsyncClient = AsyncClient(timeout=DOWNLOAD_TIMEOUT, verify=False)
+        self.store: MediaStore = MediaStore(self.cache_dir / "blobs")
+        self.evictor: CacheEvictor = CacheEvictor(
+            self.cache_dir,
+            max_size=pconfig.cache_max_size * 1024 * 1024,
+            min_age=pconfig.cache_min_age,
+            exclude_dirs=("blobs", "cards", "fonts"),
+        )
+        self.scheduler: DownloadScheduler = DownloadScheduler(
+            pconfig.download_concurrency,
+            pconfig.download_host_concurrency,
+        )
 
     @auto_task
     async def streamd(
@@ -28,6 +79,7 @@ class StreamDownloader:
         *,
         file_name: str | None = None,
         ext_headers: dict[str, str] | None = None,
+        priority: Priority = Priority.MEDIA,
     ) -> Path:
         """download file by url with stream
 
@@ -35,6 +87,7 @@ class StreamDownloader:
             url (str): url address
             file_name (str | None): file name. Defaults to generate_file_name.
             ext_headers (dict[str, str] | None): ext headers. Defaults to None.
+            priority (Priority): download priority. Defaults to Priority.MEDIA.
 
         Returns:
             Path: file path
@@ -48,68 +101,276 @@ class StreamDownloader:
         file_path = self.cache_dir / file_name
         # 如果文件存在，则直接返回
         if file_path.exists():
+            self.evictor.touch(file_path)
+            return file_path
+        # 相同 url 已下载过, 直接链接到已有内容
+        if await self.store.link_url(url, file_path):
+            self.evictor.touch(file_path)
             return file_path
 
+        part_path = file_path.with_name(f"{file_name}.part")
         headers = {**self.headers, **(ext_headers or {})}
 
+        with self.evictor.pin(part_path, DownloadJournal.path_of(part_path)):
+            async with self.scheduler.slot(url, priority):
+                retries = pconfig.download_retries
+                for attempt in range(retries + 1):
+                    try:
+                        await self._download(url, headers, part_path, file_name)
+                        break
+                    except HTTPStatusError as e:
+                        await self._discard_partial(part_path)
+                        # Some hosts (e.g. img.nga.178.com) deny httpx's TLS fingerprint and return non-standard
+                        # status codes like 567 (AccessDeny), while curl/curl_cffi can still fetch the resource.
+                        status = e.response.status_code if e.response is not None else None
+                        if status in {403, 567} and url.startswith("https://img.nga.178.com/"):
+                            return await self._curl_fallback(url, headers, part_path, file_path)
+                        logger.exception(f"下载失败 | url: {url}, file_path: {file_path}")
+                        raise DownloadException("媒体下载失败")
+                    except HTTPError:
+                        if attempt < retries:
+                            logger.warning(f"下载中断, 重试 ({attempt + 1}/{retries}) | url: {url}")
+                            continue
+                        # 有续传日志时保留 .part 文件, 下次请求从断点继续
+                        if DownloadJournal.load(part_path, url) is None:
+                            await safe_unlink(part_path)
+                        logger.exception(f"下载失败 | url: {url}, file_path: {file_path}")
+                        raise DownloadException("媒体下载失败")
+                    except asyncio.CancelledError:
+                        # 所有者已释放, 不会再有请求续传
+                        if orphaned():
+                            await self._discard_partial(part_path)
+                        raise
+
+                await safe_unlink(DownloadJournal.path_of(part_path))
+                return await self.store.adopt(part_path, file_path, url)
+
+    async def _download(self, url: str, headers: dict[str, str], part_path: Path, desc: str) -> None:
+        """下载到 .part 文件, 存在匹配的续传日志时从断点继续"""
+        if (journal := DownloadJournal.load(part_path, url)) is not None:
+            if await self._resume(url, headers, part_path, desc, journal):
+                return
+            logger.debug(f"媒体 url: {url} 已变更或不支持续传, 重新下载")
+            await self._discard_partial(part_path)
+
+        async with self.client.stream("GET", url, headers=headers, follow_redirects=True) as response:
+            response.raise_for_status()
+            content_length = self._check_size(url, response)
+            journal = DownloadJournal.from_response(url, response, content_length)
+            segmented = self._should_segment(response, content_length)
+            if not segmented:
+                await self._write_stream(response, part_path, desc, journal)
+            # 分段下载使用重定向后的地址
+            final_url = str(response.url)
+
+        if segmented and not await self._download_segments(final_url, headers, part_path, desc, journal):
+            # 服务端未按预期返回分段, 退化为单流下载
+            logger.debug(f"媒体 url: {url} 不支持分段下载, 使用单流下载")
+            journal.completed = []
+            async with self.client.stream("GET", final_url, headers=headers) as response:
+                response.raise_for_status()
+                await self._write_stream(response, part_path, desc, journal)
+
+    async def _resume(
+        self,
+        url: str,
+        headers: dict[str, str],
+        part_path: Path,
+        desc: str,
+        journal: DownloadJournal,
+    ) -> bool:
+        """校验资源未变更后续传未完成的字节范围
+
+        Returns:
+            bool: 是否续传成功, 为 False 时需重新下载
+        """
+        headers = {**headers, "If-Range": journal.validator or ""}
+        # 探测: 资源未变更时返回 206, 否则返回 200
         try:
-            async with self.client.stream("GET", url, headers=headers, follow_redirects=True) as response:
+            async with self.client.stream(
+                "GET", url, headers={**headers, "Range": "bytes=0-0"}, follow_redirects=True
+            ) as response:
                 response.raise_for_status()
-                content_length = response.headers.get("Content-Length")
-                content_length = int(content_length) if content_length else 0
-
-                if content_length == 0:
-                    logger.warning(f"媒体 url: {url}, 大小为 0, 取消下载")
-                    raise ZeroSizeException
-
-                if (file_size := content_length / 1024 / 1024) > pconfig.max_size:
-                    logger.warning(f"媒体 url: {url} 大小 {file_size:.2f} MB 超过 {pconfig.max_size} MB, 取消下载")
-                    raise SizeLimitException
-
-                with self.get_progress_bar(file_name, content_length) as bar:
-                    async with aiofiles.open(file_path, "wb") as file:
-                        async for chunk in response.aiter_bytes(1024 * 1024):
-                            await file.write(chunk)
-                            bar.update(len(chunk))
-
-        except HTTPStatusError as e:
-            # Some hosts (e.g. img.nga.178.com) deny httpx's TLS fingerprint and return non-standard
-            # status codes like 567 (AccessDeny), while curl/curl_cffi can still fetch the resource.
-            status = e.response.status_code if e.response is not None else None
-            if status in {403, 567} and url.startswith("https://img.nga.178.com/"):
-                try:
-                    from curl_cffi.requests import AsyncSession
-
-                    async with AsyncSession() as session:
-                        r = await session.get(
-                            url,
-                            headers=headers,
-                            impersonate="chrome120",
-                            allow_redirects=True,
-                        )
-                    if r.status_code >= 400:
-                        raise DownloadException(f"媒体下载失败 (curl_cffi status={r.status_code})")
-                    data = r.content
-                    if not data:
-                        raise ZeroSizeException
-                    if (file_size := len(data) / 1024 / 1024) > pconfig.max_size:
-                        raise SizeLimitException
-                    async with aiofiles.open(file_path, "wb") as file:
-                        await file.write(data)
-                    return file_path
-                except Exception:
-                    await safe_unlink(file_path)
-                    logger.exception(f"下载失败 | url: {url}, file_path: {file_path}")
-                    raise DownloadException("媒体下载失败")
-
-            await safe_unlink(file_path)
-            logger.exception(f"下载失败 | url: {url}, file_path: {file_path}")
-            raise DownloadException("媒体下载失败")
-        except HTTPError:
-            await safe_unlink(file_path)
+                if response.status_code != 206:
+                    return False
+                if response.headers.get("Content-Range") != f"bytes 0-0/{journal.size}":
+                    return False
+                final_url = str(response.url)
+        except HTTPStatusError:
+            return False
+
+        logger.info(f"断点续传 {desc}: 已完成 {journal.done / 1024 / 1024:.2f} MB")
+        return await self._download_ranges(final_url, headers, part_path, desc, journal, journal.missing())
+
+    async def _discard_partial(self, part_path: Path) -> None:
+        """删除 .part 文件及其续传日志"""
+        await asyncio.gather(safe_unlink(part_path), safe_unlink(DownloadJournal.path_of(part_path)))
+
+    async def _curl_fallback(self, url: str, headers: dict[str, str], part_path: Path, file_path: Path) -> Path:
+        """使用 curl_cffi 模拟浏览器指纹下载"""
+        try:
+            from curl_cffi.requests import AsyncSession
+
+            async with AsyncSession() as session:
+                r = await session.get(
+                    url,
+                    headers=headers,
+                    impersonate="chrome120",
+                    allow_redirects=True,
+                )
+            if r.status_code >= 400:
+                raise DownloadException(f"媒体下载失败 (curl_cffi status={r.status_code})")
+            data = r.content
+            if not data:
+                raise ZeroSizeException
+            if len(data) / 1024 / 1024 > pconfig.max_size:
+                raise SizeLimitException
+            async with aiofiles.open(part_path, "wb") as file:
+                await file.write(data)
+            return await self.store.adopt(part_path, file_path, url)
+        except Exception:
+            await safe_unlink(part_path)
             logger.exception(f"下载失败 | url: {url}, file_path: {file_path}")
             raise DownloadException("媒体下载失败")
-        return file_path
+
+    async def _write_stream(self, response: Response, part_path: Path, desc: str, journal: DownloadJournal) -> None:
+        """将响应流写入文件, 中断时记录已写入的字节"""
+        written = 0
+        try:
+            with self.get_progress_bar(desc, journal.size) as bar:
+                async with aiofiles.open(part_path, "wb") as file:
+                    async for chunk in response.aiter_bytes(1024 * 1024):
+                        await file.write(chunk)
+                        written += len(chunk)
+                        bar.update(len(chunk))
+        finally:
+            if written:
+                journal.mark(0, written - 1)
+            journal.save(part_path)
+
+    @staticmethod
+    def _check_size(url: str, response: Response) -> int:
+        """校验响应大小, 为 0 或超过 parser_max_size 时取消下载
+
+        Returns:
+            int: Content-Length
+        """
+        content_length = response.headers.get("Content-Length")
+        content_length = int(content_length) if content_length else 0
+
+        if content_length == 0:
+            logger.warning(f"媒体 url: {url}, 大小为 0, 取消下载")
+            raise ZeroSizeException
+
+        if (file_size := content_length / 1024 / 1024) > pconfig.max_size:
+            logger.warning(f"媒体 url: {url} 大小 {file_size:.2f} MB 超过 {pconfig.max_size} MB, 取消下载")
+            raise SizeLimitException
+        return content_length
+
+    @staticmethod
+    def _should_segment(response: Response, content_length: int) -> bool:
+        """是否使用分段下载"""
+        return (
+            pconfig.download_segments > 1
+            and content_length >= pconfig.download_segment_threshold * 1024 * 1024
+            and response.headers.get("Accept-Ranges", "").lower() == "bytes"
+        )
+
+    async def _download_segments(
+        self,
+        url: str,
+        headers: dict[str, str],
+        part_path: Path,
+        desc: str,
+        journal: DownloadJournal,
+    ) -> bool:
+        """将文件按字节范围分段并发下载, 写入预分配文件的对应偏移
+
+        Returns:
+            bool: 服务端是否按分段返回, 为 False 时需退化为单流下载
+        """
+        total = journal.size
+        await asyncio.to_thread(_preallocate, part_path, total)
+        journal.save(part_path)
+
+        if journal.validator is not None:
+            headers = {**headers, "If-Range": journal.validator}
+        segment_size = -(-total // pconfig.download_segments)
+        ranges = [(start, min(start + segment_size, total) - 1) for start in range(0, total, segment_size)]
+        return await self._download_ranges(url, headers, part_path, desc, journal, ranges)
+
+    async def _download_ranges(
+        self,
+        url: str,
+        headers: dict[str, str],
+        part_path: Path,
+        desc: str,
+        journal: DownloadJournal,
+        ranges: list[tuple[int, int]],
+    ) -> bool:
+        """并发下载多个字节范围
+
+        Returns:
+            bool: 是否全部按请求范围完整返回
+        """
+        with self.get_progress_bar(desc, journal.size) as bar:
+            bar.update(journal.done)
+            tasks = [
+                asyncio.create_task(self._download_range(url, headers, part_path, start, end, bar, journal))
+                for start, end in ranges
+            ]
+            try:
+                results = await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+            finally:
+                journal.save(part_path)
+        return all(results)
+
+    async def _download_range(
+        self,
+        url: str,
+        headers: dict[str, str],
+        part_path: Path,
+        start: int,
+        end: int,
+        bar: tqdm,
+        journal: DownloadJournal,
+    ) -> bool:
+        """下载单个字节范围, 每个分段使用独立的文件句柄
+
+        Returns:
+            bool: 是否按请求范围完整返回
+        """
+        range_headers = {**headers, "Range": f"bytes={start}-{end}"}
+        size = end - start + 1
+        written = 0
+        try:
+            async with self.client.stream("GET", url, headers=range_headers) as response:
+                response.raise_for_status()
+                content_range = response.headers.get("Content-Range", "")
+                if response.status_code != 206 or not content_range.startswith(f"bytes {start}-"):
+                    return False
+
+                async with aiofiles.open(part_path, "r+b") as file:
+                    await file.seek(start)
+                    async for chunk in response.aiter_bytes(1024 * 1024):
+                        # 超出请求范围的数据不写入, 避免覆盖相邻分段
+                        if len(chunk) > size - written:
+                            await file.write(chunk[: size - written])
+                            return False
+                        await file.write(chunk)
+                        written += len(chunk)
+                        bar.update(len(chunk))
+        finally:
+            if written:
+                journal.mark(start, start + written - 1)
+
+        # 返回的长度与请求范围不符, 视为不支持分段
+        return written == size
 
     @staticmethod
     def get_progress_bar(desc: str, total: int | None = None) -> tqdm:
@@ -189,6 +450,7 @@ class StreamDownloader:
         *,
         img_name: str | None = None,
         ext_headers: dict[str, str] | None = None,
+        priority: Priority = Priority.IMAGE,
     ) -> Path:
         """download image file by url with stream
 
@@ -196,6 +458,7 @@ class StreamDownloader:
             url (str): url
             img_name (str | None): image name. Defaults to generate from url.
             ext_headers (dict[str, str] | None): ext headers. Defaults to None.
+            priority (Priority): download priority. Defaults to Priority.IMAGE.
 
         Returns:
             Path: image file path
@@ -205,7 +468,30 @@ class StreamDownloader:
         """
         if img_name is None:
             img_name = generate_file_name(url, ".jpg")
-        return await self.streamd(url, file_name=img_name, ext_headers=ext_headers)
+        return await self.streamd(url, file_name=img_name, ext_headers=ext_headers, priority=priority)
+
+    def download(self, kind: MediaKind, url: str, *, ext_headers: dict[str, str] | None = None) -> Task[Path]:
+        """按类型立即开始下载"""
+        match kind:
+            case "video":
+                return self.download_video(url, ext_headers=ext_headers)
+            case "audio":
+                return self.download_audio(url, ext_headers=ext_headers)
+            case "image":
+                return self.download_img(url, ext_headers=ext_headers)
+
+    def lazy(self, kind: MediaKind, url: str, *, ext_headers: dict[str, str] | None = None) -> LazyMedia:
+        """创建延迟下载的媒体, 渲染或发送时首次等待才开始下载
+
+        Args:
+            kind (MediaKind): 媒体类型
+            url (str): url address
+            ext_headers (dict[str, str] | None): ext headers. Defaults to None.
+
+        Returns:
+            LazyMedia: 延迟下载的媒体
+        """
+        return LazyMedia(self, kind, url, ext_headers)
 
     async def download_imgs_without_raise(
         self,
@@ -238,12 +524,103 @@ class StreamDownloader:
         ext_headers: dict[str, str] | None = None,
     ) -> Path:
         """download video and audio file by url with stream and merge"""
+        if pconfig.stream_mux and os.name == "posix":
+            try:
+                return await self._download_av_muxed(v_url, a_url, output_path, {**self.headers, **(ext_headers or {})})
+            except DownloadException:
+                raise
+            except Exception as e:
+                logger.warning(f"边下载边合并失败, 下载完成后再合并 | {output_path.name}: {e!r}")
+
         v_path, a_path = await asyncio.gather(
             self.download_video(v_url, ext_headers=ext_headers),
             self.download_audio(a_url, ext_headers=ext_headers),
         )
         await merge_av(v_path=v_path, a_path=a_path, output_path=output_path)
-        return output_path
+        return await self.store.adopt(output_path, output_path)
+
+    async def _download_av_muxed(
+        self,
+        v_url: str,
+        a_url: str,
+        output_path: Path,
+        headers: dict[str, str],
+    ) -> Path:
+        """音视频流边下载边通过管道交给 ffmpeg 合并, 合并结果只写入一次磁盘"""
+        part_path = output_path.with_name(f"{output_path.name}.part")
+        logger.info(f"边下载边合并 {output_path.name}")
+        with self.evictor.pin(part_path):
+            # 两路流共用一个下载槽位, 避免只拿到一路槽位时 ffmpeg 等待另一路
+            async with self.scheduler.slot(v_url, Priority.MEDIA):
+                try:
+                    await self._mux_streams(v_url, a_url, headers, part_path)
+                except BaseException:
+                    await safe_unlink(part_path)
+                    raise
+        logger.success(f"Merged {output_path.name}, {fmt_size(part_path)}")
+        return await self.store.adopt(part_path, output_path)
+
+    async def _mux_streams(self, v_url: str, a_url: str, headers: dict[str, str], part_path: Path) -> None:
+        """启动 ffmpeg 从两个管道读取音视频, 并发写入两路响应流"""
+        v_read, v_write = os.pipe()
+        a_read, a_write = os.pipe()
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *merge_av_cmd(f"pipe:{v_read}", f"pipe:{a_read}", part_path),
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,
+                pass_fds=(v_read, a_read),
+            )
+        except BaseException:
+            os.close(v_write)
+            os.close(a_write)
+            raise
+        finally:
+            # 读端已由 ffmpeg 继承
+            os.close(v_read)
+            os.close(a_read)
+
+        desc = part_path.name.removesuffix(".mp4.part")
+        tasks = [
+            asyncio.create_task(self._pipe_stream(v_url, headers, v_write, f"{desc} video")),
+            asyncio.create_task(self._pipe_stream(a_url, headers, a_write, f"{desc} audio")),
+        ]
+        communicate = asyncio.create_task(process.communicate())
+        try:
+            await asyncio.gather(*tasks)
+            _, stderr = await communicate
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            if process.returncode is None:
+                process.kill()
+            await asyncio.gather(*tasks, communicate, return_exceptions=True)
+            raise
+
+        if process.returncode != 0:
+            raise RuntimeError(f"ffmpeg 执行失败: {stderr.decode().strip()}")
+
+    async def _pipe_stream(self, url: str, headers: dict[str, str], fd: int, desc: str) -> None:
+        """将响应流写入管道, 结束时关闭管道使 ffmpeg 读到 EOF"""
+        loop = asyncio.get_running_loop()
+        transport, protocol = await loop.connect_write_pipe(
+            asyncio.streams.FlowControlMixin,
+            os.fdopen(fd, "wb", buffering=0),
+        )
+        writer = asyncio.StreamWriter(transport, protocol, None, loop)
+        try:
+            async with self.client.stream("GET", url, headers=headers, follow_redirects=True) as response:
+                response.raise_for_status()
+                content_length = self._check_size(url, response)
+                with self.get_progress_bar(desc, content_length) as bar:
+                    async for chunk in response.aiter_bytes(1024 * 1024):
+                        writer.write(chunk)
+                        # ffmpeg 读取较慢时暂停下载
+                        await writer.drain()
+                        bar.update(len(chunk))
+        finally:
+            writer.close()
 
 
 DOWNLOADER: StreamDownloader = StreamDownloader()
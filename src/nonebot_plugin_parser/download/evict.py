@@ -0,0 +1,158 @@
+"""缓存目录的 LRU 淘汰"""
+
+import os
+import time
+import asyncio
+from pathlib import Path
+from contextlib import contextmanager
+from collections import Counter
+from dataclasses import field, dataclass
+from collections.abc import Iterator
+
+from nonebot import logger
+
+from ..utils import touch_file
+
+
+@dataclass
+class _Entry:
+    """同一 inode 的所有文件名, 硬链接共享存储, 作为一个淘汰单元"""
+
+    size: int
+    accessed_at: float
+    paths: list[Path] = field(default_factory=list)
+
+
+class CacheEvictor:
+    """按最近使用时间淘汰缓存文件
+
+    文件的 mtime 作为最近使用时间, 命中缓存时通过 touch 刷新;
+    总大小超出预算时, 从最久未使用的文件开始删除, 直到回到预算以内。
+    被 pin 的文件, 未达到最短保留时间的文件, 以及在进行中的会话开始后被使用过的文件不会被删除
+    """
+
+    SKIP_SUFFIXES: tuple[str, ...] = (".db", ".db-journal")
+    """数据库不参与淘汰"""
+    PARTIAL_SUFFIXES: tuple[str, ...] = (".part", ".part.json")
+    """未完成的下载及其续传日志, 不计入预算, 超过 PARTIAL_MAX_AGE 未更新时删除"""
+    PARTIAL_MAX_AGE: float = 24 * 60 * 60
+
+    def __init__(
+        self,
+        root: Path,
+        *,
+        max_size: int,
+        min_age: float,
+        exclude_dirs: tuple[str, ...] = (),
+    ):
+        """
+        Args:
+            root (Path): 缓存目录
+            max_size (int): 预算 单位: 字节
+            min_age (float): 最短保留时间 单位: 秒
+            exclude_dirs (tuple[str, ...]): 不参与淘汰的子目录名
+        """
+        self.root = root
+        self.max_size = max_size
+        self.min_age = min_age
+        self.exclude_dirs = exclude_dirs
+        self._pinned: Counter[Path] = Counter()
+        self._sessions: Counter[float] = Counter()
+
+    @contextmanager
+    def pin(self, *paths: Path) -> Iterator[None]:
+        """使用期间禁止淘汰指定文件"""
+        self._pinned.update(paths)
+        try:
+            yield
+        finally:
+            self._pinned.subtract(paths)
+            self._pinned += Counter()
+
+    @contextmanager
+    def session(self) -> Iterator[None]:
+        """会话期间被使用(touch)过的文件不会被淘汰, 用于保护渲染和发送中的媒体"""
+        started_at = time.time()
+        self._sessions[started_at] += 1
+        try:
+            yield
+        finally:
+            self._sessions[started_at] -= 1
+            if self._sessions[started_at] <= 0:
+                del self._sessions[started_at]
+
+    @staticmethod
+    def touch(*paths: Path) -> None:
+        """刷新最近使用时间"""
+        for path in paths:
+            try:
+                touch_file(path)
+            except OSError:
+                pass
+
+    async def evict(self) -> int:
+        """执行一次淘汰
+
+        Returns:
+            int: 释放的字节数
+        """
+        protected_after = min(self._sessions, default=time.time())
+        protected_after = min(protected_after, time.time() - self.min_age)
+        pinned = {path for path, count in self._pinned.items() if count > 0}
+        try:
+            await asyncio.to_thread(self._remove_stale_partials, pinned)
+            return await asyncio.to_thread(self._evict, protected_after, pinned)
+        except Exception:
+            logger.exception("缓存淘汰失败")
+            return 0
+
+    def _scan(self) -> dict[int, _Entry]:
+        entries: dict[int, _Entry] = {}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            if Path(dirpath) == self.root:
+                dirnames[:] = [name for name in dirnames if name not in self.exclude_dirs]
+            for name in filenames:
+                if name.endswith(self.SKIP_SUFFIXES + self.PARTIAL_SUFFIXES):
+                    continue
+                path = Path(dirpath) / name
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entry = entries.get(stat.st_ino)
+                if entry is None:
+                    entry = entries[stat.st_ino] = _Entry(size=stat.st_size, accessed_at=stat.st_mtime)
+                entry.paths.append(path)
+        return entries
+
+    def _remove_stale_partials(self, pinned: set[Path]) -> None:
+        expired_at = time.time() - self.PARTIAL_MAX_AGE
+        for suffix in self.PARTIAL_SUFFIXES:
+            for path in self.root.glob(f"*{suffix}"):
+                try:
+                    if path not in pinned and path.stat().st_mtime < expired_at:
+                        path.unlink()
+                except OSError:
+                    logger.warning(f"删除 {path} 失败")
+
+    def _evict(self, protected_after: float, pinned: set[Path]) -> int:
+        entries = self._scan()
+        total = sum(entry.size for entry in entries.values())
+        if total <= self.max_size:
+            return 0
+
+        freed = 0
+        for entry in sorted(entries.values(), key=lambda entry: entry.accessed_at):
+            if total - freed <= self.max_size:
+                break
+            if entry.accessed_at >= protected_after or any(path in pinned for path in entry.paths):
+                continue
+            for path in entry.paths:
+                try:
+                    path.unlink(missing_ok=True)
+                except OSError:
+                    logger.warning(f"删除 {path} 失败")
+            freed += entry.size
+
+        logger.info(f"缓存淘汰完成, 释放 {freed / 1024 / 1024:.2f} MB, 当前 {(total - freed) / 1024 / 1024:.2f} MB")
+        return freed
@@ -0,0 +1,83 @@
+"""断点续传日志"""
+
+from pathlib import Path
+
+import msgspec
+from httpx import Response
+from msgspec import Struct
+
+
+class DownloadJournal(Struct):
+    """记录 .part 文件的下载进度, 与 .part 文件同名, 后缀为 .part.json"""
+
+    url: str
+    size: int
+    """文件总大小"""
+    etag: str | None = None
+    last_modified: str | None = None
+    completed: list[tuple[int, int]] = []
+    """已完成的字节范围, 闭区间"""
+
+    @classmethod
+    def from_response(cls, url: str, response: Response, size: int) -> "DownloadJournal":
+        etag = response.headers.get("ETag")
+        # If-Range 仅支持强校验值
+        if etag and etag.startswith("W/"):
+            etag = None
+        return cls(url=url, size=size, etag=etag, last_modified=response.headers.get("Last-Modified"))
+
+    @classmethod
+    def load(cls, part_path: Path, url: str) -> "DownloadJournal | None":
+        """加载与 url 匹配的日志, 不存在或不匹配时返回 None"""
+        journal_path = cls.path_of(part_path)
+        if not part_path.exists() or not journal_path.exists():
+            return None
+        try:
+            journal = msgspec.json.decode(journal_path.read_bytes(), type=cls)
+        except (OSError, msgspec.DecodeError):
+            return None
+        if journal.url != url or journal.validator is None:
+            return None
+        return journal
+
+    @staticmethod
+    def path_of(part_path: Path) -> Path:
+        return part_path.with_name(f"{part_path.name}.json")
+
+    @property
+    def validator(self) -> str | None:
+        """用于 If-Range 的校验值"""
+        return self.etag or self.last_modified
+
+    @property
+    def done(self) -> int:
+        """已完成的字节数"""
+        return sum(end - start + 1 for start, end in self.completed)
+
+    def mark(self, start: int, end: int) -> None:
+        """标记字节范围已完成, 合并相邻区间"""
+        merged: list[tuple[int, int]] = []
+        for cur_start, cur_end in sorted([*self.completed, (start, end)]):
+            if merged and cur_start <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], cur_end))
+            else:
+                merged.append((cur_start, cur_end))
+        self.completed = merged
+
+    def missing(self) -> list[tuple[int, int]]:
+        """未完成的字节范围"""
+        ranges: list[tuple[int, int]] = []
+        offset = 0
+        for start, end in self.completed:
+            if start > offset:
+                ranges.append((offset, start - 1))
+            offset = max(offset, end + 1)
+        if offset < self.size:
+            ranges.append((offset, self.size - 1))
+        return ranges
+
+    def save(self, part_path: Path) -> None:
+        """保存日志, 无校验值的下载无法续传, 不保存"""
+        if self.validator is None:
+            return
+        self.path_of(part_path).write_bytes(msgspec.json.encode(self))
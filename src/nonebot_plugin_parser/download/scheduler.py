@@ -0,0 +1,109 @@
+"""下载调度: 全局及单域名并发限制, 优先级与会话间公平排队"""
+
+import asyncio
+from enum import IntEnum
+from contextlib import asynccontextmanager
+from collections import Counter, OrderedDict, deque
+from contextvars import ContextVar
+from dataclasses import dataclass
+from urllib.parse import urlparse
+from collections.abc import AsyncIterator
+
+DOWNLOAD_SESSION: ContextVar[str] = ContextVar("parser_download_session", default="")
+"""当前会话 id, 由消息处理器设置, 同一优先级内按会话轮流调度"""
+
+
+class Priority(IntEnum):
+    """下载优先级, 值越小越先下载"""
+
+    CARD = 0
+    """头像, 封面等卡片渲染必需的图片"""
+    IMAGE = 1
+    """图片内容"""
+    MEDIA = 2
+    """视频, 音频"""
+
+
+@dataclass(eq=False)
+class _Waiter:
+    host: str
+    future: asyncio.Future[None]
+
+
+class DownloadScheduler:
+    """下载调度器
+
+    同时进行的下载数受全局及单域名上限限制, 排队的下载按优先级出队,
+    同一优先级内在各会话之间轮流出队, 避免单个会话占满下载槽位
+    """
+
+    def __init__(self, max_concurrency: int, host_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self.host_concurrency = host_concurrency
+        self._active = 0
+        self._host_active: Counter[str] = Counter()
+        self._queues: dict[Priority, OrderedDict[str, deque[_Waiter]]] = {
+            priority: OrderedDict() for priority in Priority
+        }
+
+    @asynccontextmanager
+    async def slot(self, url: str, priority: Priority = Priority.MEDIA) -> AsyncIterator[None]:
+        """占用一个下载槽位"""
+        host = urlparse(url).netloc
+        await self._acquire(host, priority)
+        try:
+            yield
+        finally:
+            self._release(host)
+
+    async def _acquire(self, host: str, priority: Priority) -> None:
+        waiter = _Waiter(host, asyncio.get_running_loop().create_future())
+        self._queues[priority].setdefault(DOWNLOAD_SESSION.get(), deque()).append(waiter)
+        self._wake()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # 已获得槽位后被取消, 归还槽位
+                self._release(host)
+            else:
+                self._remove(waiter)
+            raise
+
+    def _release(self, host: str) -> None:
+        self._active -= 1
+        self._host_active[host] -= 1
+        if self._host_active[host] <= 0:
+            del self._host_active[host]
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._active < self.max_concurrency and (waiter := self._next()) is not None:
+            self._active += 1
+            self._host_active[waiter.host] += 1
+            waiter.future.set_result(None)
+
+    def _next(self) -> _Waiter | None:
+        """按优先级取出下一个域名未达上限的等待者, 同一优先级内会话轮流"""
+        for priority in Priority:
+            sessions = self._queues[priority]
+            for session, queue in list(sessions.items()):
+                for waiter in queue:
+                    if waiter.future.done() or self._host_active[waiter.host] >= self.host_concurrency:
+                        continue
+                    queue.remove(waiter)
+                    if queue:
+                        sessions.move_to_end(session)
+                    else:
+                        del sessions[session]
+                    return waiter
+        return None
+
+    def _remove(self, waiter: _Waiter) -> None:
+        for sessions in self._queues.values():
+            for session, queue in list(sessions.items()):
+                if waiter in queue:
+                    queue.remove(waiter)
+                    if not queue:
+                        del sessions[session]
+                    return
@@ -0,0 +1,155 @@
+"""内容寻址的媒体存储"""
+
+import os
+import shutil
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+
+from nonebot import logger
+
+from ..utils import touch_file
+
+
+def _hash_file(path: Path) -> str:
+    """计算文件内容的 sha256"""
+    sha256 = hashlib.sha256()
+    with path.open("rb") as f:
+        while chunk := f.read(1024 * 1024):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+class MediaStore:
+    """内容寻址的媒体存储
+
+    相同内容的文件只保存一份 blob, 缓存目录中的文件名为指向 blob 的硬链接,
+    blob 的硬链接数即引用计数, 清理时只删除没有被任何缓存文件引用的 blob
+    """
+
+    _SCHEMA = """
+    CREATE TABLE IF NOT EXISTS urls (
+        url TEXT PRIMARY KEY,
+        digest TEXT NOT NULL
+    )
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self._lock = threading.Lock()
+        # adopt 与 collect 互斥, 避免 blob 在链接前被回收
+        self._collect_lock = asyncio.Lock()
+        self._conn: sqlite3.Connection | None = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.root / "index.db", check_same_thread=False)
+            self._conn.execute(self._SCHEMA)
+            self._conn.commit()
+        return self._conn
+
+    def blob_path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    async def link_url(self, url: str, dest: Path) -> bool:
+        """若 url 对应的 blob 已存在, 则链接到 dest
+
+        Returns:
+            bool: 是否链接成功
+        """
+        async with self._collect_lock:
+            return await asyncio.to_thread(self._link_url, url, dest)
+
+    async def adopt(self, src: Path, dest: Path, url: str | None = None) -> Path:
+        """将 src 纳入存储, 并在 dest 处创建指向 blob 的链接
+
+        Args:
+            src (Path): 已下载完成的文件, 会被移动或删除
+            dest (Path): 缓存文件路径, 可与 src 相同
+            url (str | None): 产生该文件的 url, 用于建立索引
+
+        Returns:
+            Path: dest
+        """
+        async with self._collect_lock:
+            await asyncio.to_thread(self._adopt, src, dest, url)
+        return dest
+
+    async def collect(self) -> None:
+        """回收未被引用的 blob"""
+        async with self._collect_lock:
+            try:
+                await asyncio.to_thread(self._collect)
+            except Exception:
+                logger.exception("回收媒体存储失败")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _link_url(self, url: str, dest: Path) -> bool:
+        with self._lock:
+            row = self.conn.execute("SELECT digest FROM urls WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return False
+        blob = self.blob_path(row[0])
+        if not blob.exists():
+            return False
+        self._link(blob, dest)
+        return True
+
+    def _adopt(self, src: Path, dest: Path, url: str | None) -> None:
+        digest = _hash_file(src)
+        blob = self.blob_path(digest)
+        if blob.exists():
+            src.unlink()
+            # 复用已有内容, 刷新最近使用时间
+            touch_file(blob)
+        else:
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(src, blob)
+        self._link(blob, dest)
+
+        if url:
+            with self._lock:
+                self.conn.execute("INSERT OR REPLACE INTO urls (url, digest) VALUES (?, ?)", (url, digest))
+                self.conn.commit()
+
+    @staticmethod
+    def _link(blob: Path, dest: Path) -> None:
+        """在 dest 处创建指向 blob 的硬链接, 不支持硬链接时退化为复制"""
+        if dest.exists():
+            if dest.samefile(blob):
+                return
+            dest.unlink()
+        try:
+            os.link(blob, dest)
+        except OSError:
+            shutil.copyfile(blob, dest)
+
+    def _collect(self) -> None:
+        if not self.root.exists():
+            return
+
+        removed: set[str] = set()
+        for blob in self.root.glob("??/*"):
+            try:
+                if blob.stat().st_nlink <= 1:
+                    blob.unlink()
+                    removed.add(blob.name)
+            except OSError:
+                logger.warning(f"删除 blob {blob} 失败")
+
+        with self._lock:
+            digests = {digest for (digest,) in self.conn.execute("SELECT DISTINCT digest FROM urls").fetchall()}
+            stale = [digest for digest in digests if digest in removed or not self.blob_path(digest).exists()]
+            self.conn.executemany("DELETE FROM urls WHERE digest = ?", [(digest,) for digest in stale])
+            self.conn.commit()
+        if removed:
+            logger.debug(f"回收 {len(removed)} 个未引用的 blob")
@@ -1,11 +1,86 @@
-from typing import Any, TypeVar, ParamSpec
-from asyncio import Task, create_task
+from typing import Any, Generic, TypeVar, ParamSpec
+from asyncio import Task, InvalidStateError, create_task, current_task
+from weakref import WeakSet
 from functools import wraps
-from collections.abc import Callable, Coroutine
+from contextlib import contextmanager
+from contextvars import ContextVar
+from collections.abc import Callable, Iterator, Coroutine, Generator
+
+from nonebot import logger
 
 P = ParamSpec("P")
 T = TypeVar("T")
 
+_CURRENT_OWNER: ContextVar["TaskOwner | None"] = ContextVar("task_owner", default=None)
+# 因所有者释放而取消的任务
+_ORPHANS: WeakSet[Task[Any]] = WeakSet()
+
+
+class TaskOwner:
+    """下载任务的所有者, 收集解析期间创建的任务
+
+    解析结果被内存缓存或处理器持有时引用计数加一, 引用计数归零时取消仍在进行的任务
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.refs = 0
+        self._tasks: WeakSet[Task[Any] | LazyTask[Any]] = WeakSet()
+
+    @contextmanager
+    def collect(self) -> Iterator["TaskOwner"]:
+        """期间创建的任务(包括子任务及延迟任务开始后创建的任务)归属于此所有者"""
+        token = _CURRENT_OWNER.set(self)
+        try:
+            yield self
+        finally:
+            _CURRENT_OWNER.reset(token)
+
+    def claim(self, task: "Task[Any] | LazyTask[Any]") -> None:
+        self._tasks.add(task)
+
+    def acquire(self) -> "TaskOwner":
+        self.refs += 1
+        return self
+
+    @contextmanager
+    def hold(self) -> Iterator["TaskOwner"]:
+        """持有期间任务不会因其他持有者释放而被取消"""
+        self.acquire()
+        try:
+            yield self
+        finally:
+            self.release()
+
+    def release(self) -> None:
+        """引用计数减一, 归零时取消未完成的任务"""
+        self.refs -= 1
+        if self.refs <= 0:
+            self.cancel()
+
+    def cancel(self) -> None:
+        """取消未完成的任务, 未开始的延迟任务不再开始"""
+        cancelled = 0
+        for task in list(self._tasks):
+            if task.done():
+                continue
+            if isinstance(task, Task):
+                _ORPHANS.add(task)
+            cancelled += task.cancel()
+        if cancelled:
+            logger.debug(f"取消 {self.name} 的 {cancelled} 个下载任务")
+
+
+def claim(task: "Task[Any] | LazyTask[Any]") -> None:
+    """将任务归属于当前的所有者"""
+    if (owner := _CURRENT_OWNER.get()) is not None:
+        owner.claim(task)
+
+
+def orphaned() -> bool:
+    """当前任务是否因所有者释放而被取消, 此时无需保留下载的中间文件"""
+    return (task := current_task()) is not None and task in _ORPHANS
+
 
 def auto_task(func: Callable[P, Coroutine[Any, Any, T]]) -> Callable[P, Task[T]]:
     """装饰器：自动将异步函数调用转换为 Task, 完整保留类型提示"""
@@ -14,6 +89,66 @@ def auto_task(func: Callable[P, Coroutine[Any, Any, T]]) -> Callable[P, Task[T]]
     def wrapper(*args: P.args, **kwargs: P.kwargs) -> Task[T]:
         coro = func(*args, **kwargs)
         name = " | ".join(str(arg) for arg in args if isinstance(arg, str))
-        return create_task(coro, name=func.__name__ + " | " + name)
+        task = create_task(coro, name=func.__name__ + " | " + name)
+        claim(task)
+        return task
 
     return wrapper
+
+
+class LazyTask(Generic[T]):
+    """延迟创建的 Task, 首次等待或调用 start 时才开始执行
+
+    未开始时 done 返回 False, 开始后 done, cancelled, exception, result 与 Task 一致.
+    创建时记录当前的所有者, 开始后创建的任务同样归属于该所有者
+    """
+
+    __slots__ = ("__weakref__", "_factory", "_name", "_owner", "_task")
+
+    def __init__(self, factory: Callable[[], Task[T]], name: str):
+        self._factory = factory
+        self._name = name
+        self._task: Task[T] | None = None
+        self._owner = _CURRENT_OWNER.get()
+        claim(self)
+
+    @property
+    def started(self) -> bool:
+        return self._task is not None
+
+    def start(self) -> Task[T]:
+        """开始执行, 重复调用返回同一个 Task"""
+        if self._task is None:
+            token = _CURRENT_OWNER.set(self._owner)
+            try:
+                self._task = self._factory()
+            finally:
+                _CURRENT_OWNER.reset(token)
+        return self._task
+
+    def cancel(self) -> bool:
+        """取消执行, 未开始时创建的 Task 在运行前即被取消"""
+        return self.start().cancel()
+
+    def get_name(self) -> str:
+        return self._task.get_name() if self._task is not None else self._name
+
+    def done(self) -> bool:
+        return self._task is not None and self._task.done()
+
+    def cancelled(self) -> bool:
+        return self._task is not None and self._task.cancelled()
+
+    def exception(self) -> BaseException | None:
+        return self._started_task().exception()
+
+    def result(self) -> T:
+        return self._started_task().result()
+
+    def _started_task(self) -> Task[T]:
+        if self._task is None:
+            raise InvalidStateError(f"{self._name} 尚未开始")
+        return self._task
+
+    def __await__(self) -> Generator[Any, None, T]:
+        return self.start().__await__()
@@ -1,6 +1,8 @@
+import asyncio
 from typing import Any, Literal, ClassVar
 from pathlib import Path
 from functools import wraps
+from collections import OrderedDict
 from collections.abc import Callable, Sequence, Awaitable
 
 from nonebot import logger
@@ -27,6 +29,75 @@ ForwardNodeInner = str | Segment | UniMessage
 """转发消息节点内部允许的类型"""
 
 
+_PayloadKey = tuple[Path, int, int]
+"""文件路径, 大小, 修改时间"""
+
+
+class MediaPayloads:
+    """base64 发送时的媒体文件内容
+
+    在线程中读取文件, 同一文件的并发发送共享同一份只读内容,
+    最近使用的内容按总大小保留, 超过 parser_base64_max_size 的文件不读取
+    """
+
+    def __init__(self, max_cached: int):
+        self.max_cached = max_cached
+        self._cached: OrderedDict[_PayloadKey, bytes] = OrderedDict()
+        self._cached_size = 0
+        self._loading: dict[Path, asyncio.Task[tuple[_PayloadKey, bytes] | None]] = {}
+
+    async def load(self, path: Path) -> bytes | None:
+        """读取文件内容
+
+        Returns:
+            bytes | None: 文件内容, 超过大小限制时为 None
+        """
+        task = self._loading.get(path)
+        if task is None:
+            task = asyncio.create_task(asyncio.to_thread(self._read, path), name=f"payload | {path.name}")
+            self._loading[path] = task
+
+            def _discard(done: asyncio.Task[tuple[_PayloadKey, bytes] | None]):
+                if self._loading.get(path) is done:
+                    del self._loading[path]
+
+            task.add_done_callback(_discard)
+        # shield: 某个发送被取消时不影响其他等待者
+        if (loaded := await asyncio.shield(task)) is None:
+            return None
+        key, data = loaded
+        self._store(key, data)
+        return data
+
+    def _read(self, path: Path) -> tuple[_PayloadKey, bytes] | None:
+        """在线程中检查文件大小并读取, 文件未变化时复用缓存的内容"""
+        stat = path.stat()
+        if stat.st_size > pconfig.base64_max_size * 1024 * 1024:
+            logger.debug(f"{path.name} 超过 base64 发送大小限制, 使用文件路径发送")
+            return None
+
+        key = (path, stat.st_size, stat.st_mtime_ns)
+        if (data := self._cached.get(key)) is None:
+            data = path.read_bytes()
+        return key, data
+
+    def _store(self, key: _PayloadKey, data: bytes) -> None:
+        if key in self._cached:
+            self._cached.move_to_end(key)
+            return
+        if len(data) > self.max_cached:
+            return
+        self._cached[key] = data
+        self._cached_size += len(data)
+        while self._cached_size > self.max_cached:
+            _, evicted = self._cached.popitem(last=False)
+            self._cached_size -= len(evicted)
+
+
+MEDIA_PAYLOADS = MediaPayloads(max_cached=pconfig.base64_max_size * 2 * 1024 * 1024)
+"""媒体文件内容缓存, 最多保留两个最大大小的文件"""
+
+
 class UniHelper:
     @staticmethod
     def construct_forward_message(
@@ -58,7 +129,15 @@ class UniHelper:
         return Reference(nodes=nodes)
 
     @staticmethod
-    def img_seg(
+    async def payload(path: Path) -> bytes | None:
+        """base64 发送时的文件内容, 未启用 base64 或文件超过大小限制时为 None"""
+        if not pconfig.use_base64:
+            return None
+        return await MEDIA_PAYLOADS.load(path)
+
+    @classmethod
+    async def img_seg(
+        cls,
         img_path: Path | None = None,
         raw: bytes | None = None,
     ) -> Image:
@@ -77,13 +156,13 @@ class UniHelper:
         if img_path is None:
             raise ValueError("img_path 和 raw 不能都为 None")
 
-        if pconfig.use_base64:
-            return Image(raw=img_path.read_bytes())
+        if (payload := await cls.payload(img_path)) is not None:
+            return Image(raw=payload)
         else:
             return Image(path=img_path)
 
-    @staticmethod
-    def record_seg(audio_path: Path) -> Voice:
+    @classmethod
+    async def record_seg(cls, audio_path: Path) -> Voice:
         """获取语音 Seg
 
         Args:
@@ -92,33 +171,34 @@ class UniHelper:
         Returns:
             Voice: 语音 Seg
         """
-        if pconfig.use_base64:
-            return Voice(raw=audio_path.read_bytes())
+        if (payload := await cls.payload(audio_path)) is not None:
+            return Voice(raw=payload)
         else:
             return Voice(path=audio_path)
 
     @classmethod
-    def video_seg(cls, video_path: Path) -> Video | File | Text:
+    async def video_seg(cls, video_path: Path) -> Video | File | Text:
         """获取视频 Seg
 
         Returns:
             Video | File | Text: 视频 Seg
         """
         # 检测文件大小
-        file_size_byte_count = int(video_path.stat().st_size)
+        file_size_byte_count = (await asyncio.to_thread(video_path.stat)).st_size
         if file_size_byte_count == 0:
             return Text("视频文件大小为 0")
         elif file_size_byte_count > 100 * 1024 * 1024:
             # 转为文件 Seg
-            return cls.file_seg(video_path, display_name=video_path.name)
+            return await cls.file_seg(video_path, display_name=video_path.name)
         else:
-            if pconfig.use_base64:
-                return Video(raw=video_path.read_bytes())
+            if (payload := await cls.payload(video_path)) is not None:
+                return Video(raw=payload)
             else:
                 return Video(path=video_path)
 
-    @staticmethod
-    def file_seg(
+    @classmethod
+    async def file_seg(
+        cls,
         file: Path,
         display_name: str | None = None,
     ) -> File:
@@ -135,8 +215,8 @@ class UniHelper:
             display_name = file.name
         if not display_name:
             raise ValueError("文件名不能为空")
-        if pconfig.use_base64:
-            return File(raw=file.read_bytes(), name=display_name)
+        if (payload := await cls.payload(file)) is not None:
+            return File(raw=payload, name=display_name)
         else:
             return File(path=file, name=display_name)
 
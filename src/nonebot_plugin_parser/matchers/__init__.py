@@ -1,17 +1,22 @@
 import re
+import asyncio
 from typing import TypeVar
 
 from nonebot import logger, get_driver, on_command
 from nonebot.params import CommandArg
+from nonebot.matcher import current_event
 from nonebot.adapters import Message
 
 from .rule import SUPER_PRIVATE, Searched, SearchResult, on_keyword_regex
+from .cache import ResultCache, media_paths
 from ..utils import LimitedSizeDict
 from ..config import pconfig
 from ..helper import UniHelper, UniMessage
 from ..parsers import BaseParser, ParseResult, BilibiliParser
 from ..renders import get_renderer
 from ..download import DOWNLOADER
+from ..download.task import TaskOwner
+from ..download.scheduler import DOWNLOAD_SESSION
 
 
 def _get_enabled_parser_classes() -> list[type[BaseParser]]:
@@ -53,12 +58,107 @@ def register_parser_matcher():
     matcher.append_handler(parser_handler)
 
 
-# 缓存结果
-_RESULT_CACHE = LimitedSizeDict[str, ParseResult](max_size=50)
+def _release_result(cache_key: str, result: ParseResult):
+    """内存缓存不再持有解析结果, 没有其他持有者时取消仍在进行的下载"""
+    _UNPERSISTED.discard(cache_key)
+    if result.owner is not None:
+        result.owner.release()
 
 
-def clear_result_cache():
-    _RESULT_CACHE.clear()
+# 缓存结果, 缓存持有解析结果的下载任务
+_RESULT_CACHE = LimitedSizeDict[str, ParseResult](max_size=50, on_evict=_release_result)
+# 持久化缓存结果, 重启后仍可命中
+_RESULT_STORE = ResultCache(pconfig.data_dir / "result_cache.db")
+# 新解析且尚未写入持久化缓存的结果
+_UNPERSISTED: set[str] = set()
+
+
+def prune_result_cache():
+    """移除媒体文件已被淘汰的内存缓存"""
+    for key, result in list(_RESULT_CACHE.items()):
+        if not all(path.exists() for path in media_paths(result)):
+            _drop_result(key)
+
+
+def _cache_result(cache_key: str, result: ParseResult):
+    _drop_result(cache_key)
+    if result.owner is not None:
+        result.owner.acquire()
+    _RESULT_CACHE[cache_key] = result
+
+
+def _drop_result(cache_key: str):
+    if (result := _RESULT_CACHE.pop(cache_key, None)) is not None:
+        _release_result(cache_key, result)
+
+
+async def prune_result_store():
+    await _RESULT_STORE.prune()
+
+
+@get_driver().on_shutdown
+async def close_resources():
+    _RESULT_STORE.close()
+    await BaseParser.close_clients()
+    await DOWNLOADER.client.aclose()
+    DOWNLOADER.store.close()
+
+
+# 进行中的解析任务, 同一链接的并发请求共享同一个任务
+_INFLIGHT_PARSES: dict[str, asyncio.Task[ParseResult]] = {}
+
+
+async def _load_or_parse(cache_key: str, sr: SearchResult) -> ParseResult:
+    """从持久化缓存加载或解析, 完成后立即写入内存缓存"""
+    owner = TaskOwner(cache_key)
+    fresh = False
+    try:
+        with owner.collect():
+            result = await _RESULT_STORE.get(cache_key)
+            if result is None:
+                parser = get_parser(sr.keyword)
+                result = await parser.parse(sr.keyword, sr.searched)
+                fresh = True
+                logger.debug(f"解析结果: {result}")
+            else:
+                logger.debug(f"命中持久化缓存: {cache_key}, 结果: {result}")
+    except BaseException:
+        # 解析失败, 已开始的下载不会再被使用
+        owner.cancel()
+        raise
+
+    # 在渲染前写入缓存, 后续请求无需等待消息发送完毕
+    result.owner = owner
+    _cache_result(cache_key, result)
+    if fresh:
+        _UNPERSISTED.add(cache_key)
+    return result
+
+
+async def get_or_parse(cache_key: str, sr: SearchResult) -> ParseResult:
+    """获取解析结果, 合并同一链接的并发解析"""
+    if (result := _RESULT_CACHE.get(cache_key)) is not None:
+        if all(path.exists() for path in media_paths(result)):
+            logger.debug(f"命中缓存: {cache_key}, 结果: {result}")
+            return result
+        # 媒体文件已被淘汰, 重新解析
+        _drop_result(cache_key)
+
+    task = _INFLIGHT_PARSES.get(cache_key)
+    if task is None:
+        task = asyncio.create_task(_load_or_parse(cache_key, sr), name=f"parse | {cache_key}")
+        _INFLIGHT_PARSES[cache_key] = task
+
+        def _discard(done: asyncio.Task[ParseResult]):
+            if _INFLIGHT_PARSES.get(cache_key) is done:
+                del _INFLIGHT_PARSES[cache_key]
+
+        task.add_done_callback(_discard)
+    else:
+        logger.debug(f"合并进行中的解析: {cache_key}")
+
+    # shield: 某个等待者被取消时不影响其他等待者
+    return await asyncio.shield(task)
 
 
 @UniHelper.with_reaction
@@ -66,25 +166,26 @@ async def parser_handler(
     sr: SearchResult = Searched(),
 ):
     """统一的解析处理器"""
-    # 1. 获取缓存结果
-    cache_key = sr.searched.group(0)
-    result = _RESULT_CACHE.get(cache_key)
-
-    if result is None:
-        # 2. 获取对应平台 parser
-        parser = get_parser(sr.keyword)
-        result = await parser.parse(sr.keyword, sr.searched)
-        logger.debug(f"解析结果: {result}")
-    else:
-        logger.debug(f"命中缓存: {cache_key}, 结果: {result}")
-
-    # 3. 渲染内容消息并发送
-    renderer = get_renderer(result.platform.name)
-    async for message in renderer.render_messages(result):
-        await message.send()
-
-    # 4. 缓存解析结果
-    _RESULT_CACHE[cache_key] = result
+    # 下载调度在各会话之间轮流进行
+    DOWNLOAD_SESSION.set(current_event.get().get_session_id())
+    # 会话期间使用过的缓存文件不会被淘汰
+    with DOWNLOADER.evictor.session():
+        # 1. 获取缓存结果或解析
+        cache_key = sr.searched.group(0)
+        result = await get_or_parse(cache_key, sr)
+        DOWNLOADER.evictor.touch(*media_paths(result))
+        fresh = cache_key in _UNPERSISTED
+        render_image = result.render_image
+
+        # 2. 渲染内容消息并发送, 处理器中止且结果已不在缓存中时取消下载
+        renderer = get_renderer(result.platform.name)
+        with (result.owner or TaskOwner(cache_key)).hold():
+            async for message in renderer.render_messages(result):
+                await message.send()
+
+    # 3. 持久化新解析的结果(媒体下载完成后), 命中缓存时仅在生成了新的渲染图片时更新
+    if (fresh or result.render_image != render_image) and await _RESULT_STORE.set(cache_key, result):
+        _UNPERSISTED.discard(cache_key)
 
 
 @on_command("bm", priority=3, block=True).handle()
@@ -107,10 +208,10 @@ async def _(message: Message = CommandArg()):
     audio_path = await DOWNLOADER.download_audio(
         audio_url, audio_name=f"{bvid}-{page_idx}.mp3", ext_headers=parser.headers
     )
-    await UniMessage(UniHelper.record_seg(audio_path)).send()
+    await UniMessage(await UniHelper.record_seg(audio_path)).send()
 
     if pconfig.need_upload:
-        await UniMessage(UniHelper.file_seg(audio_path)).send()
+        await UniMessage(await UniHelper.file_seg(audio_path)).send()
 
 
 from ..download import YTDLP_DOWNLOADER
@@ -130,16 +231,16 @@ if YTDLP_DOWNLOADER is not None:
         url = matched.group(0)
 
         audio_path = await YTDLP_DOWNLOADER.download_audio(url)
-        await UniMessage(UniHelper.record_seg(audio_path)).send()
+        await UniMessage(await UniHelper.record_seg(audio_path)).send()
 
         if pconfig.need_upload:
-            await UniMessage(UniHelper.file_seg(audio_path)).send()
+            await UniMessage(await UniHelper.file_seg(audio_path)).send()
 
 
 @on_command("blogin", block=True, permission=SUPER_PRIVATE).handle()
 async def _():
     parser = get_parser_by_type(BilibiliParser)
     qrcode = await parser.login_with_qrcode()
-    await UniMessage(UniHelper.img_seg(raw=qrcode)).send()
+    await UniMessage(await UniHelper.img_seg(raw=qrcode)).send()
     async for msg in parser.check_qr_state():
         await UniMessage(msg).send()
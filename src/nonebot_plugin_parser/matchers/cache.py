@@ -0,0 +1,398 @@
+"""解析结果持久化缓存 (SQLite)"""
+
+import time
+import asyncio
+import sqlite3
+import threading
+from typing import Any
+from asyncio import Task
+from pathlib import Path
+
+import msgspec
+from msgspec import Struct
+from nonebot import logger
+
+from ..config import pconfig
+from ..parsers import (
+    Author,
+    Platform,
+    ParseResult,
+    AudioContent,
+    ImageContent,
+    VideoContent,
+    DynamicContent,
+    GraphicsContent,
+)
+from ..download import DOWNLOADER, LazyMedia, MediaKind
+from ..exception import ZeroSizeException, DownloadLimitException
+from ..parsers.data import MediaContent
+from ..download.task import LazyTask
+
+
+class CachedContent(Struct):
+    kind: str
+    """媒体类型, MediaContent 子类名"""
+    path: str
+    """本地路径, 未下载的延迟媒体为空"""
+    url: str | None = None
+    """未下载的延迟媒体地址"""
+    headers: dict[str, str] | None = None
+    """未下载的延迟媒体请求头"""
+    cover: str | None = None
+    duration: float = 0.0
+    text: str | None = None
+    alt: str | None = None
+
+
+class CachedAuthor(Struct):
+    name: str
+    avatar: str | None = None
+    description: str | None = None
+
+
+class CachedResult(Struct):
+    platform: str
+    display_name: str
+    author: CachedAuthor | None = None
+    title: str | None = None
+    text: str | None = None
+    timestamp: int | None = None
+    url: str | None = None
+    contents: list[CachedContent] = []
+    extra: dict[str, Any] = {}
+    repost: "CachedResult | None" = None
+    render_image: str | None = None
+
+    def paths(self) -> list[Path]:
+        """引用的所有媒体文件(不含渲染图片)"""
+        paths: list[Path] = []
+        if self.author and self.author.avatar:
+            paths.append(Path(self.author.avatar))
+        for cont in self.contents:
+            if cont.path:
+                paths.append(Path(cont.path))
+            if cont.cover:
+                paths.append(Path(cont.cover))
+        if self.repost:
+            paths.extend(self.repost.paths())
+        return paths
+
+
+_LAZY_KINDS: dict[type[MediaContent], MediaKind] = {
+    VideoContent: "video",
+    DynamicContent: "video",
+    AudioContent: "audio",
+    ImageContent: "image",
+}
+"""延迟媒体恢复时使用的下载类型"""
+
+_CONTENT_TYPES: dict[str, type[MediaContent]] = {
+    cls.__name__: cls
+    for cls in (
+        AudioContent,
+        ImageContent,
+        VideoContent,
+        DynamicContent,
+        GraphicsContent,
+    )
+}
+
+
+class _NotCacheable(Exception):
+    """媒体仍在下载或下载失败, 结果不可持久化"""
+
+
+class _SkipContent(Exception):
+    """媒体因限制未下载, 跳过该项"""
+
+
+def _resolve(path_task: Path | Task[Path] | LazyTask[Path] | None) -> str | None:
+    """获取已完成的媒体路径"""
+    if path_task is None:
+        return None
+    if isinstance(path_task, Path):
+        return str(path_task)
+    if not path_task.done() or path_task.cancelled():
+        raise _NotCacheable
+    if (exc := path_task.exception()) is not None:
+        if isinstance(exc, (DownloadLimitException, ZeroSizeException)):
+            raise _SkipContent
+        raise _NotCacheable
+    return str(path_task.result())
+
+
+def _done_path(path_task: Path | Task[Path] | LazyTask[Path] | None) -> Path | None:
+    """获取已下载成功的媒体路径, 未完成或失败时返回 None"""
+    if isinstance(path_task, (Task, LazyTask)):
+        if not path_task.done() or path_task.cancelled() or path_task.exception() is not None:
+            return None
+        return path_task.result()
+    return path_task
+
+
+def media_paths(result: ParseResult) -> list[Path]:
+    """解析结果中已下载完成的媒体文件路径(含渲染图片)"""
+    tasks: list[Path | Task[Path] | LazyTask[Path] | None] = [result.render_image]
+    if result.author:
+        tasks.append(result.author.avatar)
+    for cont in result.contents:
+        tasks.append(cont.path_task)
+        if isinstance(cont, VideoContent):
+            tasks.append(cont.cover)
+    paths = [path for task in tasks if (path := _done_path(task)) is not None]
+    if result.repost:
+        paths.extend(media_paths(result.repost))
+    return paths
+
+
+def _dump_content(cont: MediaContent) -> CachedContent:
+    if isinstance(cont.path_task, LazyMedia) and not cont.path_task.started:
+        # 未使用过的延迟媒体保存地址, 命中缓存后仍按需下载
+        cached = CachedContent(
+            kind=type(cont).__name__,
+            path="",
+            url=cont.path_task.url,
+            headers=cont.path_task.ext_headers,
+        )
+    else:
+        cached = CachedContent(kind=type(cont).__name__, path=_resolve(cont.path_task) or "")
+    match cont:
+        case VideoContent():
+            cached.cover = _resolve(cont.cover)
+            cached.duration = cont.duration
+        case AudioContent():
+            cached.duration = cont.duration
+        case GraphicsContent():
+            cached.text = cont.text
+            cached.alt = cont.alt
+    return cached
+
+
+def _dump_result(result: ParseResult) -> CachedResult:
+    author = None
+    if result.author:
+        author = CachedAuthor(
+            name=result.author.name,
+            avatar=_resolve(result.author.avatar),
+            description=result.author.description,
+        )
+
+    contents: list[CachedContent] = []
+    for cont in result.contents:
+        try:
+            contents.append(_dump_content(cont))
+        except _SkipContent:
+            continue
+
+    render_image = str(result.render_image) if result.render_image else None
+    return CachedResult(
+        platform=result.platform.name,
+        display_name=result.platform.display_name,
+        author=author,
+        title=result.title,
+        text=result.text,
+        timestamp=result.timestamp,
+        url=result.url,
+        contents=contents,
+        extra=result.extra,
+        repost=_dump_result(result.repost) if result.repost else None,
+        render_image=render_image,
+    )
+
+
+def _load_content(cached: CachedContent) -> MediaContent:
+    content_type = _CONTENT_TYPES[cached.kind]
+    path: Path | LazyMedia = Path(cached.path)
+    if not cached.path and cached.url and content_type in _LAZY_KINDS:
+        path = DOWNLOADER.lazy(_LAZY_KINDS[content_type], cached.url, ext_headers=cached.headers)
+    if content_type is VideoContent:
+        cover = Path(cached.cover) if cached.cover else None
+        return VideoContent(path, cover, cached.duration)
+    if content_type is AudioContent:
+        return AudioContent(path, cached.duration)
+    if content_type is GraphicsContent:
+        return GraphicsContent(path, cached.text, cached.alt)
+    return content_type(path)
+
+
+def _load_result(cached: CachedResult) -> ParseResult:
+    author = None
+    if cached.author:
+        author = Author(
+            name=cached.author.name,
+            avatar=Path(cached.author.avatar) if cached.author.avatar else None,
+            description=cached.author.description,
+        )
+
+    render_image = Path(cached.render_image) if cached.render_image else None
+    if render_image and not render_image.exists():
+        render_image = None
+
+    return ParseResult(
+        platform=Platform(name=cached.platform, display_name=cached.display_name),
+        author=author,
+        title=cached.title,
+        text=cached.text,
+        timestamp=cached.timestamp,
+        url=cached.url,
+        contents=[_load_content(cont) for cont in cached.contents],
+        extra=cached.extra,
+        repost=_load_result(cached.repost) if cached.repost else None,
+        render_image=render_image,
+    )
+
+
+class ResultCache:
+    """持久化的解析结果缓存
+
+    存储序列化后的 ParseResult 及其本地媒体路径, 按平台设置有效期,
+    超出条目数或大小限制时按最近最少使用淘汰, 媒体文件被删除的条目自动失效
+    """
+
+    _SCHEMA = """
+    CREATE TABLE IF NOT EXISTS results (
+        key TEXT PRIMARY KEY,
+        platform TEXT NOT NULL,
+        payload BLOB NOT NULL,
+        size INTEGER NOT NULL,
+        expires_at REAL NOT NULL,
+        accessed_at REAL NOT NULL
+    )
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute(self._SCHEMA)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed_at ON results (accessed_at)")
+            self._conn.commit()
+        return self._conn
+
+    async def get(self, key: str) -> ParseResult | None:
+        """获取缓存的解析结果, 过期或媒体文件缺失时返回 None"""
+        try:
+            return await asyncio.to_thread(self._get, key)
+        except Exception:
+            logger.exception(f"读取解析结果缓存失败: {key}")
+            return None
+
+    async def set(self, key: str, result: ParseResult) -> bool:
+        """缓存解析结果, 媒体未全部下载完成的结果不会缓存
+
+        已存在的条目只更新内容, 不延长有效期
+
+        Returns:
+            bool: 是否已写入缓存
+        """
+        try:
+            cached = _dump_result(result)
+            payload = msgspec.json.encode(cached)
+        except _NotCacheable:
+            logger.debug(f"媒体未全部下载完成, 跳过持久化缓存: {key}")
+            return False
+        except (TypeError, msgspec.EncodeError):
+            logger.debug(f"解析结果无法序列化, 跳过持久化缓存: {key}")
+            return False
+
+        try:
+            return await asyncio.to_thread(self._set, key, cached, payload)
+        except Exception:
+            logger.exception(f"写入解析结果缓存失败: {key}")
+            return False
+
+    async def prune(self) -> None:
+        """清理过期及媒体文件缺失的条目"""
+        try:
+            await asyncio.to_thread(self._prune)
+        except Exception:
+            logger.exception("清理解析结果缓存失败")
+
+    def clear(self) -> None:
+        with self._lock:
+            self.conn.execute("DELETE FROM results")
+            self.conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _get(self, key: str) -> ParseResult | None:
+        with self._lock:
+            row = self.conn.execute("SELECT payload, expires_at FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+
+            payload, expires_at = row
+            now = time.time()
+            cached = msgspec.json.decode(payload, type=CachedResult)
+            if expires_at < now or not all(path.exists() for path in cached.paths()):
+                self.conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self.conn.commit()
+                return None
+
+            self.conn.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+        return _load_result(cached)
+
+    def _set(self, key: str, cached: CachedResult, payload: bytes) -> bool:
+        size = len(payload)
+        for path in cached.paths():
+            try:
+                size += path.stat().st_size
+            except OSError:
+                return False
+
+        now = time.time()
+        expires_at = now + pconfig.result_cache_ttl(cached.platform)
+        with self._lock:
+            # 已存在的条目保留原有效期, 避免频繁分享的链接永不过期
+            self.conn.execute(
+                "INSERT INTO results (key, platform, payload, size, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET "
+                "payload = excluded.payload, size = excluded.size, accessed_at = excluded.accessed_at",
+                (key, cached.platform, payload, size, expires_at, now),
+            )
+            self._evict()
+            self.conn.commit()
+        return True
+
+    def _evict(self) -> None:
+        """按最近访问时间淘汰超出限制的条目"""
+        max_entries = pconfig.result_cache_max_entries
+        max_bytes = pconfig.result_cache_max_size * 1024 * 1024
+
+        count, total = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        if count <= max_entries and total <= max_bytes:
+            return
+
+        evicted: list[str] = []
+        for key, size in self.conn.execute("SELECT key, size FROM results ORDER BY accessed_at ASC").fetchall():
+            if count <= max_entries and total <= max_bytes:
+                break
+            evicted.append(key)
+            count -= 1
+            total -= size
+
+        self.conn.executemany("DELETE FROM results WHERE key = ?", [(key,) for key in evicted])
+        logger.debug(f"淘汰 {len(evicted)} 条解析结果缓存")
+
+    def _prune(self) -> None:
+        now = time.time()
+        with self._lock:
+            self.conn.execute("DELETE FROM results WHERE expires_at < ?", (now,))
+            invalid: list[str] = []
+            for key, payload in self.conn.execute("SELECT key, payload FROM results").fetchall():
+                cached = msgspec.json.decode(payload, type=CachedResult)
+                if not all(path.exists() for path in cached.paths()):
+                    invalid.append(key)
+            self.conn.executemany("DELETE FROM results WHERE key = ?", [(key,) for key in invalid])
+            self.conn.commit()
@@ -1,5 +1,6 @@
 import re
 from typing import Any, Literal
+from collections.abc import Sequence
 
 import msgspec
 from nonebot import logger
@@ -108,7 +109,36 @@ def _extract_text(message: UniMsg) -> str | None:
     return None
 
 
+def _trie_regex(words: Sequence[str]) -> re.Pattern[str]:
+    """将关键词按公共前缀合并为正则, 每个位置只需按首字符尝试一个分支
+
+    Args:
+        words: 关键词列表, 不能为空
+
+    Returns:
+        re.Pattern[str]: 匹配任一关键词的正则
+    """
+    trie: dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict[str, Any]) -> str:
+        alternatives = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not alternatives:
+            return ""
+        pattern = alternatives[0] if len(alternatives) == 1 else f"(?:{'|'.join(alternatives)})"
+        # 已有较短的关键词在此结束, 后续字符可选
+        return f"(?:{pattern})?" if "" in node else pattern
+
+    return re.compile(build(trie))
+
+
 class KeyPatternList(list[tuple[str, re.Pattern[str]]]):
+    """关键词 -> 正则 列表, 构建时预编译多关键词匹配器"""
+
     def __init__(self, *args: tuple[str, str | re.Pattern[str]]):
         super().__init__()
         for key, pattern in args:
@@ -119,6 +149,24 @@ class KeyPatternList(list[tuple[str, re.Pattern[str]]]):
         self.sort(key=lambda x: -len(x[0]))
         logger.debug(f"KeyWords: {[k for k, _ in self]}")
 
+        self._keywords: tuple[str, ...] = tuple(dict.fromkeys(k for k, _ in self))
+        # 包含其他关键词的长关键词出现时, 其包含的短关键词必然出现, 只需检查最短的那些
+        minimal = [k for k in self._keywords if not any(other != k and other in k for other in self._keywords)]
+        self._keyword_regex: re.Pattern[str] | None = _trie_regex(minimal) if minimal else None
+
+    def find_keywords(self, text: str) -> set[str]:
+        """找出文本中出现的所有关键词, 不含关键词的文本只需一次正则扫描
+
+        Args:
+            text: 待匹配文本
+
+        Returns:
+            set[str]: 出现的关键词集合, 为空表示不可能匹配
+        """
+        if self._keyword_regex is None or self._keyword_regex.search(text) is None:
+            return set()
+        return {keyword for keyword in self._keywords if keyword in text}
+
 
 class KeywordRegexRule:
     """检查消息是否含有关键词, 有关键词进行正则匹配"""
@@ -142,8 +190,14 @@ class KeywordRegexRule:
         if not text:
             return False
 
+        # 绝大多数消息不含任何关键词, 单次扫描后直接返回
+        candidates = self.key_pattern_list.find_keywords(text)
+        if not candidates:
+            return False
+
+        # 保持 长关键词 -> 短关键词 的优先级
         for keyword, pattern in self.key_pattern_list:
-            if keyword not in text:
+            if keyword not in candidates:
                 continue
             if searched := pattern.search(text):
                 state[PSR_SEARCHED_KEY] = SearchResult(text=text, keyword=keyword, searched=searched)
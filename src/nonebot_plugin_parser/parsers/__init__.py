@@ -21,6 +21,7 @@ from .data import (
     ParseResult,
     AudioContent,
     ImageContent,
+    MediaContent,
     VideoContent,
     DynamicContent,
     GraphicsContent,
@@ -33,6 +34,7 @@ __all__ = [
     "DynamicContent",
     "GraphicsContent",
     "ImageContent",
+    "MediaContent",
     "ParseResult",
     "Platform",
     "VideoContent",
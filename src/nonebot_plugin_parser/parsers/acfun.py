@@ -6,12 +6,12 @@ from typing import ClassVar
 from pathlib import Path
 
 import aiofiles
-from httpx import HTTPError, AsyncClient
+from httpx import HTTPError
 from nonebot import logger
 
-from .base import DOWNLOADER, MediaType, Platform, BaseParser, PlatformEnum, handle, pconfig
+from .base import DOWNLOADER, LazyTask, MediaType, Platform, BaseParser, PlatformEnum, handle, pconfig
 from ..utils import safe_unlink
-from ..constants import COMMON_TIMEOUT, DOWNLOAD_TIMEOUT
+from ..constants import DOWNLOAD_TIMEOUT
 from ..exception import ParseException, DownloadException
 
 
@@ -37,7 +37,9 @@ class AcfunParser(BaseParser):
 
         contents = []
         if self.allows_media(MediaType.VIDEO):
-            video_task = asyncio.create_task(self.download_video(m3u8_url, acid))
+            video_task = LazyTask(
+                lambda: asyncio.create_task(self.download_video(m3u8_url, acid)), name=f"acfun | ac{acid}"
+            )
             if video_content := self.create_video_content(video_task):
                 contents.append(video_content)
 
@@ -62,10 +64,9 @@ class AcfunParser(BaseParser):
         # 拼接查询参数
         url = f"{url}?quickViewId=videoInfo_new&ajaxpipe=1"
 
-        async with AsyncClient(headers=self.headers, timeout=COMMON_TIMEOUT) as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            raw = response.text
+        response = await self.get_client().get(url)
+        response.raise_for_status()
+        raw = response.text
 
         matched = re.search(r"window\.videoInfo =(.*?)</script>", raw)
         if not matched:
@@ -99,20 +100,18 @@ class AcfunParser(BaseParser):
         """
 
         m3u8_full_urls = await self._parse_m3u8(m3u8s_url)
-        video_file = pconfig.cache_dir / f"acfun_{acid}.mp4"
+        video_file = DOWNLOADER.cache_dir / f"acfun_{acid}.mp4"
         if video_file.exists():
             return video_file
 
         try:
             max_size_in_bytes = pconfig.max_size * 1024 * 1024
-            async with (
-                aiofiles.open(video_file, "wb") as f,
-                AsyncClient(headers=self.headers, timeout=DOWNLOAD_TIMEOUT) as client,
-            ):
+            client = self.get_client()
+            async with aiofiles.open(video_file, "wb") as f:
                 total_size = 0
                 with DOWNLOADER.get_progress_bar(video_file.name) as bar:
                     for url in m3u8_full_urls:
-                        async with client.stream("GET", url) as response:
+                        async with client.stream("GET", url, timeout=DOWNLOAD_TIMEOUT) as response:
                             async for chunk in response.aiter_bytes(chunk_size=1024 * 1024):
                                 await f.write(chunk)
                                 total_size += len(chunk)
@@ -135,9 +134,8 @@ class AcfunParser(BaseParser):
         Returns:
             list[str]: 视频链接
         """
-        async with AsyncClient(headers=self.headers, timeout=COMMON_TIMEOUT) as client:
-            response = await client.get(m3u8_url)
-            m3u8_file = response.text
+        response = await self.get_client().get(m3u8_url)
+        m3u8_file = response.text
         # 分离ts文件链接
         raw_pieces = re.split(r"\n#EXTINF:.{8},\n", m3u8_file)
         # 过滤头部\
@@ -6,15 +6,21 @@ from re import Match, Pattern, compile
 from abc import ABC
 from enum import Enum
 from typing import TYPE_CHECKING, Any, TypeVar, ClassVar, cast
-from asyncio import Task
+from asyncio import Task, gather
 from pathlib import Path
+from http.cookiejar import CookieJar, DefaultCookiePolicy
 from collections.abc import Callable, Coroutine
 from typing_extensions import Unpack
 
+from httpx import Cookies, AsyncClient
+
 from .data import Platform, ParseResult, ParseResultKwargs
+from ..utils import is_module_available
 from ..config import MediaMode, pconfig as pconfig
 from ..download import DOWNLOADER as DOWNLOADER
-from ..constants import IOS_HEADER, COMMON_HEADER, ANDROID_HEADER, COMMON_TIMEOUT
+from ..download.task import LazyTask as LazyTask
+from ..download.scheduler import Priority
+from ..constants import IOS_HEADER, COMMON_HEADER, COMMON_LIMITS, ANDROID_HEADER, COMMON_TIMEOUT
 from ..constants import PlatformEnum as PlatformEnum
 from ..exception import TipException as TipException
 from ..exception import ParseException as ParseException
@@ -26,6 +32,9 @@ from ..exception import DurationLimitException as DurationLimitException
 T = TypeVar("T", bound="BaseParser")
 HandlerFunc = Callable[[T, Match[str]], Coroutine[Any, Any, ParseResult]]
 KeyPatterns = list[tuple[str, Pattern[str]]]
+ClientKey = tuple[str, frozenset[tuple[str, str]], bool, bool, bool]
+
+_HTTP2_AVAILABLE = is_module_available("h2")
 
 _KEY_PATTERNS = "_key_patterns"
 
@@ -64,6 +73,9 @@ class BaseParser:
     _registry: ClassVar[list[type["BaseParser"]]] = []
     """ 存储所有已注册的 Parser 类 """
 
+    _clients: ClassVar[dict[ClientKey, AsyncClient]] = {}
+    """ 各平台共享的 HTTP 客户端 """
+
     platform: ClassVar[Platform]
     """ 平台信息（包含名称和显示名称） """
 
@@ -162,45 +174,75 @@ class BaseParser:
             return media_type in (MediaType.IMAGE, MediaType.GRAPHICS)
         return False
 
-    @staticmethod
+    def get_client(
+        self,
+        headers: dict[str, str] | None = None,
+        *,
+        follow_redirects: bool = False,
+        verify: bool = True,
+        trust_env: bool = True,
+    ) -> AsyncClient:
+        """获取当前平台共享的 HTTP 客户端, 复用连接避免每次请求重新握手
+
+        客户端不保存 cookie, 与每次请求新建客户端的行为一致
+
+        Args:
+            headers: 默认请求头. Defaults to self.headers.
+            follow_redirects: 是否跟随重定向. Defaults to False.
+            verify: 是否校验证书. Defaults to True.
+            trust_env: 是否读取环境变量中的代理等配置. Defaults to True.
+
+        Returns:
+            AsyncClient: 共享的客户端
+        """
+        headers = self.headers if headers is None else headers
+        key = (self.platform.name, frozenset(headers.items()), follow_redirects, verify, trust_env)
+
+        client = BaseParser._clients.get(key)
+        if client is None or client.is_closed:
+            client = AsyncClient(
+                headers=headers,
+                timeout=self.timeout,
+                follow_redirects=follow_redirects,
+                verify=verify,
+                trust_env=trust_env,
+                cookies=Cookies(CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))),
+                limits=COMMON_LIMITS,
+                http2=_HTTP2_AVAILABLE,
+            )
+            BaseParser._clients[key] = client
+        return client
+
+    @classmethod
+    async def close_clients(cls):
+        """关闭所有共享的 HTTP 客户端"""
+        clients = list(BaseParser._clients.values())
+        BaseParser._clients.clear()
+        await gather(*[client.aclose() for client in clients], return_exceptions=True)
+
     async def get_redirect_url(
+        self,
         url: str,
         headers: dict[str, str] | None = None,
     ) -> str:
         """获取重定向后的 URL, 单次重定向"""
-        from httpx import AsyncClient
-
-        headers = headers or COMMON_HEADER.copy()
-        async with AsyncClient(
-            headers=headers,
-            verify=False,
-            follow_redirects=False,
-            timeout=COMMON_TIMEOUT,
-        ) as client:
-            response = await client.get(url)
-            if response.status_code >= 400:
-                response.raise_for_status()
-            return response.headers.get("Location", url)
-
-    @staticmethod
+        client = self.get_client(headers, verify=False)
+        response = await client.get(url)
+        if response.status_code >= 400:
+            response.raise_for_status()
+        return response.headers.get("Location", url)
+
     async def get_final_url(
+        self,
         url: str,
         headers: dict[str, str] | None = None,
     ) -> str:
         """获取重定向后的 URL, 允许多次重定向"""
-        from httpx import AsyncClient
-
-        headers = headers or COMMON_HEADER.copy()
-        async with AsyncClient(
-            headers=headers,
-            verify=False,
-            follow_redirects=True,
-            timeout=COMMON_TIMEOUT,
-        ) as client:
-            response = await client.get(url)
-            if response.status_code >= 400:
-                response.raise_for_status()
-            return str(response.url)
+        client = self.get_client(headers, follow_redirects=True, verify=False)
+        response = await client.get(url)
+        if response.status_code >= 400:
+            response.raise_for_status()
+        return str(response.url)
 
     def create_author(
         self,
@@ -213,12 +255,12 @@ class BaseParser:
 
         avatar_task = None
         if avatar_url:
-            avatar_task = DOWNLOADER.download_img(avatar_url, ext_headers=self.headers)
+            avatar_task = DOWNLOADER.download_img(avatar_url, ext_headers=self.headers, priority=Priority.CARD)
         return Author(name=name, avatar=avatar_task, description=description)
 
     def create_video_content(
         self,
-        url_or_task: str | Task[Path],
+        url_or_task: str | Task[Path] | LazyTask[Path],
         cover_url: str | None = None,
         duration: float = 0.0,
     ) -> VideoContent | None:
@@ -230,11 +272,13 @@ class BaseParser:
 
         cover_task = None
         if cover_url:
-            cover_task = DOWNLOADER.download_img(cover_url, ext_headers=self.headers)
+            cover_task = DOWNLOADER.download_img(cover_url, ext_headers=self.headers, priority=Priority.CARD)
+        path_task = url_or_task
         if isinstance(url_or_task, str):
-            url_or_task = DOWNLOADER.download_video(url_or_task, ext_headers=self.headers)
+            # 延迟下载, 仅发送卡片时不会下载
+            path_task = DOWNLOADER.lazy("video", url_or_task, ext_headers=self.headers)
 
-        return VideoContent(url_or_task, cover_task, duration)
+        return VideoContent(path_task, cover_task, duration)
 
     def create_image_contents(
         self,
@@ -248,8 +292,7 @@ class BaseParser:
 
         contents: list[ImageContent] = []
         for url in image_urls:
-            task = DOWNLOADER.download_img(url, ext_headers=self.headers)
-            contents.append(ImageContent(task))
+            contents.append(ImageContent(DOWNLOADER.lazy("image", url, ext_headers=self.headers)))
         return contents
 
     def create_dynamic_contents(
@@ -264,13 +307,12 @@ class BaseParser:
 
         contents: list[DynamicContent] = []
         for url in dynamic_urls:
-            task = DOWNLOADER.download_video(url, ext_headers=self.headers)
-            contents.append(DynamicContent(task))
+            contents.append(DynamicContent(DOWNLOADER.lazy("video", url, ext_headers=self.headers)))
         return contents
 
     def create_audio_content(
         self,
-        url_or_task: str | Task[Path],
+        url_or_task: str | Task[Path] | LazyTask[Path],
         duration: float = 0.0,
     ) -> AudioContent | None:
         """创建音频内容"""
@@ -279,10 +321,11 @@ class BaseParser:
 
         from .data import AudioContent
 
+        path_task = url_or_task
         if isinstance(url_or_task, str):
-            url_or_task = DOWNLOADER.download_audio(url_or_task, ext_headers=self.headers)
+            path_task = DOWNLOADER.lazy("audio", url_or_task, ext_headers=self.headers)
 
-        return AudioContent(url_or_task, duration)
+        return AudioContent(path_task, duration)
 
     def create_graphics_content(
         self,
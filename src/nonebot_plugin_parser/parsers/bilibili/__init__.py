@@ -13,8 +13,9 @@ from bilibili_api.login_v2 import QrCodeLogin, QrCodeLoginEvents
 
 from ..base import (
     DOWNLOADER,
-    BaseParser,
+    LazyTask,
     MediaType,
+    BaseParser,
     PlatformEnum,
     ParseException,
     DownloadException,
@@ -37,6 +38,7 @@ class BilibiliParser(BaseParser):
     platform: ClassVar[Platform] = Platform(name=PlatformEnum.BILIBILI, display_name="哔哩哔哩")
 
     def __init__(self):
+        super().__init__()
         self.headers = HEADERS.copy()
         self._credential: Credential | None = None
         self._cookies_file = pconfig.config_dir / "bilibili_cookies.json"
@@ -142,7 +144,7 @@ class BilibiliParser(BaseParser):
         if self.allows_media(MediaType.VIDEO):
             # 视频下载 task
             async def download_video():
-                output_path = pconfig.cache_dir / f"{video_info.bvid}-{page_num}.mp4"
+                output_path = DOWNLOADER.cache_dir / f"{video_info.bvid}-{page_num}.mp4"
                 if output_path.exists():
                     return output_path
                 v_url, a_url = await self.extract_download_urls(video=video, page_index=page_info.index)
@@ -155,7 +157,8 @@ class BilibiliParser(BaseParser):
                 else:
                     return await DOWNLOADER.streamd(v_url, file_name=output_path.name, ext_headers=self.headers)
 
-            video_task = asyncio.create_task(download_video())
+            # 仅在需要发送视频时才开始下载
+            video_task = LazyTask(lambda: asyncio.create_task(download_video()), name=f"bilibili | {url}")
             if video_content := self.create_video_content(
                 video_task,
                 cover_url,
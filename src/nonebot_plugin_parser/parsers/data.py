@@ -4,17 +4,22 @@ from pathlib import Path
 from datetime import datetime
 from dataclasses import field, dataclass
 
+from ..download.task import LazyTask, TaskOwner
 
-def repr_path_task(path_task: Path | Task[Path]) -> str:
+
+def repr_path_task(path_task: Path | Task[Path] | LazyTask[Path]) -> str:
     if isinstance(path_task, Path):
         return f"path={path_task.name}"
+    elif isinstance(path_task, LazyTask) and not path_task.started:
+        return f"lazy={path_task.get_name()}"
     else:
         return f"task={path_task.get_name()}, done={path_task.done()}"
 
 
 @dataclass(repr=False, slots=True)
 class MediaContent:
-    path_task: Path | Task[Path]
+    path_task: Path | Task[Path] | LazyTask[Path]
+    """媒体路径, 下载任务或延迟下载的媒体"""
 
     async def get_path(self) -> Path:
         if isinstance(self.path_task, Path):
@@ -22,6 +27,11 @@ class MediaContent:
         self.path_task = await self.path_task
         return self.path_task
 
+    def prefetch(self) -> None:
+        """提示即将使用该媒体, 开始延迟的下载"""
+        if isinstance(self.path_task, LazyTask):
+            self.path_task = self.path_task.start()
+
     def __repr__(self) -> str:
         prefix = self.__class__.__name__
         return f"{prefix}({repr_path_task(self.path_task)})"
@@ -158,6 +168,8 @@ class ParseResult:
     """转发的内容"""
     render_image: Path | None = None
     """渲染图片"""
+    owner: TaskOwner | None = None
+    """下载任务的所有者, 由解析处理器设置"""
 
     @property
     def header(self) -> str | None:
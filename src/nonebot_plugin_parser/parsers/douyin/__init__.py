@@ -2,11 +2,9 @@ import re
 from typing import ClassVar
 
 import msgspec
-from httpx import AsyncClient
 from nonebot import logger
 
 from ..base import (
-    COMMON_TIMEOUT,
     Platform,
     BaseParser,
     PlatformEnum,
@@ -61,16 +59,11 @@ class DouyinParser(BaseParser):
         return f"https://m.douyin.com/share/{ty}/{vid}"
 
     async def parse_video(self, url: str):
-        async with AsyncClient(
-            headers=self.ios_headers,
-            timeout=COMMON_TIMEOUT,
-            follow_redirects=False,
-            verify=False,
-        ) as client:
-            response = await client.get(url)
-            if response.status_code != 200:
-                raise ParseException(f"status: {response.status_code}")
-            text = response.text
+        client = self.get_client(self.ios_headers, verify=False)
+        response = await client.get(url)
+        if response.status_code != 200:
+            raise ParseException(f"status: {response.status_code}")
+        text = response.text
 
         pattern = re.compile(
             pattern=r"window\._ROUTER_DATA\s*=\s*(.*?)</script>",
@@ -114,9 +107,9 @@ class DouyinParser(BaseParser):
             "aweme_ids": f"[{video_id}]",
             "request_source": "200",
         }
-        async with AsyncClient(headers=self.android_headers, verify=False) as client:
-            response = await client.get(url, params=params)
-            response.raise_for_status()
+        client = self.get_client(self.android_headers, verify=False)
+        response = await client.get(url, params=params)
+        response.raise_for_status()
 
         from .slides import SlidesInfo
 
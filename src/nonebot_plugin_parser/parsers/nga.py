@@ -6,7 +6,7 @@ import asyncio
 from typing import ClassVar
 
 from bs4 import Tag, BeautifulSoup
-from httpx import HTTPError, AsyncClient
+from httpx import HTTPError
 
 from .base import Platform, BaseParser, PlatformEnum, handle
 from ..exception import ParseException
@@ -44,34 +44,34 @@ class NGAParser(BaseParser):
         tid = searched.group("tid")
         url = self.nga_url(tid)
 
-        async with AsyncClient(headers=self.headers, timeout=self.timeout, follow_redirects=True) as client:
-            try:
-                # 第一次请求可能返回403，但包含设置cookie的JavaScript
-                resp = await client.get(url)
-
-                # 如果返回403且包含guestJs cookie设置，提取cookie并重试
-                if resp.status_code == 403 and "guestJs" in resp.text:
-                    # 从JavaScript中提取guestJs cookie值
-                    cookie_match = re.search(
-                        r"document\.cookie\s*=\s*['\"]guestJs=([^;'\"]+)",
-                        resp.text,
-                    )
-                    if cookie_match:
-                        guest_js = cookie_match.group(1)
-                        # 设置cookie并重试
-                        client.cookies.set("guestJs", guest_js, domain=".178.com")
-                        # 等待一小段时间（模拟JavaScript的setTimeout）
-                        await asyncio.sleep(0.3)
-
-                        # 添加随机参数避免缓存（模拟JavaScript的行为）
-                        rand_param = random.randint(0, 999)
-                        separator = "&" if "?" in url else "?"
-                        retry_url = f"{url}{separator}rand={rand_param}"
-
-                        resp = await client.get(retry_url)
-
-            except HTTPError as e:
-                raise ParseException(f"请求失败: {e}")
+        client = self.get_client(follow_redirects=True)
+        try:
+            # 第一次请求可能返回403，但包含设置cookie的JavaScript
+            resp = await client.get(url)
+
+            # 如果返回403且包含guestJs cookie设置，提取cookie并重试
+            if resp.status_code == 403 and "guestJs" in resp.text:
+                # 从JavaScript中提取guestJs cookie值
+                cookie_match = re.search(
+                    r"document\.cookie\s*=\s*['\"]guestJs=([^;'\"]+)",
+                    resp.text,
+                )
+                if cookie_match:
+                    guest_js = cookie_match.group(1)
+                    # 共享客户端不保存 cookie, 通过请求头携带
+                    headers = {"Cookie": f"guestJs={guest_js}"}
+                    # 等待一小段时间（模拟JavaScript的setTimeout）
+                    await asyncio.sleep(0.3)
+
+                    # 添加随机参数避免缓存（模拟JavaScript的行为）
+                    rand_param = random.randint(0, 999)
+                    separator = "&" if "?" in url else "?"
+                    retry_url = f"{url}{separator}rand={rand_param}"
+
+                    resp = await client.get(retry_url, headers=headers)
+
+        except HTTPError as e:
+            raise ParseException(f"请求失败: {e}")
 
         if resp.status_code != 200:
             raise ParseException(f"无法获取页面, HTTP {resp.status_code}")
@@ -1,7 +1,7 @@
 import re
 from typing import ClassVar
 
-from .base import BaseParser, MediaType, PlatformEnum, handle
+from .base import LazyTask, BaseParser, MediaType, PlatformEnum, handle
 from .data import Author, Platform, VideoContent
 from ..download import YTDLP_DOWNLOADER
 
@@ -23,7 +23,7 @@ class TikTokParser(BaseParser):
 
         contents = []
         if self.allows_media(MediaType.VIDEO):
-            video = YTDLP_DOWNLOADER.download_video(url)
+            video = LazyTask(lambda: YTDLP_DOWNLOADER.download_video(url), name=f"ytdlp | {url}")
             video_content = self.create_video_content(
                 video,
                 video_info.thumbnail,
@@ -2,8 +2,6 @@ import re
 from typing import Any, ClassVar
 from itertools import chain
 
-from httpx import AsyncClient
-
 from .base import BaseParser, PlatformEnum, handle
 from .data import Platform, ParseResult
 from ..exception import ParseException
@@ -22,10 +20,9 @@ class TwitterParser(BaseParser):
             **self.headers,
         }
         data = {"q": url, "lang": "zh-cn"}
-        async with AsyncClient(headers=headers, timeout=self.timeout) as client:
-            url = "https://xdown.app/api/ajaxSearch"
-            response = await client.post(url, data=data)
-            return response.json()
+        url = "https://xdown.app/api/ajaxSearch"
+        response = await self.get_client().post(url, data=data, headers=headers)
+        return response.json()
 
     async def _req_oembed(self, url: str) -> dict[str, Any] | None:
         """Fetch tweet metadata via Twitter/X oEmbed (no auth)."""
@@ -35,14 +32,13 @@ class TwitterParser(BaseParser):
             **self.headers,
         }
         params = {"url": url}
-        async with AsyncClient(headers=headers, timeout=self.timeout) as client:
-            resp = await client.get("https://publish.twitter.com/oembed", params=params)
-            if resp.status_code != 200:
-                return None
-            try:
-                return resp.json()
-            except Exception:
-                return None
+        resp = await self.get_client().get("https://publish.twitter.com/oembed", params=params, headers=headers)
+        if resp.status_code != 200:
+            return None
+        try:
+            return resp.json()
+        except Exception:
+            return None
 
     @staticmethod
     def _build_avatar_url(screen_name: str) -> str:
@@ -5,7 +5,6 @@ from typing import ClassVar
 
 import msgspec
 from bs4 import Tag, BeautifulSoup
-from httpx import Cookies, AsyncClient
 
 from .base import Platform, BaseParser, PlatformEnum, ParseException, handle
 from .data import MediaContent
@@ -88,13 +87,9 @@ class WeiBoParser(BaseParser):
             "_t": int(time() * 1000),
         }
 
-        async with AsyncClient(
-            headers=self.headers,
-            timeout=self.timeout,
-        ) as client:
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            detail = msgspec.json.decode(response.content, type=Detail)
+        response = await self.get_client().get(url, params=params)
+        response.raise_for_status()
+        detail = msgspec.json.decode(response.content, type=Detail)
 
         if detail.msg != "success":
             raise ParseException("请求失败")
@@ -152,10 +147,9 @@ class WeiBoParser(BaseParser):
         }
         post_content = 'data={"Component_Play_Playinfo":{"oid":"' + fid + '"}}'
 
-        async with AsyncClient(headers=headers, timeout=self.timeout) as client:
-            response = await client.post(req_url, content=post_content)
-            response.raise_for_status()
-            json_data = response.json()
+        response = await self.get_client().post(req_url, content=post_content, headers=headers)
+        response.raise_for_status()
+        json_data = response.json()
 
         data = json_data.get("data", {}).get("Component_Play_Playinfo", {})
         if not data:
@@ -224,22 +218,16 @@ class WeiBoParser(BaseParser):
         url = f"https://m.weibo.cn/statuses/show?id={weibo_id}&_={ts}"
 
         # 关键：不带 cookie、不跟随重定向（避免二跳携 cookie）
-        async with AsyncClient(
-            headers=headers,
-            timeout=self.timeout,
-            follow_redirects=False,
-            cookies=Cookies(),
-            trust_env=False,
-        ) as client:
-            response = await client.get(url)
-            if response.status_code != 200:
-                if response.status_code in (403, 418):
-                    raise ParseException(f"被风控拦截（{response.status_code}），可尝试更换 UA/Referer 或稍后重试")
-                raise ParseException(f"获取数据失败 {response.status_code} {response.reason_phrase}")
-
-            ctype = response.headers.get("content-type", "")
-            if "application/json" not in ctype:
-                raise ParseException(f"获取数据失败 content-type is not application/json (got: {ctype})")
+        client = self.get_client(follow_redirects=False, trust_env=False)
+        response = await client.get(url, headers=headers)
+        if response.status_code != 200:
+            if response.status_code in (403, 418):
+                raise ParseException(f"被风控拦截（{response.status_code}），可尝试更换 UA/Referer 或稍后重试")
+            raise ParseException(f"获取数据失败 {response.status_code} {response.reason_phrase}")
+
+        ctype = response.headers.get("content-type", "")
+        if "application/json" not in ctype:
+            raise ParseException(f"获取数据失败 content-type is not application/json (got: {ctype})")
 
         # 用 bytes 更稳，避免编码歧义
         weibo_data = msgspec.json.decode(response.content, type=WeiboResponse).data
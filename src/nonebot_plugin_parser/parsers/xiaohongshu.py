@@ -2,7 +2,6 @@ import re
 import json
 from typing import Any, ClassVar
 
-from httpx import Cookies, AsyncClient
 from msgspec import Struct, field, convert
 from nonebot import logger
 
@@ -63,13 +62,9 @@ class XiaoHongShuParser(BaseParser):
             return await self.parse_discovery(f"https://www.xiaohongshu.com/{route}")
 
     async def parse_explore(self, url: str, xhs_id: str):
-        async with AsyncClient(
-            headers=self.headers,
-            timeout=self.timeout,
-        ) as client:
-            response = await client.get(url)
-            html = response.text
-            logger.debug(f"url: {response.url} | status_code: {response.status_code}")
+        response = await self.get_client().get(url)
+        html = response.text
+        logger.debug(f"url: {response.url} | status_code: {response.status_code}")
 
         json_obj = self._extract_initial_state_json(html)
 
@@ -136,15 +131,9 @@ class XiaoHongShuParser(BaseParser):
         )
 
     async def parse_discovery(self, url: str):
-        async with AsyncClient(
-            headers=self.ios_headers,
-            timeout=self.timeout,
-            follow_redirects=True,
-            cookies=Cookies(),
-            trust_env=False,
-        ) as client:
-            response = await client.get(url)
-            html = response.text
+        client = self.get_client(self.ios_headers, follow_redirects=True, trust_env=False)
+        response = await client.get(url)
+        html = response.text
 
         json_obj = self._extract_initial_state_json(html)
         note_data = json_obj.get("noteData")
@@ -3,9 +3,8 @@ from pathlib import Path
 from typing import ClassVar
 
 import msgspec
-from httpx import AsyncClient
 
-from .base import Platform, BaseParser, MediaType, PlatformEnum, handle, pconfig
+from .base import LazyTask, Platform, BaseParser, MediaType, PlatformEnum, handle, pconfig
 from .cookie import save_cookies_with_netscape
 from ..download import YTDLP_DOWNLOADER
 
@@ -75,7 +74,7 @@ class YouTubeParser(BaseParser):
         contents = []
         can_download_video = video_info.duration <= pconfig.duration_maximum and self.allows_media(MediaType.VIDEO)
         if can_download_video:
-            video = YTDLP_DOWNLOADER.download_video(url, self.cookies_file)
+            video = LazyTask(lambda: YTDLP_DOWNLOADER.download_video(url, self.cookies_file), name=f"ytdlp | {url}")
             if video_content := self.create_video_content(video, video_info.thumbnail, video_info.duration):
                 contents.append(video_content)
         else:
@@ -105,7 +104,9 @@ class YouTubeParser(BaseParser):
         contents.extend(self.create_image_contents([video_info.thumbnail]))
 
         if video_info.duration <= pconfig.duration_maximum and self.allows_media(MediaType.AUDIO):
-            audio_task = YTDLP_DOWNLOADER.download_audio(url, self.cookies_file)
+            audio_task = LazyTask(
+                lambda: YTDLP_DOWNLOADER.download_audio(url, self.cookies_file), name=f"ytdlp | {url}"
+            )
             if audio_content := self.create_audio_content(audio_task, duration=video_info.duration):
                 contents.append(audio_content)
 
@@ -139,9 +140,8 @@ class YouTubeParser(BaseParser):
             },
             "browseId": channel_id,
         }
-        async with AsyncClient(headers=self.headers, timeout=self.timeout) as client:
-            response = await client.post(url, json=payload)
-            response.raise_for_status()
+        response = await self.get_client().post(url, json=payload)
+        response.raise_for_status()
 
         browse = msgspec.json.decode(response.content, type=BrowseResponse)
         return self.create_author(browse.name, browse.avatar_url, browse.description)
@@ -1,22 +1,67 @@
 import uuid
+import asyncio
+import hashlib
 from abc import ABC, abstractmethod
 from typing import Any, ClassVar
+from asyncio import Task
 from pathlib import Path
+from weakref import WeakSet
 from itertools import chain
 from collections.abc import AsyncGenerator
 from typing_extensions import override
 
+import msgspec
+from nonebot import logger
+
+from .cache import CARD_CACHE
+from ..utils import file_digest
 from ..config import pconfig
 from ..helper import UniHelper, UniMessage, ForwardNodeInner
 from ..parsers import (
     ParseResult,
     AudioContent,
     ImageContent,
+    MediaContent,
     VideoContent,
     DynamicContent,
     GraphicsContent,
 )
+from ..constants import DeliveryMode
 from ..exception import DownloadException, ZeroSizeException, DownloadLimitException
+from ..download.task import LazyTask
+
+_TIMED_OUT: WeakSet[Task[Path]] = WeakSet()
+"""已超过截止时间的下载任务, 计算指纹和绘制时不再重复等待"""
+
+
+async def wait_path(path_task: Path | Task[Path] | LazyTask[Path] | None, timeout: float) -> Path | None:
+    """在截止时间内等待媒体下载, 超时或失败返回 None, 下载任务不会因超时被取消"""
+    if path_task is None or isinstance(path_task, Path):
+        return path_task
+    if isinstance(path_task, LazyTask):
+        path_task = path_task.start()
+    if path_task in _TIMED_OUT and not path_task.done():
+        return None
+    try:
+        # shield: 超时不取消下载, 后续发送媒体内容时仍可使用
+        return await asyncio.wait_for(asyncio.shield(path_task), timeout)
+    except asyncio.TimeoutError:
+        _TIMED_OUT.add(path_task)
+        logger.debug(f"媒体下载超时 {timeout}s, 跳过绘制: {path_task.get_name()}")
+    except Exception:
+        pass
+    return None
+
+
+def sniff_image_suffix(raw: bytes) -> str:
+    """根据文件头判断图片后缀"""
+    if raw.startswith(b"\xff\xd8\xff"):
+        return ".jpg"
+    if raw[:4] == b"RIFF" and raw[8:12] == b"WEBP":
+        return ".webp"
+    if raw.startswith((b"GIF87a", b"GIF89a")):
+        return ".gif"
+    return ".png"
 
 
 class BaseRenderer(ABC):
@@ -51,11 +96,28 @@ class BaseRenderer(ABC):
         if pconfig.only_send_card:
             return
 
+        contents = list(chain(result.contents, result.repost.contents if result.repost else ()))
+        # 所有内容并发下载, 按顺序发送时不会逐项等待
+        for cont in contents:
+            cont.prefetch()
+        if pconfig.delivery_mode is DeliveryMode.completion:
+            messages = self._render_contents_by_completion(result, contents)
+        else:
+            messages = self._render_contents_in_order(result, contents)
+        async for message in messages:
+            yield message
+
+    async def _render_contents_in_order(
+        self,
+        result: ParseResult,
+        contents: list[MediaContent],
+    ) -> AsyncGenerator[UniMessage[Any], None]:
+        """按内容顺序发送, 图片类内容在最后合并发送"""
         failed_count = 0
         forwardable_segs: list[ForwardNodeInner] = []
         dynamic_segs: list[ForwardNodeInner] = []
 
-        for cont in chain(result.contents, result.repost.contents if result.repost else ()):
+        for cont in contents:
             try:
                 path = await cont.get_path()
             # 继续渲染其他内容, 类似之前 gather (return_exceptions=True) 的处理
@@ -67,41 +129,136 @@ class BaseRenderer(ABC):
                 failed_count += 1
                 continue
 
-            match cont:
-                case VideoContent():
-                    yield UniMessage(UniHelper.video_seg(path))
-                case AudioContent():
-                    yield UniMessage(UniHelper.record_seg(path))
-                case ImageContent():
-                    forwardable_segs.append(UniHelper.img_seg(path))
-                case DynamicContent():
-                    dynamic_segs.append(UniHelper.video_seg(path))
-                case GraphicsContent() as graphics:
-                    graphics_msg = UniHelper.img_seg(path)
-                    if graphics.text is not None:
-                        graphics_msg = graphics.text + graphics_msg
-                    if graphics.alt is not None:
-                        graphics_msg = graphics_msg + graphics.alt
-                    forwardable_segs.append(graphics_msg)
+            if (message := await self._collect_content(cont, path, forwardable_segs, dynamic_segs)) is not None:
+                yield message
 
         if forwardable_segs:
             if result.text:
                 forwardable_segs.append(result.text)
+            for message in self._forward_messages(forwardable_segs, dynamic_segs):
+                yield message
 
-            if pconfig.need_forward_contents or len(forwardable_segs) > 4:
-                forward_msg = UniHelper.construct_forward_message(forwardable_segs + dynamic_segs)
-                yield UniMessage(forward_msg)
+        if failed_count > 0:
+            message = f"{failed_count} 项媒体下载失败"
+            yield UniMessage(message)
+            raise DownloadException(message)
+
+    async def _render_contents_by_completion(
+        self,
+        result: ParseResult,
+        contents: list[MediaContent],
+    ) -> AsyncGenerator[UniMessage[Any], None]:
+        """按下载完成顺序发送, 视频, 音频下载完成即发送,
+        图片类内容攒够 parser_forward_quorum 项, 或首项完成后超过 parser_forward_deadline 秒时合并发送
+        """
+        loop = asyncio.get_running_loop()
+        quorum, deadline = pconfig.forward_quorum, pconfig.forward_deadline
+
+        ready: list[tuple[int, MediaContent]] = []
+        pending: dict[Task[Path], list[tuple[int, MediaContent]]] = {}
+        for idx, cont in enumerate(contents):
+            if isinstance(cont.path_task, Task) and not cont.path_task.done():
+                pending.setdefault(cont.path_task, []).append((idx, cont))
             else:
-                yield UniMessage(forwardable_segs)
+                ready.append((idx, cont))
+
+        failed_count = 0
+        text_sent = False
+        batch_started_at: float | None = None
+        forwardable: list[tuple[int, ForwardNodeInner]] = []
+        dynamic: list[tuple[int, ForwardNodeInner]] = []
+
+        while ready or pending:
+            if not ready:
+                timeout = None if batch_started_at is None else max(0, batch_started_at + deadline - loop.time())
+                # asyncio.wait 超时不会取消下载任务
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    ready.extend(pending.pop(task))
+
+            for idx, cont in sorted(ready, key=lambda item: item[0]):
+                try:
+                    path = await cont.get_path()
+                except (DownloadLimitException, ZeroSizeException):
+                    continue
+                except DownloadException:
+                    failed_count += 1
+                    continue
+
+                forwardable_segs: list[ForwardNodeInner] = []
+                dynamic_segs: list[ForwardNodeInner] = []
+                if (message := await self._collect_content(cont, path, forwardable_segs, dynamic_segs)) is not None:
+                    yield message
+                    continue
+                forwardable.extend((idx, seg) for seg in forwardable_segs)
+                dynamic.extend((idx, seg) for seg in dynamic_segs)
+                if batch_started_at is None:
+                    batch_started_at = loop.time()
+            ready.clear()
+
+            if batch_started_at is None:
+                continue
+            if len(forwardable) + len(dynamic) < quorum and pending and loop.time() < batch_started_at + deadline:
+                continue
 
-                if dynamic_segs:
-                    yield UniMessage(UniHelper.construct_forward_message(dynamic_segs))
+            forwardable_segs = [seg for _, seg in sorted(forwardable, key=lambda item: item[0])]
+            dynamic_segs = [seg for _, seg in sorted(dynamic, key=lambda item: item[0])]
+            if forwardable_segs and result.text and not text_sent:
+                forwardable_segs.append(result.text)
+                text_sent = True
+            for message in self._forward_messages(forwardable_segs, dynamic_segs):
+                yield message
+            forwardable.clear()
+            dynamic.clear()
+            batch_started_at = None
 
         if failed_count > 0:
             message = f"{failed_count} 项媒体下载失败"
             yield UniMessage(message)
             raise DownloadException(message)
 
+    @staticmethod
+    async def _collect_content(
+        cont: MediaContent,
+        path: Path,
+        forwardable_segs: list[ForwardNodeInner],
+        dynamic_segs: list[ForwardNodeInner],
+    ) -> UniMessage[Any] | None:
+        """视频, 音频返回单独发送的消息, 图片类内容加入待合并发送的列表"""
+        match cont:
+            case VideoContent():
+                return UniMessage(await UniHelper.video_seg(path))
+            case AudioContent():
+                return UniMessage(await UniHelper.record_seg(path))
+            case ImageContent():
+                forwardable_segs.append(await UniHelper.img_seg(path))
+            case DynamicContent():
+                dynamic_segs.append(await UniHelper.video_seg(path))
+            case GraphicsContent() as graphics:
+                graphics_msg = await UniHelper.img_seg(path)
+                if graphics.text is not None:
+                    graphics_msg = graphics.text + graphics_msg
+                if graphics.alt is not None:
+                    graphics_msg = graphics_msg + graphics.alt
+                forwardable_segs.append(graphics_msg)
+        return None
+
+    @staticmethod
+    def _forward_messages(
+        forwardable_segs: list[ForwardNodeInner],
+        dynamic_segs: list[ForwardNodeInner],
+    ) -> list[UniMessage[Any]]:
+        """合并图片类内容, 数量较多或配置需要时使用合并转发"""
+        if pconfig.need_forward_contents or len(forwardable_segs) > 4:
+            return [UniMessage(UniHelper.construct_forward_message(forwardable_segs + dynamic_segs))]
+
+        messages: list[UniMessage[Any]] = []
+        if forwardable_segs:
+            messages.append(UniMessage(forwardable_segs))
+        if dynamic_segs:
+            messages.append(UniMessage(UniHelper.construct_forward_message(dynamic_segs)))
+        return messages
+
     @property
     def append_url(self) -> bool:
         return pconfig.append_url
@@ -110,6 +267,9 @@ class BaseRenderer(ABC):
 class ImageRenderer(BaseRenderer):
     """图片渲染器"""
 
+    CARD_CACHE_VERSION: ClassVar[int] = 2
+    """卡片样式变更时递增, 使旧的卡片缓存失效"""
+
     @abstractmethod
     async def render_image(self, result: ParseResult) -> bytes:
         """渲染图片
@@ -118,7 +278,7 @@ class ImageRenderer(BaseRenderer):
             result (ParseResult): 解析结果
 
         Returns:
-            bytes: 图片字节 png 格式
+            bytes: 图片字节, png/jpeg/webp 格式
         """
         raise NotImplementedError
 
@@ -152,14 +312,103 @@ class ImageRenderer(BaseRenderer):
         Returns:
             Image: 图片 Segment
         """
-        if result.render_image is None:
-            image_raw = await self.render_image(result)
-            image_path = await self.save_img(image_raw)
-            result.render_image = image_path
-            if pconfig.use_base64:
-                return UniHelper.img_seg(raw=image_raw)
-
-        return UniHelper.img_seg(result.render_image)
+        image_raw: bytes | None = None
+        # 渲染图片可能已被缓存淘汰
+        if result.render_image is None or not result.render_image.exists():
+            self.prefetch_card_media(result)
+            key = await self.render_key(result)
+            if key is not None and (cached := CARD_CACHE.get(key)) is not None:
+                result.render_image = cached
+            else:
+                image_raw = await self.render_image(result)
+                if key is None:
+                    result.render_image = await self.save_img(image_raw)
+                else:
+                    result.render_image = await CARD_CACHE.put(key, image_raw, sniff_image_suffix(image_raw))
+
+        if pconfig.use_base64 and image_raw is not None:
+            # 直接复用已编码的图片
+            return await UniHelper.img_seg(raw=image_raw)
+        return await UniHelper.img_seg(result.render_image)
+
+    def render_options(self) -> tuple[Any, ...]:
+        """影响卡片外观的配置项, 参与卡片缓存指纹"""
+        return ()
+
+    def card_contents(self, result: ParseResult) -> list[MediaContent]:
+        """卡片中绘制的媒体内容, 其余内容在发送时才下载"""
+        return [*result.img_contents, *result.graphics_contents]
+
+    def prefetch_card_media(self, result: ParseResult) -> None:
+        """开始下载卡片所需的媒体, 包括转发内容"""
+        for cont in self.card_contents(result):
+            cont.prefetch()
+        if result.repost:
+            self.prefetch_card_media(result.repost)
+
+    async def render_key(self, result: ParseResult) -> str | None:
+        """计算卡片输入的指纹, 相同指纹的卡片只绘制一次
+
+        指纹包含渲染器类型, 渲染配置, 文本字段以及卡片图片的内容哈希,
+        下载超时或失败的图片记为缺失。计算失败返回 None, 不使用缓存
+        """
+        try:
+            fingerprint = [
+                type(self).__qualname__,
+                self.CARD_CACHE_VERSION,
+                self.render_options(),
+                await self._fingerprint(result),
+            ]
+            raw = msgspec.json.encode(fingerprint, enc_hook=str, order="sorted")
+        except Exception as e:
+            logger.debug(f"计算卡片指纹失败: {e}")
+            return None
+        return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+    async def _fingerprint(self, result: ParseResult) -> list[Any]:
+        avatar = result.author.avatar if result.author else None
+        covers = [cont.cover for cont in result.video_contents]
+        images = [cont.path_task for cont in self.card_contents(result)]
+
+        media_timeout = pconfig.render_media_timeout
+        paths = await asyncio.gather(
+            wait_path(avatar, pconfig.render_avatar_timeout),
+            *[wait_path(path_task, media_timeout) for path_task in covers + images],
+        )
+        digests = await asyncio.gather(*[self._media_digest(path) for path in paths])
+
+        contents: list[Any] = []
+        for cont in result.contents:
+            match cont:
+                case VideoContent() | AudioContent():
+                    contents.append((type(cont).__name__, cont.duration))
+                case GraphicsContent():
+                    contents.append((type(cont).__name__, cont.text, cont.alt))
+                case _:
+                    contents.append(type(cont).__name__)
+
+        return [
+            result.platform.name,
+            result.author.name if result.author else None,
+            result.author.description if result.author else None,
+            result.title,
+            result.text,
+            result.timestamp,
+            result.url,
+            result.extra,
+            contents,
+            digests,
+            await self._fingerprint(result.repost) if result.repost else None,
+        ]
+
+    @staticmethod
+    async def _media_digest(path: Path | None) -> str | None:
+        if path is None:
+            return None
+        try:
+            return await asyncio.to_thread(file_digest, path)
+        except OSError:
+            return None
 
     @classmethod
     async def save_img(cls, raw: bytes) -> Path:
@@ -169,11 +418,11 @@ class ImageRenderer(BaseRenderer):
             raw (bytes): 图片字节
 
         Returns:
-            Path: 图片路径
+            Path: 图片路径, 后缀与图片格式一致
         """
         import aiofiles
 
-        file_name = f"{uuid.uuid4().hex}.png"
+        file_name = f"{uuid.uuid4().hex}{sniff_image_suffix(raw)}"
         image_path = pconfig.cache_dir / file_name
         async with aiofiles.open(image_path, "wb+") as f:
             await f.write(raw)
@@ -0,0 +1,76 @@
+"""渲染卡片缓存: 按输入内容的指纹保存渲染结果"""
+
+import os
+import asyncio
+import threading
+from pathlib import Path
+
+from ..config import pconfig
+from ..download.evict import CacheEvictor
+
+CARD_SUFFIXES: tuple[str, ...] = (".png", ".jpg", ".webp", ".gif")
+"""卡片图片可能的后缀"""
+
+
+class CardCache:
+    """渲染卡片的磁盘缓存
+
+    文件名为输入指纹, 相同内容的帖子只绘制一次, 重启后仍可复用;
+    使用独立的预算按最近使用时间淘汰
+    """
+
+    def __init__(self, root: Path, *, max_size: int, min_age: float):
+        """
+        Args:
+            root (Path): 缓存目录
+            max_size (int): 预算 单位: 字节
+            min_age (float): 最短保留时间 单位: 秒
+        """
+        self.root = root
+        self.evictor = CacheEvictor(root, max_size=max_size, min_age=min_age)
+
+    def get(self, key: str) -> Path | None:
+        """获取指纹对应的卡片, 命中时刷新最近使用时间"""
+        for suffix in CARD_SUFFIXES:
+            path = self.root / f"{key}{suffix}"
+            if path.exists():
+                self.evictor.touch(path)
+                return path
+        return None
+
+    async def put(self, key: str, raw: bytes, suffix: str) -> Path:
+        """保存卡片
+
+        Args:
+            key (str): 输入指纹
+            raw (bytes): 图片字节
+            suffix (str): 图片后缀
+
+        Returns:
+            Path: 卡片路径
+        """
+        path = self.root / f"{key}{suffix}"
+        await asyncio.to_thread(self._write, path, raw)
+        return path
+
+    async def evict(self) -> int:
+        """执行一次淘汰
+
+        Returns:
+            int: 释放的字节数
+        """
+        return await self.evictor.evict()
+
+    def _write(self, path: Path, raw: bytes) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.part")
+        tmp_path.write_bytes(raw)
+        os.replace(tmp_path, path)
+
+
+CARD_CACHE = CardCache(
+    pconfig.cache_dir / "cards",
+    max_size=pconfig.card_cache_max_size * 1024 * 1024,
+    min_age=pconfig.cache_min_age,
+)
+"""渲染卡片缓存"""
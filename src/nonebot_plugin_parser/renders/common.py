@@ -1,21 +1,29 @@
+import asyncio
 from io import BytesIO
-from typing import TypeVar, ClassVar, ParamSpec
+from bisect import bisect_right
+from copy import copy
+from typing import Any, TypeVar, ClassVar, ParamSpec
 from pathlib import Path
-from functools import wraps, lru_cache
-from dataclasses import dataclass
+from functools import wraps, partial, lru_cache
+from itertools import accumulate
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import field, dataclass
 from collections.abc import Callable, Awaitable
 from unicodedata import category as _uc_category
-from typing_extensions import override
+from typing_extensions import Self, override
 
 import emoji
 from PIL import Image, ImageDraw, ImageFont
 from nonebot import logger
-from apilmoji import Apilmoji, EmojiCDNSource
 from apilmoji.core import get_font_height
 
-from .base import ParseResult, ImageRenderer
+from .base import ParseResult, ImageRenderer, wait_path
+from .glyphs import BMP_SIZE, GlyphTable, check_glyph, text_length
 from ..config import pconfig
-from ..parsers import GraphicsContent
+from ..parsers import MediaContent, GraphicsContent
+from .thumbnail import THUMBNAIL_CACHE
+from ..constants import CardFormat
+from .emoji_atlas import EMOJI_ATLAS, EmojiAtlas
 
 # 定义类型变量
 P = ParamSpec("P")
@@ -63,6 +71,32 @@ def suppress_exception_async(
     return wrapper
 
 
+_RENDER_EXECUTOR = ThreadPoolExecutor(max_workers=pconfig.render_workers, thread_name_prefix="parser-render")
+"""渲染线程池, PIL 的解码, 缩放, 编码会释放 GIL"""
+
+
+async def run_in_render_pool(func: Callable[P, T], *args: P.args, **kwargs: P.kwargs) -> T:
+    """在渲染线程池中执行 CPU 密集的 PIL 操作, 避免阻塞事件循环"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_RENDER_EXECUTOR, partial(func, *args, **kwargs))
+
+
+REDUCING_GAP = 2.0
+"""缩放大图时先按整数倍 reduce 再 LANCZOS, 对应 resize 的 reducing_gap"""
+
+
+def draft_for(img: PILImage, size: tuple[int, int]) -> None:
+    """按目标尺寸解码, 必须在图片加载前调用
+
+    JPEG 使用 DCT 缩放直接解码出不小于目标尺寸的图片(最多 1/8), 其他格式无操作
+    """
+    img.draft(None, (max(1, size[0]), max(1, size[1])))
+
+
+_NO_LINE_START = frozenset("，。！？；：、）】》〉」』〕〗〙〛…—·,.;:!?)]}")
+"""不能作为行首的标点符号"""
+
+
 @dataclass(eq=False, frozen=True, slots=True)
 class FontInfo:
     """字体信息数据类"""
@@ -71,6 +105,8 @@ class FontInfo:
     fill: Color
     line_height: int
     cjk_width: int
+    glyphs: GlyphTable | None = None
+    """BMP 字符宽度及覆盖位图"""
 
     def __hash__(self) -> int:
         """实现哈希方法以支持 @lru_cache"""
@@ -79,31 +115,28 @@ class FontInfo:
     @lru_cache(maxsize=400)
     def get_char_width(self, char: str) -> int:
         """获取字符宽度，使用缓存优化"""
-        return int(self.font.getlength(char, direction="ltr"))
+        return text_length(self.font, char)
 
-    @lru_cache(maxsize=4000)
     def has_glyph(self, char: str) -> bool:
-        """Best-effort check whether current font can render the glyph.
+        """字体是否支持该字符, BMP 字符查覆盖位图
 
         Whitespace/control characters are treated as supported.
         """
-        if not char:
-            return True
-        if char.isspace():
-            return True
-        if _uc_category(char).startswith("C"):
-            return True
-        try:
-            return self.font.getmask(char).getbbox() is not None
-        except Exception:
-            return True
+        if self.glyphs is not None and len(char) == 1 and (code := ord(char)) < BMP_SIZE:
+            return self.glyphs.covered(code)
+        return self._check_glyph(char)
+
+    @lru_cache(maxsize=4000)
+    def _check_glyph(self, char: str) -> bool:
+        return check_glyph(self.font, char)
 
     def get_char_width_fast(self, char: str) -> int:
         """快速获取单个字符宽度"""
         if "\u4e00" <= char <= "\u9fff":
             return self.cjk_width
-        else:
-            return self.get_char_width(char)
+        if self.glyphs is not None and len(char) == 1 and (code := ord(char)) < BMP_SIZE:
+            return self.glyphs.width(code)
+        return self.get_char_width(char)
 
     def get_text_width(self, text: str) -> int:
         """计算文本宽度，使用预计算的字符宽度优化性能
@@ -117,10 +150,7 @@ class FontInfo:
         if not text:
             return 0
 
-        total_width = 0
-        for char in text:
-            total_width += self.get_char_width_fast(char)
-        return total_width
+        return sum(map(self.get_char_width_fast, text))
 
 
 @dataclass(eq=False, frozen=True, slots=True)
@@ -143,9 +173,17 @@ class FontSet:
     indicator: FontInfo
 
     @classmethod
-    def new(cls, font_path: Path):
+    def new(cls, font_path: Path, glyphs_dir: Path | None = None, scale: float = 1.0):
+        """加载字体
+
+        Args:
+            font_path: 字体文件路径
+            glyphs_dir: 字形表缓存目录, 为 None 时不使用字形表
+            scale: 字号缩放比例
+        """
         font_infos: dict[str, FontInfo] = {}
         for name, size, fill in cls._FONT_INFOS:
+            size = round(size * scale)
             font = ImageFont.truetype(font_path, size)
             height = get_font_height(font)
             font_infos[name] = FontInfo(
@@ -153,6 +191,7 @@ class FontSet:
                 fill=fill,
                 line_height=height,
                 cjk_width=size,
+                glyphs=GlyphTable.load(font, font_path, glyphs_dir) if glyphs_dir else None,
             )
         return FontSet(**font_infos)
 
@@ -229,6 +268,16 @@ class GraphicsSectionData(SectionData):
     alt_text: str | None = None
 
 
+@dataclass(slots=True)
+class CardMedia:
+    """卡片所需的媒体路径, 超时或下载失败时为 None"""
+
+    avatar: Path | None = None
+    cover: Path | None = None
+    images: list[Path | None] = field(default_factory=list)
+    graphics: list[Path | None] = field(default_factory=list)
+
+
 @dataclass
 class RenderContext:
     """渲染上下文，存储渲染过程中的状态信息"""
@@ -273,6 +322,8 @@ class CommonRenderer(ImageRenderer):
     """名称和时间之间的间距"""
     AVATAR_UPSCALE_FACTOR = 2
     """头像圆形框超采样倍数"""
+    VIDEO_BUTTON_SIZE = 128
+    """视频播放按钮大小"""
 
     # 图片处理配置
     MIN_COVER_WIDTH = 300
@@ -297,9 +348,31 @@ class CommonRenderer(ImageRenderer):
     """转发内容内边距"""
     REPOST_SCALE = 0.88
     """转发缩放比例"""
+    SCALE = 1.0
+    """当前绘制的缩放比例, 转发内容使用缩放后的渲染器直接按目标尺寸绘制"""
+    _SCALED_ATTRS: ClassVar[tuple[str, ...]] = (
+        "PADDING",
+        "AVATAR_SIZE",
+        "AVATAR_TEXT_GAP",
+        "MAX_COVER_WIDTH",
+        "MAX_COVER_HEIGHT",
+        "DEFAULT_CARD_WIDTH",
+        "MIN_CARD_WIDTH",
+        "SECTION_SPACING",
+        "NAME_TIME_GAP",
+        "VIDEO_BUTTON_SIZE",
+        "MIN_COVER_WIDTH",
+        "MIN_COVER_HEIGHT",
+        "MAX_IMAGE_HEIGHT",
+        "IMAGE_3_GRID_SIZE",
+        "IMAGE_2_GRID_SIZE",
+        "IMAGE_GRID_SPACING",
+    )
+    """随缩放比例缩放的尺寸"""
+    _SCALED_RESOURCES: ClassVar[dict[float, tuple[FontSet, PILImage]]] = {}
+    """各缩放比例的字体集及视频按钮"""
 
     # 资源名称
-    _EMOJIS = "emojis"
     _RESOURCES = "resources"
     _BUTTON_FILENAME = "media_button.png"
     _FONT_FILENAME = "HYSongYunLangHeiW-1.ttf"
@@ -319,13 +392,8 @@ class CommonRenderer(ImageRenderer):
     """默认字体路径"""
     DEFAULT_VIDEO_BUTTON_PATH: ClassVar[Path] = RESOURCES_DIR / _BUTTON_FILENAME
     """默认视频按钮路径"""
-    EMOJI_SOURCE: ClassVar[EmojiCDNSource] = EmojiCDNSource(
-        base_url=pconfig.emoji_cdn,
-        style=pconfig.emoji_style,
-        cache_dir=pconfig.cache_dir / _EMOJIS,
-        enable_tqdm=True,
-    )
-    """Emoji Source"""
+    EMOJI_ATLAS: ClassVar[EmojiAtlas] = EMOJI_ATLAS
+    """本地 emoji 图集"""
 
     @classmethod
     def load_resources(cls):
@@ -333,6 +401,8 @@ class CommonRenderer(ImageRenderer):
         cls._load_fonts()
         cls._load_video_button()
         cls._load_platform_logos()
+        # 转发卡片使用的字体集, 首次生成字形表较慢, 在启动时加载
+        cls._load_scaled_resources(cls.REPOST_SCALE)
 
     @classmethod
     def _load_fonts(cls):
@@ -340,7 +410,8 @@ class CommonRenderer(ImageRenderer):
 
         font_path = pconfig.custom_font or cls.DEFAULT_FONT_PATH
         # 创建 FontSet 对象
-        cls.fontset = FontSet.new(font_path)
+        cls.fontset = FontSet.new(font_path, pconfig.cache_dir / "fonts")
+        cls._SCALED_RESOURCES.clear()
         logger.success(f"加载字体「{font_path.name}」成功")
 
     @classmethod
@@ -354,6 +425,17 @@ class CommonRenderer(ImageRenderer):
         alpha = alpha.point(lambda x: int(x * 0.3))  # 将透明度设置为 30%
         cls.video_button_image.putalpha(alpha)
 
+    @classmethod
+    def _load_scaled_resources(cls, scale: float) -> tuple[FontSet, PILImage]:
+        """加载缩放后的字体集及视频按钮, 按比例缓存"""
+        if (resources := cls._SCALED_RESOURCES.get(scale)) is None:
+            font_path = pconfig.custom_font or cls.DEFAULT_FONT_PATH
+            fontset = FontSet.new(font_path, pconfig.cache_dir / "fonts", scale)
+            button_size = round(cls.VIDEO_BUTTON_SIZE * scale)
+            button = cls.video_button_image.resize((button_size, button_size), Image.Resampling.LANCZOS)
+            resources = cls._SCALED_RESOURCES[scale] = (fontset, button)
+        return resources
+
     @classmethod
     def _load_platform_logos(cls):
         """预加载平台 logo"""
@@ -378,9 +460,8 @@ class CommonRenderer(ImageRenderer):
         if emosvg is not None:
             emosvg.text(ctx.image, xy, lines, font.font, fill=font.fill, line_height=font.line_height)
         else:
-            await Apilmoji.text(
-                ctx.image, xy, lines, font.font, fill=font.fill, line_height=font.line_height, source=cls.EMOJI_SOURCE
-            )
+            # emoji 已在绘制前预取, 此处不访问网络
+            cls.EMOJI_ATLAS.text(ctx.image, xy, lines, font.font, fill=font.fill, line_height=font.line_height)
         return font.line_height * len(lines)
 
     @staticmethod
@@ -402,14 +483,67 @@ class CommonRenderer(ImageRenderer):
             result: 解析结果
 
         Returns:
-            PNG 图片的字节数据，如果没有足够的内容则返回 None
+            图片的字节数据, 格式由 parser_card_format 决定
         """
         # 调用内部方法生成图片
         image = await self._create_card_image(result)
 
         # 将图片转换为字节
+        card_format = pconfig.card_format
+        if card_format is CardFormat.auto:
+            card_format = CardFormat.jpeg if self._has_photo(result) else CardFormat.png8
+        return await run_in_render_pool(self._encode_image, image, card_format)
+
+    @override
+    def render_options(self) -> tuple[Any, ...]:
+        font_path = pconfig.custom_font or self.DEFAULT_FONT_PATH
+        return (
+            font_path.name,
+            pconfig.emoji_style,
+            pconfig.card_format,
+            pconfig.card_quality,
+            pconfig.card_compress_level,
+        )
+
+    @override
+    def card_contents(self, result: ParseResult) -> list[MediaContent]:
+        return [*result.img_contents[: self.MAX_IMAGES_DISPLAY], *result.graphics_contents]
+
+    def scaled(self, scale: float) -> Self:
+        """按比例缩放尺寸及字体的渲染器, 绘制结果与先绘制再整体缩放一致, 但只绘制一次
+
+        Args:
+            scale: 相对当前渲染器的缩放比例
+        """
+        renderer = copy(self)
+        renderer.SCALE = round(self.SCALE * scale, 4)
+        for name in self._SCALED_ATTRS:
+            setattr(renderer, name, max(1, round(getattr(type(self), name) * renderer.SCALE)))
+        renderer.fontset, renderer.video_button_image = self._load_scaled_resources(renderer.SCALE)
+        return renderer
+
+    @classmethod
+    def _has_photo(cls, result: ParseResult) -> bool:
+        """卡片中是否包含照片类内容"""
+        if result.video_contents or result.img_contents or result.graphics_contents:
+            return True
+        return result.repost is not None and cls._has_photo(result.repost)
+
+    @staticmethod
+    def _encode_image(image: PILImage, card_format: CardFormat) -> bytes:
+        """按指定格式编码卡片"""
         output = BytesIO()
-        image.save(output, format="PNG")
+        match card_format:
+            case CardFormat.jpeg:
+                image.save(output, format="JPEG", quality=pconfig.card_quality, subsampling=0)
+            case CardFormat.webp:
+                image.save(output, format="WEBP", quality=pconfig.card_quality, method=4)
+            case CardFormat.png8:
+                # 纯文本卡片颜色少, 量化到 256 色几乎无损
+                image = image.quantize(colors=256, method=Image.Quantize.FASTOCTREE)
+                image.save(output, format="PNG", compress_level=pconfig.card_compress_level)
+            case _:
+                image.save(output, format="PNG", compress_level=pconfig.card_compress_level)
         return output.getvalue()
 
     async def _create_card_image(
@@ -432,6 +566,8 @@ class CommonRenderer(ImageRenderer):
 
         # 计算各部分内容的高度
         sections = await self._calculate_sections(result, content_width)
+        if emosvg is None:
+            await self.EMOJI_ATLAS.prefetch(self._section_texts(sections))
 
         # 计算总高度
         card_height = sum(section.height for section in sections)
@@ -459,6 +595,22 @@ class CommonRenderer(ImageRenderer):
         await self._draw_sections(ctx, sections)
         return image
 
+    @staticmethod
+    def _section_texts(sections: list[SectionData]) -> list[str]:
+        """需要绘制 emoji 的文本"""
+        texts: list[str] = []
+        for section in sections:
+            match section:
+                case HeaderSectionData():
+                    texts.append(section.name)
+                    if section.time:
+                        texts.append(section.time)
+                case TitleSectionData() | TextSectionData() | ExtraSectionData():
+                    texts.extend(section.lines)
+                case GraphicsSectionData():
+                    texts.extend(section.text_lines)
+        return texts
+
     @suppress_exception
     def _load_and_resize_cover(
         self,
@@ -474,7 +626,24 @@ class CommonRenderer(ImageRenderer):
         if not cover_path or not cover_path.exists():
             return None
 
+        return THUMBNAIL_CACHE.get_or_create(
+            cover_path,
+            "cover",
+            (content_width, self.MAX_COVER_HEIGHT),
+            lambda: self._resize_cover(cover_path, content_width),
+        )
+
+    def _resize_cover(self, cover_path: Path, content_width: int) -> PILImage:
+        """解码并缩放封面"""
         with Image.open(cover_path) as original_img:
+            # 按缩放后的尺寸解码
+            draft_width = content_width
+            draft_height = int(original_img.height * content_width / original_img.width)
+            if draft_height > self.MAX_COVER_HEIGHT:
+                draft_width = int(draft_width * self.MAX_COVER_HEIGHT / draft_height)
+                draft_height = self.MAX_COVER_HEIGHT
+            draft_for(original_img, (draft_width, draft_height))
+
             # 转换为 RGB 模式以确保兼容性
             if original_img.mode not in ("RGB", "RGBA"):
                 cover_img = original_img.convert("RGB")
@@ -500,6 +669,7 @@ class CommonRenderer(ImageRenderer):
                 cover_img = cover_img.resize(
                     (new_width, new_height),
                     Image.Resampling.LANCZOS,
+                    reducing_gap=REDUCING_GAP,
                 )
             elif cover_img is original_img:
                 # 如果没有做任何转换，需要 copy 一份，因为原图会在 with 结束时关闭
@@ -513,7 +683,21 @@ class CommonRenderer(ImageRenderer):
         if not avatar or not avatar.exists():
             return None
 
+        return THUMBNAIL_CACHE.get_or_create(
+            avatar,
+            "avatar",
+            (self.AVATAR_SIZE, self.AVATAR_SIZE),
+            lambda: self._process_avatar(avatar),
+        )
+
+    def _process_avatar(self, avatar: Path) -> PILImage:
+        """解码头像, 超采样后圆形裁剪"""
         with Image.open(avatar) as original_img:
+            # 按超采样尺寸解码
+            scale = self.AVATAR_UPSCALE_FACTOR
+            temp_size = self.AVATAR_SIZE * scale
+            draft_for(original_img, (temp_size, temp_size))
+
             # 转换为 RGBA 模式（用于更好的抗锯齿效果）
             if original_img.mode != "RGBA":
                 avatar_img = original_img.convert("RGBA")
@@ -521,11 +705,10 @@ class CommonRenderer(ImageRenderer):
                 avatar_img = original_img
 
             # 使用超采样技术提高质量：先放大到指定倍数
-            scale = self.AVATAR_UPSCALE_FACTOR
-            temp_size = self.AVATAR_SIZE * scale
             avatar_img = avatar_img.resize(
                 (temp_size, temp_size),
                 Image.Resampling.LANCZOS,
+                reducing_gap=REDUCING_GAP,
             )
 
             # 创建高分辨率圆形遮罩（带抗锯齿）
@@ -555,11 +738,21 @@ class CommonRenderer(ImageRenderer):
         sections: list[SectionData] = []
         platform_name = getattr(result.platform, "name", "")
         prefer_text_first = platform_name in {"twitter", "bilibili"}
-        has_media = bool(result.img_contents) or bool(result.graphics_contents) or bool(await result.cover_path)
+
+        # 并发等待所有媒体, 转发内容同时渲染
+        if result.repost:
+            media, repost_section = await asyncio.gather(
+                self._resolve_media(result),
+                self._calculate_repost_section(result.repost),
+            )
+        else:
+            media, repost_section = await self._resolve_media(result), None
+
+        has_media = bool(result.img_contents) or bool(result.graphics_contents) or bool(media.cover)
         text_inserted = False
 
         # 1. Header 部分
-        header_section = await self._calculate_header_section(result)
+        header_section = await self._calculate_header_section(result, media.avatar)
         if header_section is not None:
             sections.append(header_section)
 
@@ -585,8 +778,9 @@ class CommonRenderer(ImageRenderer):
             text_inserted = True
 
         # 4. 封面，图集，图文内容
-        if cover_img := self._load_and_resize_cover(
-            await result.cover_path,
+        if cover_img := await run_in_render_pool(
+            self._load_and_resize_cover,
+            media.cover,
             content_width=content_width,
         ):
             sections.append(CoverSectionData(height=cover_img.height, cover_img=cover_img))
@@ -595,14 +789,16 @@ class CommonRenderer(ImageRenderer):
             img_grid_section = await self._calculate_image_grid_section(
                 result,
                 content_width,
+                media.images,
             )
             if img_grid_section:
                 sections.append(img_grid_section)
         elif result.graphics_contents:
-            for graphics_content in result.graphics_contents:
+            for graphics_content, img_path in zip(result.graphics_contents, media.graphics):
                 graphics_section = await self._calculate_graphics_section(
                     graphics_content,
                     content_width,
+                    img_path,
                 )
                 if graphics_section:
                     sections.append(graphics_section)
@@ -628,67 +824,114 @@ class CommonRenderer(ImageRenderer):
             sections.append(ExtraSectionData(height=extra_height, lines=extra_lines))
 
         # 7. 转发内容
-        if result.repost:
-            repost_section = await self._calculate_repost_section(result.repost)
+        if repost_section:
             sections.append(repost_section)
 
         return sections
 
+    async def _resolve_media(self, result: ParseResult) -> CardMedia:
+        """并发等待卡片所需的媒体, 每项媒体有独立的截止时间
+
+        头像超时使用占位符, 封面和图片超时则不绘制, 下载任务不会因超时被取消
+        """
+        cover = result.video_contents[0].cover if result.video_contents else None
+        images = [cont.path_task for cont in result.img_contents[: self.MAX_IMAGES_DISPLAY]]
+        graphics = [cont.path_task for cont in result.graphics_contents]
+        avatar = result.author.avatar if result.author else None
+
+        media_timeout = pconfig.render_media_timeout
+        paths = await asyncio.gather(
+            wait_path(avatar, pconfig.render_avatar_timeout),
+            wait_path(cover, media_timeout),
+            *[wait_path(path_task, media_timeout) for path_task in images + graphics],
+        )
+        return CardMedia(
+            avatar=paths[0],
+            cover=paths[1],
+            images=paths[2 : 2 + len(images)],
+            graphics=paths[2 + len(images) :],
+        )
+
     @suppress_exception_async
     async def _calculate_graphics_section(
-        self, graphics_content: GraphicsContent, content_width: int
+        self,
+        graphics_content: GraphicsContent,
+        content_width: int,
+        img_path: Path | None,
     ) -> GraphicsSectionData | None:
         """计算图文内容部分的高度和内容"""
+        if img_path is None:
+            return None
+
         # 加载图片
-        img_path = await graphics_content.get_path()
+        image = await run_in_render_pool(self._load_graphics_image, img_path, content_width)
+
+        # 处理文本内容
+        text_lines = []
+        if graphics_content.text:
+            text_lines = self._wrap_text(
+                graphics_content.text,
+                content_width,
+                self.fontset.text,
+            )
+
+        # 计算总高度：文本高度 + 图片高度 + alt文本高度 + 间距
+        text_height = len(text_lines) * self.fontset.text.line_height if text_lines else 0
+        alt_height = self.fontset.extra.line_height if graphics_content.alt else 0
+        total_height = text_height + image.height + alt_height
+        if text_lines:
+            total_height += self.SECTION_SPACING  # 文本和图片之间的间距
+        if graphics_content.alt:
+            total_height += self.SECTION_SPACING  # 图片和alt文本之间的间距
+
+        return GraphicsSectionData(
+            height=total_height,
+            text_lines=text_lines,
+            image=image,
+            alt_text=graphics_content.alt,
+        )
+
+    @classmethod
+    def _load_graphics_image(cls, img_path: Path, content_width: int) -> PILImage:
+        """加载图文图片并缩放到内容宽度"""
+        image = THUMBNAIL_CACHE.get_or_create(
+            img_path,
+            "graphics",
+            (content_width, 0),
+            lambda: cls._resize_graphics_image(img_path, content_width),
+        )
+        if image is None:
+            raise ValueError(f"无法加载图片: {img_path.name}")
+        return image
+
+    @staticmethod
+    def _resize_graphics_image(img_path: Path, content_width: int) -> PILImage:
+        """解码图文图片并缩放到内容宽度"""
         with Image.open(img_path) as original_img:
             # 调整图片尺寸以适应内容宽度
             if original_img.width > content_width:
                 ratio = content_width / original_img.width
                 new_height = int(original_img.height * ratio)
-                image = original_img.resize(
+                draft_for(original_img, (content_width, new_height))
+                return original_img.resize(
                     (content_width, new_height),
                     Image.Resampling.LANCZOS,
+                    reducing_gap=REDUCING_GAP,
                 )
-            else:
-                # 如果不需要缩放，copy 一份
-                image = original_img.copy()
-
-            # 处理文本内容
-            text_lines = []
-            if graphics_content.text:
-                text_lines = self._wrap_text(
-                    graphics_content.text,
-                    content_width,
-                    self.fontset.text,
-                )
-
-            # 计算总高度：文本高度 + 图片高度 + alt文本高度 + 间距
-            text_height = len(text_lines) * self.fontset.text.line_height if text_lines else 0
-            alt_height = self.fontset.extra.line_height if graphics_content.alt else 0
-            total_height = text_height + image.height + alt_height
-            if text_lines:
-                total_height += self.SECTION_SPACING  # 文本和图片之间的间距
-            if graphics_content.alt:
-                total_height += self.SECTION_SPACING  # 图片和alt文本之间的间距
-
-            return GraphicsSectionData(
-                height=total_height,
-                text_lines=text_lines,
-                image=image,
-                alt_text=graphics_content.alt,
-            )
+            # 如果不需要缩放，copy 一份
+            return original_img.copy()
 
     async def _calculate_header_section(
         self,
         result: ParseResult,
+        avatar: Path | None,
     ) -> HeaderSectionData | None:
         """计算 header 部分的高度和内容"""
         if result.author is None:
             return None
 
-        # 加载头像
-        avatar_img = self._load_and_process_avatar(await result.author.get_avatar_path())
+        # 加载头像, 未就绪时绘制占位符
+        avatar_img = await run_in_render_pool(self._load_and_process_avatar, avatar)
 
         text_height = self.fontset.name.line_height
         time = result.formartted_datetime
@@ -706,23 +949,20 @@ class CommonRenderer(ImageRenderer):
         )
 
     async def _calculate_repost_section(self, repost: ParseResult) -> RepostSectionData:
-        """计算转发内容的高度和内容（递归调用绘制方法）"""
-        repost_image = await self._create_card_image(repost, False)
-        # 缩放图片
-        scaled_width = int(repost_image.width * self.REPOST_SCALE)
-        scaled_height = int(repost_image.height * self.REPOST_SCALE)
-        repost_image_scaled = repost_image.resize(
-            (scaled_width, scaled_height),
-            Image.Resampling.LANCZOS,
-        )
+        """计算转发内容的高度和内容（使用缩放后的渲染器递归绘制）"""
+        # 直接按缩放后的尺寸, 字体绘制, 图片也按缩放后的尺寸加载, 无需整体缩放
+        repost_image = await self.scaled(self.REPOST_SCALE)._create_card_image(repost, False)
 
         return RepostSectionData(
-            height=scaled_height + self.REPOST_PADDING * 2,  # 加上转发容器的内边距
-            scaled_image=repost_image_scaled,
+            height=repost_image.height + self.REPOST_PADDING * 2,  # 加上转发容器的内边距
+            scaled_image=repost_image,
         )
 
     async def _calculate_image_grid_section(
-        self, result: ParseResult, content_width: int
+        self,
+        result: ParseResult,
+        content_width: int,
+        img_paths: list[Path | None],
     ) -> ImageGridSectionData | None:
         """计算图片网格部分的高度和内容"""
         if not result.img_contents:
@@ -733,22 +973,19 @@ class CommonRenderer(ImageRenderer):
         has_more = total_images > self.MAX_IMAGES_DISPLAY
 
         # 如果超过最大显示数量，处理前N张，最后一张显示+N效果
-        if has_more:
-            img_contents = result.img_contents[: self.MAX_IMAGES_DISPLAY]
-            remaining_count = total_images - self.MAX_IMAGES_DISPLAY
-        else:
-            img_contents = result.img_contents[: self.MAX_IMAGES_DISPLAY]
-            remaining_count = 0
+        remaining_count = total_images - self.MAX_IMAGES_DISPLAY if has_more else 0
 
-        processed_images = []
-        img_count = len(img_contents)
+        img_count = len(img_paths)
 
-        for img_content in img_contents:
-            img_path = await img_content.get_path()
-            # 使用装饰器保护的方法，失败会返回 None
-            img = await self._load_and_process_grid_image(img_path, content_width, img_count)
-            if img is not None:
-                processed_images.append(img)
+        # 在渲染线程池中并发处理, 使用装饰器保护的方法，失败会返回 None
+        loaded = await asyncio.gather(
+            *[
+                run_in_render_pool(self._load_and_process_grid_image, img_path, content_width, img_count)
+                for img_path in img_paths
+                if img_path is not None
+            ]
+        )
+        processed_images = [img for img in loaded if img is not None]
 
         if not processed_images:
             return None
@@ -785,8 +1022,8 @@ class CommonRenderer(ImageRenderer):
             remaining_count=remaining_count,
         )
 
-    @suppress_exception_async
-    async def _load_and_process_grid_image(
+    @suppress_exception
+    def _load_and_process_grid_image(
         self,
         img_path: Path,
         content_width: int,
@@ -805,7 +1042,44 @@ class CommonRenderer(ImageRenderer):
         if not img_path.exists():
             return None
 
+        return THUMBNAIL_CACHE.get_or_create(
+            img_path,
+            "grid" if img_count == 1 else "grid-square",
+            self._grid_image_size(content_width, img_count),
+            lambda: self._process_grid_image(img_path, content_width, img_count),
+        )
+
+    def _grid_image_size(self, content_width: int, img_count: int) -> tuple[int, int]:
+        """网格图片的最大尺寸"""
+        if img_count == 1:
+            # 单张图片，根据卡片宽度调整，与视频封面保持一致
+            max_width = content_width
+            max_height = min(self.MAX_IMAGE_HEIGHT, content_width)  # 限制最大高度
+        else:
+            # 多张图片，计算最大尺寸
+            if img_count in (2, 4):
+                # 2张或4张图片，使用2列布局
+                num_gaps = 3  # 2列有3个间距
+                max_size = (content_width - self.IMAGE_GRID_SPACING * num_gaps) // 2
+                max_size = min(max_size, self.IMAGE_2_GRID_SIZE)
+            else:
+                # 多张图片，使用3列布局
+                num_gaps = self.IMAGE_GRID_COLS + 1
+                max_size = (content_width - self.IMAGE_GRID_SPACING * num_gaps) // self.IMAGE_GRID_COLS
+                max_size = min(max_size, self.IMAGE_3_GRID_SIZE)
+            max_width = max_height = max_size
+        return max_width, max_height
+
+    def _process_grid_image(self, img_path: Path, content_width: int, img_count: int) -> PILImage:
+        """解码网格图片, 多张图片时裁剪为方形, 并缩放到网格尺寸"""
+        max_width, max_height = self._grid_image_size(content_width, img_count)
         with Image.open(img_path) as original_img:
+            # 按目标尺寸解码, 多张图片裁剪为方形后短边不小于目标尺寸
+            if img_count == 1:
+                ratio = min(max_width / original_img.width, max_height / original_img.height, 1)
+                draft_for(original_img, (int(original_img.width * ratio), int(original_img.height * ratio)))
+            else:
+                draft_for(original_img, (max_width, max_height))
             img = original_img
 
             # 根据图片数量决定处理方式
@@ -813,39 +1087,13 @@ class CommonRenderer(ImageRenderer):
                 # 2张及以上图片，统一为方形
                 img = self._crop_to_square(img)
 
-            # 计算图片尺寸
-            if img_count == 1:
-                # 单张图片，根据卡片宽度调整，与视频封面保持一致
-                max_width = content_width
-                max_height = min(self.MAX_IMAGE_HEIGHT, content_width)  # 限制最大高度
-                if img.width > max_width or img.height > max_height:
-                    ratio = min(max_width / img.width, max_height / img.height)
-                    new_size = (int(img.width * ratio), int(img.height * ratio))
-                    img = img.resize(new_size, Image.Resampling.LANCZOS)
-                elif img is original_img:
-                    # 如果没有做任何转换，需要 copy 一份
-                    img = img.copy()
-            else:
-                # 多张图片，计算最大尺寸
-                if img_count in (2, 4):
-                    # 2张或4张图片，使用2列布局
-                    num_gaps = 3  # 2列有3个间距
-                    max_size = (content_width - self.IMAGE_GRID_SPACING * num_gaps) // 2
-                    max_size = min(max_size, self.IMAGE_2_GRID_SIZE)
-                else:
-                    # 多张图片，使用3列布局
-                    num_gaps = self.IMAGE_GRID_COLS + 1
-                    max_size = (content_width - self.IMAGE_GRID_SPACING * num_gaps) // self.IMAGE_GRID_COLS
-                    max_size = min(max_size, self.IMAGE_3_GRID_SIZE)
-
-                # 调整多张图片的尺寸
-                if img.width > max_size or img.height > max_size:
-                    ratio = min(max_size / img.width, max_size / img.height)
-                    new_size = (int(img.width * ratio), int(img.height * ratio))
-                    img = img.resize(new_size, Image.Resampling.LANCZOS)
-                elif img is original_img:
-                    # 如果没有做任何转换，需要 copy 一份
-                    img = img.copy()
+            if img.width > max_width or img.height > max_height:
+                ratio = min(max_width / img.width, max_height / img.height)
+                new_size = (int(img.width * ratio), int(img.height * ratio))
+                img = img.resize(new_size, Image.Resampling.LANCZOS, reducing_gap=REDUCING_GAP)
+            elif img is original_img:
+                # 如果没有做任何转换，需要 copy 一份
+                img = img.copy()
 
             return img
 
@@ -1016,7 +1264,7 @@ class CommonRenderer(ImageRenderer):
         ctx.image.paste(cover_img, (x_pos, ctx.y_pos))
 
         # 添加视频播放按钮（居中）
-        button_size = 128  # 固定使用 128x128 尺寸
+        button_size = self.VIDEO_BUTTON_SIZE
         button_x = x_pos + (cover_img.width - button_size) // 2
         button_y = ctx.y_pos + (cover_img.height - button_size) // 2
         ctx.image.paste(
@@ -1254,7 +1502,7 @@ class CommonRenderer(ImageRenderer):
         draw.arc((x2 - 2 * radius, y2 - 2 * radius, x2, y2), 0, 90, fill=border_color, width=width)
 
     def _wrap_text(self, text: str, max_width: int, font_info: FontInfo) -> list[str]:
-        """使用 emoji.emoji_list 优化的文本自动换行算法，正确处理组合 emoji
+        """文本自动换行, 组合 emoji 作为整体, 标点符号不作为行首
 
         Args:
             text: 要处理的文本
@@ -1267,74 +1515,62 @@ class CommonRenderer(ImageRenderer):
         if not text:
             return []
 
-        def is_punctuation(char: str) -> bool:
-            """判断是否为不能为行首的标点符号"""
-            return char in "，。！？；：、）】》〉」』〕〗〙〛…—·,.;:!?)]}"
-
         lines: list[str] = []
-        paragraphs = text.splitlines()
-
-        for paragraph in paragraphs:
+        for paragraph in text.splitlines():
             if not paragraph:
                 lines.append("")
                 continue
 
-            # 使用 emoji.emoji_list 识别所有 emoji 组合
-            emoji_list = emoji.emoji_list(paragraph)
-
-            current_line = ""
-            current_line_width = 0
-            idx = 0  # 当前处理的字符索引
-
-            while idx < len(paragraph):
-                # 检查当前位置是否有 emoji, 包含组合 emoji
-                for emoji_data in emoji_list:
-                    if emoji_data["match_start"] == idx:
-                        char = emoji_data["emoji"]
-                        idx = emoji_data["match_end"]
-                        char_width = font_info.font.size
-                        break
-                else:
-                    # 处理普通字符
-                    char = paragraph[idx]
-                    idx += 1
-                    if len(char) == 1 and (not emoji.is_emoji(char)) and not font_info.has_glyph(char):
-                        # Avoid "invisible tofu" by using a visible placeholder.
-                        # Users can supply a better font via `parser_custom_font`.
-                        char = "□"
-                    char_width = font_info.get_char_width_fast(char)
-
-                # 如果当前行为空，直接添加字符
-                if not current_line:
-                    current_line = char
-                    current_line_width = char_width
-                    continue
-
-                # 如果是标点符号，直接添加到当前行（标点符号不应该单独成行）
-                if len(char) == 1 and is_punctuation(char):
-                    current_line += char
-                    current_line_width += char_width
-                    continue
-
-                # 测试添加下一个字符后的宽度
-                test_width = current_line_width + char_width
-
-                if test_width <= max_width:
-                    # 宽度合适，继续添加
-                    current_line += char
-                    current_line_width = test_width
-                else:
-                    # 宽度超限，需要断行
-                    lines.append(current_line)
-                    current_line = char
-                    current_line_width = char_width
-
-            # 保存最后一行
-            if current_line:
-                lines.append(current_line)
+            clusters, widths = self._segment_paragraph(paragraph, font_info)
+            # prefix[i] 为前 i 个字符簇的总宽度
+            prefix = [0, *accumulate(widths)]
+            start, count = 0, len(clusters)
+            while start < count:
+                # 当前行能容纳的最多字符簇, 每行至少一个
+                end = max(bisect_right(prefix, prefix[start] + max_width, lo=start + 1) - 1, start + 1)
+                # 标点符号不应该单独成行, 超出宽度也附加到当前行
+                while end < count and clusters[end] in _NO_LINE_START:
+                    end += 1
+                lines.append("".join(clusters[start:end]))
+                start = end
 
         return lines
 
+    @staticmethod
+    def _segment_paragraph(paragraph: str, font_info: FontInfo) -> tuple[list[str], list[int]]:
+        """将段落切分为字符簇, 组合 emoji 为一个字符簇, 组合字符附加到前一个字符簇
+
+        字体不支持的字符替换为 □, 避免绘制出不可见的字符
+
+        Returns:
+            字符簇列表及对应的宽度
+        """
+        clusters: list[str] = []
+        widths: list[int] = []
+        emoji_width = font_info.font.size
+        spans = {data["match_start"]: (data["match_end"], data["emoji"]) for data in emoji.emoji_list(paragraph)}
+
+        idx, length = 0, len(paragraph)
+        while idx < length:
+            if (span := spans.get(idx)) is not None:
+                idx, cluster = span
+                clusters.append(cluster)
+                widths.append(emoji_width)
+                continue
+
+            char = paragraph[idx]
+            idx += 1
+            if clusters and _uc_category(char)[0] == "M":
+                clusters[-1] += char
+                continue
+            if not font_info.has_glyph(char) and not emoji.is_emoji(char):
+                # 可通过 parser_custom_font 配置覆盖更全的字体
+                char = "□"
+            clusters.append(char)
+            widths.append(font_info.get_char_width_fast(char))
+
+        return clusters, widths
+
     def _sanitize_single_line(self, text: str, font_info: FontInfo) -> str:
         if not text:
             return text
@@ -1351,71 +1587,3 @@ class CommonRenderer(ImageRenderer):
             else:
                 out.append(ch)
         return "".join(out)
-
-    def _wrap_text_old(self, text: str, max_width: int, font_info: FontInfo) -> list[str]:
-        """优化的文本自动换行算法，考虑中英文字符宽度相同
-
-        Args:
-            text: 要处理的文本
-            max_width: 最大宽度（像素）
-            font_info: 字体信息对象
-
-        Returns:
-            换行后的文本列表
-        """
-        if not text:
-            return []
-
-        def is_punctuation(char: str) -> bool:
-            """判断是否为不能为行首的标点符号"""
-            return char in "，。！？；：、）】》〉」』〕〗〙〛…—·,.;:!?)]}"
-
-        lines: list[str] = []
-        paragraphs = text.splitlines()
-
-        for paragraph in paragraphs:
-            if not paragraph:
-                lines.append("")
-                continue
-
-            current_line = ""
-            current_line_width = 0
-            remaining_text = paragraph
-
-            while remaining_text:
-                next_char = remaining_text[0]
-                char_width = font_info.get_char_width_fast(next_char)
-                # 如果当前行为空，直接添加字符
-                if not current_line:
-                    current_line = next_char
-                    current_line_width = char_width
-                    remaining_text = remaining_text[1:]
-                    continue
-
-                # 如果是标点符号，直接添加到当前行（标点符号不应该单独成行）
-                if is_punctuation(next_char):
-                    current_line += next_char
-                    current_line_width += char_width
-                    remaining_text = remaining_text[1:]
-                    continue
-
-                # 测试添加下一个字符后的宽度
-                test_width = current_line_width + char_width
-
-                if test_width <= max_width:
-                    # 宽度合适，继续添加
-                    current_line += next_char
-                    current_line_width = test_width
-                    remaining_text = remaining_text[1:]
-                else:
-                    # 宽度超限，需要断行
-                    lines.append(current_line)
-                    current_line = next_char
-                    current_line_width = char_width
-                    remaining_text = remaining_text[1:]
-
-            # 保存最后一行
-            if current_line:
-                lines.append(current_line)
-
-        return lines
@@ -35,7 +35,7 @@ class DefaultRenderer(BaseRenderer):
         segs: list[Segment] = [Text(text) for text in texts]
 
         if cover_path := await result.cover_path:
-            segs.insert(1, UniHelper.img_seg(cover_path))
+            segs.insert(1, await UniHelper.img_seg(cover_path))
 
         if total_len > 300:
             yield UniMessage(UniHelper.construct_forward_message(segs))
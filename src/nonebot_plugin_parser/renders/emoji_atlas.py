@@ -0,0 +1,224 @@
+"""本地 emoji 图集: 下载过的 emoji 保存在精灵图中, 绘制文字时不访问网络"""
+
+import os
+import asyncio
+import threading
+from pathlib import Path
+from collections.abc import Iterable
+
+import emoji
+import msgspec
+from PIL import Image, ImageDraw, ImageFont
+from nonebot import logger
+from apilmoji import EmojiCDNSource
+from apilmoji.helper import NodeType, parse_lines, contains_emoji
+
+from ..utils import LimitedSizeDict
+from ..config import pconfig
+
+PILImage = Image.Image
+
+
+class _Index(msgspec.Struct):
+    cell: int
+    emojis: dict[str, tuple[int, int, int]] = {}
+    """emoji -> (槽位, 宽, 高)"""
+
+
+class EmojiAtlas:
+    """emoji 精灵图集
+
+    每张精灵图为 COLUMNS x COLUMNS 个 CELL 像素的格子, 索引记录 emoji 所在格子及原始宽高。
+    图集保存在插件数据目录, 不会随缓存淘汰; 未收录的 emoji 依次从离线包及 CDN 获取
+    """
+
+    CELL = 72
+    """格子边长, 不小于最大字号"""
+    COLUMNS = 16
+    """每张精灵图的行列数"""
+
+    def __init__(self, root: Path, source: EmojiCDNSource, bundle: Path | None = None):
+        """
+        Args:
+            root (Path): 图集目录
+            source (EmojiCDNSource): CDN 下载源, 下载的图片收录后删除
+            bundle (Path | None): 离线包目录, 文件名为 {emoji}.png
+        """
+        self.root = root
+        self.source = source
+        self.bundle = bundle
+        self._lock = threading.Lock()
+        self._index: _Index | None = None
+        self._sheets: dict[int, PILImage] = {}
+        self._sprites: LimitedSizeDict[tuple[str, int], PILImage] = LimitedSizeDict(max_size=512)
+        self._failed: set[str] = set()
+        """下载失败的 emoji, 本次运行中不再重试"""
+
+    @property
+    def index(self) -> _Index:
+        if self._index is None:
+            index_path = self.root / "index.json"
+            try:
+                self._index = msgspec.json.decode(index_path.read_bytes(), type=_Index)
+                if self._index.cell != self.CELL:
+                    raise ValueError("cell size changed")
+            except (OSError, ValueError, msgspec.DecodeError):
+                self._index = _Index(cell=self.CELL)
+        return self._index
+
+    async def prefetch(self, texts: Iterable[str]) -> None:
+        """批量收录文本中出现的 emoji, 在绘制前调用"""
+        emojis = {data["emoji"] for text in texts for data in emoji.emoji_list(text)}
+        with self._lock:
+            missing = emojis - self.index.emojis.keys() - self._failed
+        if not missing:
+            return
+
+        found = await asyncio.to_thread(self._find_in_bundle, missing)
+        downloads: dict[str, Path] = {}
+        if rest := missing - found.keys():
+            fetched = await self.source.fetch_emojis(rest)
+            downloads = {emj: path for emj, path in fetched.items() if path is not None}
+            self._failed.update(emj for emj, path in fetched.items() if path is None)
+
+        try:
+            await asyncio.to_thread(self._add, found | downloads)
+        except Exception:
+            logger.exception("收录 emoji 失败")
+        finally:
+            for path in downloads.values():
+                path.unlink(missing_ok=True)
+
+    def sprite(self, emj: str, size: int) -> PILImage | None:
+        """获取缩放到指定边长的 emoji, 未收录时返回 None"""
+        key = (emj, size)
+        with self._lock:
+            if (sprite := self._sprites.get(key)) is not None:
+                return sprite
+            if (entry := self.index.emojis.get(emj)) is None:
+                return None
+            slot, width, height = entry
+            sheet_no, pos = divmod(slot, self.COLUMNS * self.COLUMNS)
+            sheet = self._sheet(sheet_no)
+            if sheet is None:
+                return None
+            x, y = (pos % self.COLUMNS) * self.CELL, (pos // self.COLUMNS) * self.CELL
+            sprite = sheet.crop((x, y, x + width, y + height)).resize(
+                (size, max(1, size * height // width)), Image.Resampling.LANCZOS
+            )
+            self._sprites[key] = sprite
+            return sprite
+
+    def text(
+        self,
+        image: PILImage,
+        xy: tuple[int, int],
+        lines: list[str],
+        font: ImageFont.FreeTypeFont,
+        *,
+        fill: tuple[int, int, int],
+        line_height: int,
+    ) -> None:
+        """绘制含 emoji 的文本, 排版与 Apilmoji.text 一致, 未收录的 emoji 绘制首个字符"""
+        x, y = xy
+        draw = ImageDraw.Draw(image)
+        if not contains_emoji(lines):
+            for line in lines:
+                draw.text((x, y), line, font=font, fill=fill)
+                y += line_height
+            return
+
+        font_size = int(font.size)
+        y_diff = (line_height - font_size) // 2
+        for nodes in parse_lines(lines):
+            cur_x = x
+            for node in nodes:
+                if node.type is NodeType.EMOJI:
+                    if (sprite := self.sprite(node.content, font_size - 2)) is not None:
+                        image.paste(sprite, (cur_x + 1, y + y_diff), sprite)
+                    else:
+                        draw.text((cur_x, y), node.content[0], font=font, fill=fill)
+                    cur_x += font_size
+                else:
+                    draw.text((cur_x, y), node.content, font=font, fill=fill)
+                    cur_x += int(font.getlength(node.content))
+            y += line_height
+
+    def _find_in_bundle(self, emojis: set[str]) -> dict[str, Path]:
+        if self.bundle is None:
+            return {}
+        found: dict[str, Path] = {}
+        for emj in emojis:
+            # 兼容 apilmoji 缓存目录结构 {style}/{emoji}.png
+            for path in (self.bundle / f"{emj}.png", self.bundle / self.source.style / f"{emj}.png"):
+                if path.is_file():
+                    found[emj] = path
+                    break
+        return found
+
+    def _sheet(self, sheet_no: int, create: bool = False) -> PILImage | None:
+        if (sheet := self._sheets.get(sheet_no)) is not None:
+            return sheet
+        sheet_path = self.root / f"sheet-{sheet_no}.png"
+        try:
+            with Image.open(sheet_path) as img:
+                sheet = img.convert("RGBA")
+        except OSError:
+            if not create:
+                return None
+            sheet = Image.new("RGBA", (self.COLUMNS * self.CELL,) * 2, (0, 0, 0, 0))
+        self._sheets[sheet_no] = sheet
+        return sheet
+
+    def _add(self, images: dict[str, Path]) -> None:
+        """将图片收录到精灵图, 并保存修改过的精灵图及索引"""
+        if not images:
+            return
+        with self._lock:
+            index = self.index
+            dirty: set[int] = set()
+            for emj, path in images.items():
+                if emj in index.emojis:
+                    continue
+                try:
+                    with Image.open(path) as img:
+                        cell = img.convert("RGBA")
+                except OSError:
+                    logger.debug(f"无法读取 emoji 图片: {path.name}")
+                    continue
+                cell.thumbnail((self.CELL, self.CELL), Image.Resampling.LANCZOS)
+
+                slot = len(index.emojis)
+                sheet_no, pos = divmod(slot, self.COLUMNS * self.COLUMNS)
+                sheet = self._sheet(sheet_no, create=True)
+                assert sheet is not None
+                sheet.paste(cell, ((pos % self.COLUMNS) * self.CELL, (pos // self.COLUMNS) * self.CELL))
+                index.emojis[emj] = (slot, cell.width, cell.height)
+                dirty.add(sheet_no)
+
+            self.root.mkdir(parents=True, exist_ok=True)
+            for sheet_no in dirty:
+                self._replace(self.root / f"sheet-{sheet_no}.png", self._sheets[sheet_no])
+            self._replace(self.root / "index.json", msgspec.json.encode(index))
+
+    @staticmethod
+    def _replace(path: Path, data: PILImage | bytes) -> None:
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        if isinstance(data, bytes):
+            tmp_path.write_bytes(data)
+        else:
+            data.save(tmp_path, format="PNG")
+        os.replace(tmp_path, path)
+
+
+EMOJI_ATLAS = EmojiAtlas(
+    pconfig.data_dir / "emojis" / str(pconfig.emoji_style),
+    EmojiCDNSource(
+        base_url=pconfig.emoji_cdn,
+        style=pconfig.emoji_style,
+        cache_dir=pconfig.cache_dir / "emojis",
+        enable_tqdm=True,
+    ),
+    bundle=pconfig.emoji_bundle,
+)
+"""emoji 图集"""
@@ -0,0 +1,111 @@
+"""字形表: 字体在 BMP 范围内的字符宽度及覆盖位图, 持久化后通过 mmap 加载"""
+
+import os
+import mmap
+from array import array
+from pathlib import Path
+from unicodedata import category
+
+from PIL import ImageFont, features
+from nonebot import logger
+
+from ..utils import file_digest
+
+BMP_SIZE = 0x10000
+"""基本多文种平面字符数"""
+_WIDTHS_BYTES = BMP_SIZE * 2
+_TABLE_BYTES = _WIDTHS_BYTES + BMP_SIZE // 8
+_LAYOUT_KWARGS: dict[str, str] = {"direction": "ltr"} if features.check_feature("raqm") else {}
+"""指定文字方向需要 libraqm, 不可用时使用基础排版"""
+
+
+def text_length(font: ImageFont.FreeTypeFont, text: str) -> int:
+    """文本宽度"""
+    return int(font.getlength(text, **_LAYOUT_KWARGS))
+
+
+def check_glyph(font: ImageFont.FreeTypeFont, char: str) -> bool:
+    """Best-effort check whether the font can render the glyph.
+
+    Whitespace/control characters are treated as supported.
+    """
+    if not char:
+        return True
+    if char.isspace():
+        return True
+    if category(char).startswith("C"):
+        return True
+    try:
+        return font.getmask(char).getbbox() is not None
+    except Exception:
+        return True
+
+
+class GlyphTable:
+    """BMP 字符宽度表及覆盖位图
+
+    文件内容为 65536 个 uint16 宽度, 之后为 8192 字节的覆盖位图, 使用本机字节序
+    """
+
+    VERSION = 2
+    """文件格式或生成规则变更时递增"""
+
+    def __init__(self, buffer: bytes | mmap.mmap):
+        view = memoryview(buffer)
+        self._widths = view[:_WIDTHS_BYTES].cast("H")
+        self._coverage = view[_WIDTHS_BYTES:]
+
+    def width(self, code: int) -> int:
+        """BMP 字符宽度"""
+        return self._widths[code]
+
+    def covered(self, code: int) -> bool:
+        """字体是否支持该 BMP 字符"""
+        return bool(self._coverage[code >> 3] & (1 << (code & 7)))
+
+    @classmethod
+    def load(cls, font: ImageFont.FreeTypeFont, font_path: Path, cache_dir: Path) -> "GlyphTable":
+        """加载字形表, 不存在时生成并保存
+
+        Args:
+            font (ImageFont.FreeTypeFont): 字体
+            font_path (Path): 字体文件路径, 文件哈希参与缓存键
+            cache_dir (Path): 字形表保存目录
+        """
+        table_path = cache_dir / f"{file_digest(font_path)}-{font.size}-v{cls.VERSION}.glyphs"
+        try:
+            with table_path.open("rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(buffer) == _TABLE_BYTES:
+                return cls(buffer)
+            buffer.close()
+        except (OSError, ValueError):
+            pass
+
+        logger.info(f"生成字形表 {font_path.name} size={font.size}")
+        raw = cls.build(font)
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = table_path.with_name(f"{table_path.name}.{os.getpid()}.tmp")
+            tmp_path.write_bytes(raw)
+            os.replace(tmp_path, table_path)
+        except OSError:
+            logger.warning(f"保存字形表 {table_path} 失败")
+        return cls(raw)
+
+    @staticmethod
+    def build(font: ImageFont.FreeTypeFont) -> bytes:
+        """遍历 BMP 计算字符宽度及覆盖位图, 代理区字符跳过"""
+        widths = array("H", bytes(_WIDTHS_BYTES))
+        coverage = bytearray(BMP_SIZE // 8)
+        for code in range(BMP_SIZE):
+            if 0xD800 <= code < 0xE000:
+                continue
+            char = chr(code)
+            if check_glyph(font, char):
+                coverage[code >> 3] |= 1 << (code & 7)
+            try:
+                widths[code] = min(text_length(font, char), 0xFFFF)
+            except Exception:
+                pass
+        return widths.tobytes() + bytes(coverage)
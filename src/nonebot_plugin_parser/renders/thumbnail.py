@@ -0,0 +1,100 @@
+"""派生图片缓存: 圆形头像, 封面, 网格图等处理结果"""
+
+import os
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from collections.abc import Callable
+
+from PIL import Image
+from nonebot import logger
+
+from ..utils import file_digest
+from ..config import pconfig
+
+PILImage = Image.Image
+
+
+class ThumbnailCache:
+    """按 (源文件哈希, 操作, 目标尺寸) 缓存处理后的图片
+
+    内存中保留最近使用的已解码图片, 磁盘上保存 png 编码的缩略图,
+    重复渲染时跳过解码和缩放。在渲染线程中调用, 内部加锁
+    """
+
+    def __init__(self, cache_dir: Path, max_items: int):
+        self.cache_dir = cache_dir
+        self.max_items = max_items
+        self._lock = threading.Lock()
+        self._images: OrderedDict[str, PILImage] = OrderedDict()
+
+    def get_or_create(
+        self,
+        source: Path,
+        op: str,
+        size: tuple[int, int],
+        factory: Callable[[], PILImage | None],
+    ) -> PILImage | None:
+        """获取缓存的处理结果, 未命中时调用 factory 生成并缓存
+
+        Args:
+            source (Path): 源图片路径
+            op (str): 操作名称, 不同处理方式需使用不同名称
+            size (tuple[int, int]): 目标尺寸, 参与缓存键
+            factory (Callable[[], PILImage | None]): 生成处理结果, 返回 None 时不缓存
+
+        Returns:
+            PILImage | None: 处理后的图片副本
+        """
+        key = f"{file_digest(source)}-{op}-{size[0]}x{size[1]}"
+
+        with self._lock:
+            if (image := self._images.get(key)) is not None:
+                self._images.move_to_end(key)
+                return image.copy()
+
+        thumb_path = self.cache_dir / f"{key}.png"
+        image = self._load(thumb_path)
+        if image is None:
+            image = factory()
+            if image is None:
+                return None
+            self._save(thumb_path, image)
+
+        with self._lock:
+            self._images[key] = image
+            if len(self._images) > self.max_items:
+                self._images.popitem(last=False)
+        return image.copy()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._images.clear()
+
+    @staticmethod
+    def _load(thumb_path: Path) -> PILImage | None:
+        try:
+            with Image.open(thumb_path) as img:
+                img.load()
+                image = img.copy()
+            # 刷新最近使用时间, 避免被缓存淘汰
+            os.utime(thumb_path)
+            return image
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.debug(f"读取缩略图缓存失败: {thumb_path.name}")
+            return None
+
+    def _save(self, thumb_path: Path, image: PILImage) -> None:
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = thumb_path.with_name(f"{thumb_path.name}.{threading.get_ident()}.tmp")
+            image.save(tmp_path, format="PNG", compress_level=1)
+            os.replace(tmp_path, thumb_path)
+        except Exception:
+            logger.debug(f"写入缩略图缓存失败: {thumb_path.name}")
+
+
+THUMBNAIL_CACHE = ThumbnailCache(pconfig.cache_dir / "thumbs", max_items=pconfig.thumbnail_cache_size)
+"""派生图片缓存"""
@@ -1,11 +1,14 @@
+import os
 import re
 import asyncio
 import hashlib
+import threading
 import importlib.util
 from typing import Any, TypeVar
 from pathlib import Path
 from collections import OrderedDict
 from urllib.parse import urlparse
+from collections.abc import Callable
 
 from nonebot import logger
 
@@ -18,14 +21,63 @@ class LimitedSizeDict(OrderedDict[K, V]):
     定长字典
     """
 
-    def __init__(self, *args, max_size=20, **kwargs):
+    def __init__(self, *args, max_size=20, on_evict: Callable[[K, V], None] | None = None, **kwargs):
         self.max_size = max_size
+        self.on_evict = on_evict
         super().__init__(*args, **kwargs)
 
     def __setitem__(self, key: K, value: V):
         super().__setitem__(key, value)
         if len(self) > self.max_size:
-            self.popitem(last=False)  # 移除最早添加的项
+            evicted = self.popitem(last=False)  # 移除最早添加的项
+            if self.on_evict is not None:
+                self.on_evict(*evicted)
+
+
+_DIGESTS: LimitedSizeDict[tuple[int, int, int, int], str] = LimitedSizeDict(max_size=4096)
+_DIGESTS_LOCK = threading.Lock()
+
+
+def _file_identity(stat: os.stat_result) -> tuple[int, int, int, int]:
+    return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def file_digest(path: Path) -> str:
+    """计算文件内容的哈希, 按 (设备, inode, 大小, 修改时间) 缓存, 可在线程中调用
+
+    删除后重新创建的文件即使复用了 inode, 修改时间也不同;
+    通过 touch_file 刷新使用时间时保留已缓存的哈希
+    """
+    identity = _file_identity(path.stat())
+    with _DIGESTS_LOCK:
+        if (digest := _DIGESTS.get(identity)) is not None:
+            return digest
+
+    blake2b = hashlib.blake2b(digest_size=16)
+    with path.open("rb") as f:
+        while chunk := f.read(1024 * 1024):
+            blake2b.update(chunk)
+    digest = blake2b.hexdigest()
+    with _DIGESTS_LOCK:
+        _DIGESTS[identity] = digest
+    return digest
+
+
+def touch_file(path: Path) -> None:
+    """将文件修改时间刷新为当前时间(作为最近使用时间), 已缓存的内容哈希随之迁移
+
+    Raises:
+        OSError: 文件不存在等
+    """
+    before = path.stat()
+    os.utime(path)
+    after = path.stat()
+    # 期间文件被替换时 inode 或大小不同, 不迁移
+    if (before.st_dev, before.st_ino, before.st_size) != (after.st_dev, after.st_ino, after.st_size):
+        return
+    with _DIGESTS_LOCK:
+        if (digest := _DIGESTS.pop(_file_identity(before), None)) is not None:
+            _DIGESTS[_file_identity(after)] = digest
 
 
 def keep_zh_en_num(text: str) -> str:
@@ -65,38 +117,51 @@ async def exec_ffmpeg_cmd(cmd: list[str]) -> None:
         raise RuntimeError(f"ffmpeg 执行失败: {error_msg}")
 
 
-async def merge_av(
-    *,
-    v_path: Path,
-    a_path: Path,
-    output_path: Path,
-) -> None:
-    """合并视频和音频
+def merge_av_cmd(v_input: str, a_input: str, output_path: Path) -> list[str]:
+    """不重新编码合并视频和音频的 ffmpeg 命令
 
     Args:
-        v_path (Path): 视频文件路径
-        a_path (Path): 音频文件路径
-        output_path (Path): 输出文件路径
+        v_input (str): 视频输入, 文件路径或 pipe:N
+        a_input (str): 音频输入, 文件路径或 pipe:N
+        output_path (Path): 输出文件路径, 总是输出 mp4
     """
-    logger.info(f"Merging {v_path.name} and {a_path.name} to {output_path.name}")
-
-    cmd = [
+    return [
         "ffmpeg",
         "-y",
+        "-loglevel",
+        "error",
         "-i",
-        str(v_path),
+        v_input,
         "-i",
-        str(a_path),
+        a_input,
         "-c",
         "copy",
         "-map",
         "0:v:0",
         "-map",
         "1:a:0",
+        "-f",
+        "mp4",
         str(output_path),
     ]
 
-    await exec_ffmpeg_cmd(cmd)
+
+async def merge_av(
+    *,
+    v_path: Path,
+    a_path: Path,
+    output_path: Path,
+) -> None:
+    """合并视频和音频
+
+    Args:
+        v_path (Path): 视频文件路径
+        a_path (Path): 音频文件路径
+        output_path (Path): 输出文件路径
+    """
+    logger.info(f"Merging {v_path.name} and {a_path.name} to {output_path.name}")
+
+    await exec_ffmpeg_cmd(merge_av_cmd(str(v_path), str(a_path), output_path))
     await asyncio.gather(safe_unlink(v_path), safe_unlink(a_path))
     logger.success(f"Merged {output_path.name}, {fmt_size(output_path)}")
 
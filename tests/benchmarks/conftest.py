@@ -0,0 +1,9 @@
+import pytest
+from harness import MediaServer
+
+
+@pytest.fixture(scope="session")
+def media_server():
+    server = MediaServer()
+    yield server
+    server.close()
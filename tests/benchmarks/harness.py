@@ -0,0 +1,208 @@
+"""离线基准测试: 回放录制的接口响应, 媒体由本地 HTTP 服务提供, 分阶段统计耗时及内存峰值
+
+fixtures/<name>/cassette.json:
+    url: 分享文本
+    requires: 依赖的可执行文件, 缺少时跳过(如音视频合并需要 ffmpeg)
+    interactions: 接口响应, 按 method 及 url 前缀匹配(录制时的时间戳等查询参数不参与匹配), body 为同目录下的文件名,
+        重定向等无响应体时可省略
+    media: 媒体 url -> {"file": 同目录下的文件名} 或 {"width": 宽, "height": 高, "seed": 随机种子}(生成 jpeg)
+
+环境变量:
+    PARSER_BENCH: 为 1 时运行基准测试
+    PARSER_BENCH_ROUNDS: 计时轮数, 取各阶段中位数. 默认 5
+    PARSER_BENCH_TOLERANCE: 相对基准允许的增长比例. 默认 0.5
+    PARSER_BENCH_UPDATE: 为 1 时将本次结果写入 baseline.json
+"""
+
+import io
+import re
+import zlib
+import random
+import mimetypes
+import threading
+import tracemalloc
+from time import perf_counter
+from pathlib import Path
+from contextlib import contextmanager
+from collections import defaultdict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import httpx
+import msgspec
+from PIL import Image
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+
+
+class Interaction(msgspec.Struct):
+    method: str
+    url: str
+    body: str | None = None
+    status: int = 200
+    headers: dict[str, str] = {}
+
+
+class MediaSpec(msgspec.Struct):
+    file: str | None = None
+    width: int = 1080
+    height: int = 1080
+    seed: int = 0
+
+
+class Cassette(msgspec.Struct):
+    url: str
+    requires: list[str] = []
+    interactions: list[Interaction] = []
+    media: dict[str, MediaSpec] = {}
+
+
+def load_cassettes() -> dict[str, tuple[Path, Cassette]]:
+    """加载所有录制的 fixture"""
+    cassettes: dict[str, tuple[Path, Cassette]] = {}
+    for path in sorted(FIXTURES_DIR.glob("*/cassette.json")):
+        cassettes[path.parent.name] = (path.parent, msgspec.json.decode(path.read_bytes(), type=Cassette))
+    return cassettes
+
+
+def media_bytes(fixture_dir: Path, spec: MediaSpec) -> bytes:
+    """读取录制的媒体文件, 或按尺寸生成确定性的 jpeg"""
+    if spec.file:
+        return (fixture_dir / spec.file).read_bytes()
+
+    # 低分辨率噪声放大后与渐变混合, 编码后的大小接近真实照片
+    rng = random.Random(spec.seed)
+    small = (max(spec.width // 8, 1), max(spec.height // 8, 1))
+    noise = Image.frombytes("RGB", small, rng.randbytes(small[0] * small[1] * 3))
+    noise = noise.resize((spec.width, spec.height), Image.Resampling.BICUBIC)
+    gradient = Image.linear_gradient("L").resize((spec.width, spec.height)).convert("RGB")
+    output = io.BytesIO()
+    Image.blend(noise, gradient, 0.5).save(output, format="JPEG", quality=90)
+    return output.getvalue()
+
+
+class MediaServer:
+    """本地媒体服务, 支持 Range 请求, 路径为 /{原始域名}{原始路径}"""
+
+    def __init__(self):
+        self.files: dict[str, bytes] = {}
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server._serve(self, with_body=True)
+
+            def do_HEAD(self):
+                server._serve(self, with_body=False)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def add(self, url: str, data: bytes) -> None:
+        parsed = httpx.URL(url)
+        self.files[f"/{parsed.host}{parsed.path}"] = data
+
+    def close(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _serve(self, handler: BaseHTTPRequestHandler, with_body: bool) -> None:
+        path = handler.path.split("?", 1)[0]
+        data = self.files.get(path)
+        if data is None:
+            handler.send_error(404)
+            return
+
+        etag = f'"{len(data):x}-{zlib.crc32(data):08x}"'
+        start, end, status = 0, len(data) - 1, 200
+        range_header = handler.headers.get("Range")
+        if_range = handler.headers.get("If-Range")
+        if range_header and (if_range is None or if_range == etag):
+            if matched := re.fullmatch(r"bytes=(\d*)-(\d*)", range_header.strip()):
+                first, last = matched.groups()
+                if first:
+                    start = int(first)
+                    end = min(int(last), end) if last else end
+                elif last:
+                    start = max(len(data) - int(last), 0)
+                if start > end:
+                    handler.send_response(416)
+                    handler.send_header("Content-Range", f"bytes */{len(data)}")
+                    handler.end_headers()
+                    return
+                status = 206
+
+        handler.send_response(status)
+        handler.send_header("Content-Type", mimetypes.guess_type(path)[0] or "application/octet-stream")
+        handler.send_header("Content-Length", str(end - start + 1))
+        handler.send_header("Accept-Ranges", "bytes")
+        handler.send_header("ETag", etag)
+        if status == 206:
+            handler.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        handler.end_headers()
+        if with_body:
+            handler.wfile.write(data[start : end + 1])
+
+
+class StandInTransport(httpx.AsyncBaseTransport):
+    """将媒体请求转发到本地媒体服务, 响应保留原始请求"""
+
+    def __init__(self, server: MediaServer):
+        self._server = server
+        self._transport = httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        url = request.url
+        target = f"{self._server.base_url}/{url.host}{url.raw_path.decode()}"
+        forwarded = httpx.Request(request.method, target, headers=request.headers, stream=request.stream)
+        return await self._transport.handle_async_request(forwarded)
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class StageTimer:
+    """分阶段计时, 嵌套阶段的耗时只计入最内层阶段
+
+    开启 tracemalloc 时同时记录各阶段 Python 堆内存峰值增量
+    """
+
+    def __init__(self):
+        self.elapsed: defaultdict[str, float] = defaultdict(float)
+        self.peak: defaultdict[str, int] = defaultdict(int)
+        self._stack: list[list] = []
+
+    @contextmanager
+    def stage(self, name: str):
+        if self._stack:
+            self._close(self._stack[-1])
+        frame = [name, 0.0, 0]
+        self._stack.append(frame)
+        self._open(frame)
+        try:
+            yield
+        finally:
+            self._close(self._stack.pop())
+            if self._stack:
+                self._open(self._stack[-1])
+
+    def _open(self, frame: list) -> None:
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            frame[2] = tracemalloc.get_traced_memory()[0]
+        frame[1] = perf_counter()
+
+    def _close(self, frame: list) -> None:
+        name, start, base = frame
+        self.elapsed[name] += perf_counter() - start
+        if tracemalloc.is_tracing():
+            self.peak[name] = max(self.peak[name], tracemalloc.get_traced_memory()[1] - base)
@@ -0,0 +1,219 @@
+import os
+import shutil
+import asyncio
+import statistics
+import tracemalloc
+from pathlib import Path
+from functools import wraps
+
+import httpx
+import respx
+import pytest
+import msgspec
+from harness import BASELINE_PATH, Cassette, StageTimer, MediaServer, StandInTransport, media_bytes, load_cassettes
+from nonebot import logger
+from bilibili_api.utils import network
+
+STAGES = ("match", "parse", "download", "sections", "draw", "encode")
+CASSETTES = load_cassettes()
+
+ROUNDS = int(os.getenv("PARSER_BENCH_ROUNDS", "5"))
+TOLERANCE = float(os.getenv("PARSER_BENCH_TOLERANCE", "0.5"))
+UPDATE_BASELINE = os.getenv("PARSER_BENCH_UPDATE") == "1"
+# 绝对误差, 避免耗时极短的阶段因抖动误报
+TIME_SLACK = 0.005
+MEMORY_SLACK = 256 * 1024
+
+pytestmark = pytest.mark.skipif(os.getenv("PARSER_BENCH") != "1", reason="设置 PARSER_BENCH=1 运行基准测试")
+
+
+def _instrument(monkeypatch, timers: list[StageTimer]):
+    """将渲染器的计算, 绘制, 编码划分为独立阶段, 计入 timers 中最后一个计时器
+
+    替换类上的方法, 转发内容使用的缩放渲染器同样计时
+    """
+    from nonebot_plugin_parser.renders import CommonRenderer
+
+    def timed(name: str, func):
+        if asyncio.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with timers[-1].stage(name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timers[-1].stage(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    monkeypatch.setattr(CommonRenderer, "_calculate_sections", timed("sections", CommonRenderer._calculate_sections))
+    monkeypatch.setattr(CommonRenderer, "_draw_sections", timed("draw", CommonRenderer._draw_sections))
+    monkeypatch.setattr(CommonRenderer, "_encode_image", staticmethod(timed("encode", CommonRenderer._encode_image)))
+
+
+def _media_tasks(result) -> list[asyncio.Task[Path]]:
+    """所有媒体的下载任务, 延迟下载的媒体(视频等)按发送时的方式开始下载"""
+    from nonebot_plugin_parser.parsers import VideoContent
+    from nonebot_plugin_parser.download.task import LazyTask
+
+    tasks = [result.author.avatar] if result.author else []
+    for cont in result.contents:
+        tasks.append(cont.path_task)
+        if isinstance(cont, VideoContent):
+            tasks.append(cont.cover)
+    tasks = [task.start() if isinstance(task, LazyTask) else task for task in tasks]
+    tasks = [task for task in tasks if isinstance(task, asyncio.Task)]
+    if result.repost:
+        tasks.extend(_media_tasks(result.repost))
+    return tasks
+
+
+async def _run_round(cassette: Cassette, timers: list[StageTimer], cache_dir: Path) -> bytes:
+    """执行一次完整流程, 媒体及派生图片缓存使用新的目录"""
+    from nonebot_plugin_alconna.uniseg import UniMessage
+
+    from nonebot_plugin_parser.parsers import BaseParser
+    from nonebot_plugin_parser.renders import CommonRenderer
+    from nonebot_plugin_parser.download import DOWNLOADER
+    from nonebot_plugin_parser.matchers.rule import PSR_SEARCHED_KEY, KeyPatternList, KeywordRegexRule
+    from nonebot_plugin_parser.download.store import MediaStore
+    from nonebot_plugin_parser.renders.thumbnail import THUMBNAIL_CACHE
+
+    parser_classes = BaseParser.get_all_subclass()
+    rule = KeywordRegexRule(KeyPatternList(*[p for _cls in parser_classes for p in _cls._key_patterns]))
+    parsers = {keyword: _cls for _cls in parser_classes for keyword, _ in _cls._key_patterns}
+
+    # 与 localstore 一致, 缓存目录在解析前已存在
+    await asyncio.to_thread(cache_dir.mkdir, parents=True, exist_ok=True)
+    DOWNLOADER.cache_dir = cache_dir
+    DOWNLOADER.store = MediaStore(cache_dir / "blobs")
+    THUMBNAIL_CACHE.cache_dir = cache_dir / "thumbs"
+    THUMBNAIL_CACHE.clear()
+
+    renderer = CommonRenderer()
+    timer = timers[-1]
+
+    state = {}
+    with timer.stage("match"):
+        matched = await rule(UniMessage.text(cassette.url), state)
+    assert matched, f"无法匹配 {cassette.url}"
+    sr = state[PSR_SEARCHED_KEY]
+    parser = parsers[sr.keyword]()
+
+    with timer.stage("parse"):
+        result = await parser.parse(sr.keyword, sr.searched)
+
+    # 头像, 封面在解析时开始下载, 卡片中的图片在渲染前预取, 视频等在发送前下载, 此阶段为解析结束后剩余的等待时间
+    with timer.stage("download"):
+        renderer.prefetch_card_media(result)
+        await asyncio.gather(*_media_tasks(result))
+
+    try:
+        return await renderer.render_image(result)
+    finally:
+        DOWNLOADER.store.close()
+
+
+def _check_regressions(name: str, current: dict[str, dict[str, float]]) -> list[str]:
+    baseline: dict[str, dict[str, dict[str, float]]] = {}
+    if BASELINE_PATH.exists():
+        baseline = msgspec.json.decode(BASELINE_PATH.read_bytes())
+
+    if UPDATE_BASELINE:
+        baseline[name] = current
+        BASELINE_PATH.write_bytes(msgspec.json.format(msgspec.json.encode(baseline, order="sorted")) + b"\n")
+        return []
+
+    if name not in baseline:
+        logger.warning(f"{name} 没有基准数据, 设置 PARSER_BENCH_UPDATE=1 生成")
+        return []
+
+    regressions: list[str] = []
+    for stage, expected in baseline[name].items():
+        actual = current.get(stage)
+        if actual is None:
+            continue
+        if actual["time"] > expected["time"] * (1 + TOLERANCE) + TIME_SLACK:
+            regressions.append(f"{stage} 耗时 {actual['time'] * 1000:.1f} ms, 基准 {expected['time'] * 1000:.1f} ms")
+        if actual["memory"] > expected["memory"] * (1 + TOLERANCE) + MEMORY_SLACK:
+            regressions.append(
+                f"{stage} 内存峰值 {actual['memory'] / 1024:.0f} KB, 基准 {expected['memory'] / 1024:.0f} KB"
+            )
+    return regressions
+
+
+@pytest.mark.parametrize("name", list(CASSETTES))
+async def test_pipeline_benchmark(name: str, media_server: MediaServer, tmp_path: Path, monkeypatch):
+    from nonebot_plugin_parser.download import DOWNLOADER
+
+    fixture_dir, cassette = CASSETTES[name]
+    if missing := [cmd for cmd in cassette.requires if shutil.which(cmd) is None]:
+        pytest.skip(f"{name} 需要 {', '.join(missing)}")
+    for url, spec in cassette.media.items():
+        media_server.add(url, media_bytes(fixture_dir, spec))
+
+    client = httpx.AsyncClient(transport=StandInTransport(media_server))
+    monkeypatch.setattr(DOWNLOADER, "client", client)
+    monkeypatch.setattr(DOWNLOADER, "cache_dir", DOWNLOADER.cache_dir)
+    monkeypatch.setattr(DOWNLOADER, "store", DOWNLOADER.store)
+
+    from nonebot_plugin_parser.renders.thumbnail import THUMBNAIL_CACHE
+
+    monkeypatch.setattr(THUMBNAIL_CACHE, "cache_dir", THUMBNAIL_CACHE.cache_dir)
+    # bilibili_api 默认使用 curl_cffi, 回放时切换为 httpx 以便 respx 拦截
+    monkeypatch.setattr(network, "selected_client", "httpx")
+
+    samples: dict[str, list[float]] = {stage: [] for stage in STAGES}
+    memory = StageTimer()
+    timers: list[StageTimer] = []
+    _instrument(monkeypatch, timers)
+    with respx.mock(assert_all_called=False) as router:
+        router.route(host="127.0.0.1").pass_through()
+        for interaction in cassette.interactions:
+            router.route(method=interaction.method, url__startswith=interaction.url).mock(
+                return_value=httpx.Response(
+                    interaction.status,
+                    headers=interaction.headers,
+                    content=(fixture_dir / interaction.body).read_bytes() if interaction.body else b"",
+                )
+            )
+
+        # 预热: 加载字体, 建立连接等
+        timers.append(StageTimer())
+        await _run_round(cassette, timers, tmp_path / "warmup")
+
+        for idx in range(ROUNDS):
+            timer = StageTimer()
+            timers.append(timer)
+            raw = await _run_round(cassette, timers, tmp_path / f"round-{idx}")
+            assert raw
+            for stage in STAGES:
+                samples[stage].append(timer.elapsed[stage])
+
+        # 内存统计单独执行一轮, tracemalloc 会显著拖慢计时
+        timers.append(memory)
+        tracemalloc.start()
+        try:
+            await _run_round(cassette, timers, tmp_path / "memory")
+        finally:
+            tracemalloc.stop()
+    await client.aclose()
+
+    current = {
+        stage: {"time": round(statistics.median(samples[stage]), 6), "memory": memory.peak[stage]} for stage in STAGES
+    }
+    lines = [f"| {name} | 阶段 | 耗时(ms) | 内存峰值(KB) |", "| --- | --- | --- | --- |"]
+    lines += [
+        f"| | {stage} | {current[stage]['time'] * 1000:.2f} | {current[stage]['memory'] / 1024:.0f} |"
+        for stage in STAGES
+    ]
+    logger.info("\n" + "\n".join(lines))
+
+    regressions = _check_regressions(name, current)
+    if regressions:
+        pytest.fail(f"{name} 性能回退:\n" + "\n".join(regressions))
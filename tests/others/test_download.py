@@ -1,3 +1,6 @@
+import shutil
+
+import pytest
 from nonebot import logger
 
 
@@ -40,3 +43,361 @@ def test_limited_size_dict():
     for i in range(20, 30):
         limited_size_dict[f"test{i}"] = f"test{i}"
     assert len(limited_size_dict) == 20
+
+
+async def test_media_store_dedup(tmp_path):
+    from nonebot_plugin_parser.download.store import MediaStore
+
+    store = MediaStore(tmp_path / "blobs")
+    content = b"same content"
+
+    first, second = tmp_path / "a.jpg", tmp_path / "b.jpg"
+    for name, dest, url in (("a.part", first, "https://a.com/1.jpg"), ("b.part", second, "https://b.com/1.jpg?x=1")):
+        part = tmp_path / name
+        part.write_bytes(content)
+        await store.adopt(part, dest, url)
+        assert not part.exists()
+
+    assert first.read_bytes() == second.read_bytes() == content
+    assert first.samefile(second)
+    assert len(list(store.root.glob("??/*"))) == 1
+
+    # 已索引的 url 直接链接
+    third = tmp_path / "c.jpg"
+    assert await store.link_url("https://a.com/1.jpg", third)
+    assert third.samefile(first)
+
+    # 仍被引用的 blob 不会被回收
+    first.unlink()
+    await store.collect()
+    assert len(list(store.root.glob("??/*"))) == 1
+
+    second.unlink()
+    third.unlink()
+    await store.collect()
+    assert not list(store.root.glob("??/*"))
+    assert not await store.link_url("https://a.com/1.jpg", first)
+    store.close()
+
+
+async def test_cache_evictor_lru(tmp_path):
+    import os
+    import time
+
+    from nonebot_plugin_parser.download.evict import CacheEvictor
+
+    evictor = CacheEvictor(tmp_path, max_size=250, min_age=60, exclude_dirs=("blobs",))
+    (tmp_path / "blobs").mkdir()
+    (tmp_path / "blobs" / "blob").write_bytes(b"0" * 1000)
+    (tmp_path / "video.mp4.part").write_bytes(b"0" * 1000)
+
+    now = time.time()
+    files = {name: tmp_path / name for name in ("old.jpg", "pinned.jpg", "recent.jpg", "young.jpg")}
+    for offset, path in zip((400, 300, 200, 0), files.values()):
+        path.write_bytes(b"0" * 100)
+        os.utime(path, (now - offset, now - offset))
+
+    # 最近使用过的文件排在淘汰队列后面
+    evictor.touch(files["old.jpg"])
+    with evictor.pin(files["pinned.jpg"]):
+        assert await evictor.evict() == 100
+
+    assert not files["recent.jpg"].exists()
+    assert files["old.jpg"].exists()
+    assert files["pinned.jpg"].exists()
+    assert files["young.jpg"].exists()
+    assert (tmp_path / "blobs" / "blob").exists()
+    assert (tmp_path / "video.mp4.part").exists()
+
+
+async def test_segmented_download(tmp_path, monkeypatch):
+    import os
+
+    from httpx import Request, Response, AsyncClient, MockTransport
+
+    from nonebot_plugin_parser.config import pconfig
+    from nonebot_plugin_parser.download import StreamDownloader
+    from nonebot_plugin_parser.download.store import MediaStore
+
+    content = os.urandom(1000)
+    ranges: list[str] = []
+
+    def handler(request: Request) -> Response:
+        if range_header := request.headers.get("Range"):
+            ranges.append(range_header)
+            start, end = map(int, range_header.removeprefix("bytes=").split("-"))
+            return Response(
+                206,
+                content=content[start : end + 1],
+                headers={"Content-Range": f"bytes {start}-{end}/{len(content)}"},
+            )
+        return Response(200, content=content, headers={"Accept-Ranges": "bytes"})
+
+    monkeypatch.setattr(pconfig, "parser_download_segments", 4)
+    monkeypatch.setattr(pconfig, "parser_download_segment_threshold", 0)
+
+    downloader = StreamDownloader()
+    downloader.cache_dir = tmp_path
+    downloader.store = MediaStore(tmp_path / "blobs")
+    downloader.client = AsyncClient(transport=MockTransport(handler))
+
+    path = await downloader.streamd("https://example.com/video.mp4")
+    assert path.read_bytes() == content
+    assert len(ranges) == 4
+    assert not (tmp_path / f"{path.name}.part").exists()
+
+    await downloader.client.aclose()
+    downloader.store.close()
+
+
+async def test_resume_download(tmp_path):
+    import os
+
+    from httpx import Request, Response, AsyncClient, MockTransport
+
+    from nonebot_plugin_parser.download import StreamDownloader
+    from nonebot_plugin_parser.download.store import MediaStore
+    from nonebot_plugin_parser.download.journal import DownloadJournal
+
+    content = os.urandom(1000)
+    etag = '"v1"'
+    requested: list[str | None] = []
+
+    def handler(request: Request) -> Response:
+        range_header = request.headers.get("Range")
+        requested.append(range_header)
+        if range_header and request.headers.get("If-Range") == etag:
+            start, end = map(int, range_header.removeprefix("bytes=").split("-"))
+            return Response(
+                206,
+                content=content[start : end + 1],
+                headers={"Content-Range": f"bytes {start}-{end}/{len(content)}", "ETag": etag},
+            )
+        return Response(200, content=content, headers={"ETag": etag})
+
+    downloader = StreamDownloader()
+    downloader.cache_dir = tmp_path
+    downloader.store = MediaStore(tmp_path / "blobs")
+    downloader.client = AsyncClient(transport=MockTransport(handler))
+
+    # 模拟上次下载中断, 已完成前 400 字节
+    url = "https://example.com/video.mp4"
+    part_path = tmp_path / "video.mp4.part"
+    part_path.write_bytes(content[:400])
+    journal = DownloadJournal(url=url, size=len(content), etag=etag)
+    journal.mark(0, 399)
+    journal.save(part_path)
+
+    path = await downloader.streamd(url, file_name="video.mp4")
+    assert path.read_bytes() == content
+    assert requested == ["bytes=0-0", "bytes=400-999"]
+    assert not part_path.exists()
+    assert not DownloadJournal.path_of(part_path).exists()
+
+    await downloader.client.aclose()
+    downloader.store.close()
+
+
+def test_download_journal_ranges():
+    from nonebot_plugin_parser.download.journal import DownloadJournal
+
+    journal = DownloadJournal(url="", size=100, etag='"x"')
+    journal.mark(10, 19)
+    journal.mark(20, 29)
+    journal.mark(50, 59)
+    assert journal.completed == [(10, 29), (50, 59)]
+    assert journal.missing() == [(0, 9), (30, 49), (60, 99)]
+    assert journal.done == 30
+
+
+async def test_download_scheduler_priority_and_fairness():
+    import asyncio
+
+    from nonebot_plugin_parser.download.scheduler import DOWNLOAD_SESSION, Priority, DownloadScheduler
+
+    scheduler = DownloadScheduler(max_concurrency=1, host_concurrency=1)
+    order: list[str] = []
+    gate = asyncio.Event()
+
+    async def download(name: str, url: str, priority: Priority, session: str):
+        DOWNLOAD_SESSION.set(session)
+        async with scheduler.slot(url, priority):
+            order.append(name)
+            if name == "first":
+                await gate.wait()
+
+    first = asyncio.create_task(download("first", "https://a.com/0", Priority.MEDIA, "s1"))
+    await asyncio.sleep(0)
+    tasks = [
+        asyncio.create_task(download(name, f"https://a.com/{name}", priority, session))
+        for name, priority, session in (
+            ("video", Priority.MEDIA, "s1"),
+            ("s1-img1", Priority.IMAGE, "s1"),
+            ("s1-img2", Priority.IMAGE, "s1"),
+            ("s2-img1", Priority.IMAGE, "s2"),
+            ("avatar", Priority.CARD, "s2"),
+        )
+    ]
+    await asyncio.sleep(0)
+    gate.set()
+    await asyncio.gather(first, *tasks)
+
+    assert order == ["first", "avatar", "s1-img1", "s2-img1", "s1-img2", "video"]
+
+
+async def test_download_scheduler_host_limit():
+    import asyncio
+
+    from nonebot_plugin_parser.download.scheduler import DownloadScheduler
+
+    scheduler = DownloadScheduler(max_concurrency=4, host_concurrency=2)
+    running: dict[str, int] = {}
+    peak: dict[str, int] = {}
+
+    async def download(url: str):
+        host = url.split("/")[2]
+        async with scheduler.slot(url):
+            running[host] = running.get(host, 0) + 1
+            peak[host] = max(peak.get(host, 0), running[host])
+            await asyncio.sleep(0.01)
+            running[host] -= 1
+
+    await asyncio.gather(*[download(f"https://{host}/{i}") for host in ("a.com", "b.com") for i in range(5)])
+    assert peak == {"a.com": 2, "b.com": 2}
+
+
+async def test_task_owner_refcount():
+    import asyncio
+
+    from nonebot_plugin_parser.download.task import LazyTask, TaskOwner, auto_task
+
+    @auto_task
+    async def download(name: str) -> str:
+        await asyncio.sleep(10)
+        return name
+
+    owner = TaskOwner("test")
+    with owner.collect():
+        task = download("video")
+        lazy = LazyTask(lambda: download("image"), name="image")
+
+    # 内存缓存与处理器同时持有, 处理器释放后任务继续
+    owner.acquire()
+    with owner.hold():
+        pass
+    await asyncio.sleep(0)
+    assert not task.done()
+
+    owner.release()
+    await asyncio.gather(task, return_exceptions=True)
+    assert task.cancelled()
+    # 未开始的延迟任务不再开始
+    await asyncio.gather(lazy, return_exceptions=True)
+    assert lazy.cancelled()
+
+
+async def test_orphaned_download_removes_partial(tmp_path):
+    import asyncio
+
+    from httpx import Request, Response, AsyncClient, MockTransport, AsyncByteStream
+
+    from nonebot_plugin_parser.download import StreamDownloader
+    from nonebot_plugin_parser.download.task import TaskOwner
+    from nonebot_plugin_parser.download.store import MediaStore
+    from nonebot_plugin_parser.download.journal import DownloadJournal
+
+    started = asyncio.Event()
+
+    class SlowStream(AsyncByteStream):
+        async def __aiter__(self):
+            yield b"x" * 1024
+            started.set()
+            await asyncio.sleep(10)
+            yield b"x" * 1024
+
+    def handler(request: Request) -> Response:
+        return Response(200, headers={"Content-Length": "2048"}, stream=SlowStream())
+
+    downloader = StreamDownloader()
+    downloader.cache_dir = tmp_path
+    downloader.store = MediaStore(tmp_path / "blobs")
+    downloader.client = AsyncClient(transport=MockTransport(handler))
+
+    owner = TaskOwner("test")
+    with owner.collect():
+        task = downloader.download_video("https://example.com/video.mp4", video_name="video.mp4")
+    owner.acquire()
+    await started.wait()
+
+    part_path = tmp_path / "video.mp4.part"
+    assert part_path.exists()
+    owner.release()
+    await asyncio.gather(task, return_exceptions=True)
+
+    assert task.cancelled()
+    assert not part_path.exists()
+    assert not DownloadJournal.path_of(part_path).exists()
+
+    await downloader.client.aclose()
+    downloader.store.close()
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="需要 ffmpeg")
+async def test_stream_mux_download(tmp_path, monkeypatch):
+    import asyncio
+    from asyncio.subprocess import PIPE
+
+    from httpx import Request, Response, AsyncClient, MockTransport
+
+    from nonebot_plugin_parser.config import pconfig
+    from nonebot_plugin_parser.download import StreamDownloader
+    from nonebot_plugin_parser.exception import SizeLimitException
+    from nonebot_plugin_parser.download.store import MediaStore
+
+    # 与 B 站 DASH 相同的分片 mp4
+    fragmented = ["-movflags", "frag_keyframe+empty_moov+default_base_moof", "-f", "mp4"]
+    for name, source, codec in (
+        ("v.m4s", "testsrc=duration=2:size=160x120", "libx264"),
+        ("a.m4s", "sine=duration=2", "aac"),
+    ):
+        cmd = ["ffmpeg", "-loglevel", "error", "-y", "-f", "lavfi", "-i", source, "-c", codec, *fragmented]
+        process = await asyncio.create_subprocess_exec(*cmd, str(tmp_path / name))
+        assert await process.wait() == 0
+    streams = {"/v.m4s": (tmp_path / "v.m4s").read_bytes(), "/a.m4s": (tmp_path / "a.m4s").read_bytes()}
+
+    requested: list[str] = []
+
+    def handler(request: Request) -> Response:
+        requested.append(request.url.path)
+        return Response(200, content=streams[request.url.path])
+
+    downloader = StreamDownloader()
+    downloader.cache_dir = tmp_path / "cache"
+    downloader.cache_dir.mkdir()
+    downloader.store = MediaStore(tmp_path / "blobs")
+    downloader.client = AsyncClient(transport=MockTransport(handler))
+    monkeypatch.setattr(pconfig, "parser_stream_mux", True)
+
+    output_path = downloader.cache_dir / "av.mp4"
+    path = await downloader.download_av_and_merge(
+        "https://example.com/v.m4s", "https://example.com/a.m4s", output_path=output_path
+    )
+    process = await asyncio.create_subprocess_exec("ffmpeg", "-hide_banner", "-i", str(path), stderr=PIPE)
+    _, stderr = await process.communicate()
+    probe = stderr.decode()
+    assert "Video: h264" in probe
+    assert "Audio: aac" in probe
+    # 音视频流只请求一次, 不落盘
+    assert sorted(requested) == ["/a.m4s", "/v.m4s"]
+    assert [p.name for p in downloader.cache_dir.iterdir()] == ["av.mp4"]
+
+    # 仍然校验大小限制, 不退回下载后合并
+    monkeypatch.setattr(pconfig, "parser_max_size", 0)
+    with pytest.raises(SizeLimitException):
+        await downloader.download_av_and_merge(
+            "https://example.com/v.m4s", "https://example.com/a.m4s", output_path=downloader.cache_dir / "big.mp4"
+        )
+    assert [p.name for p in downloader.cache_dir.iterdir()] == ["av.mp4"]
+
+    await downloader.client.aclose()
+    downloader.store.close()
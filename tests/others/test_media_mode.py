@@ -32,8 +32,13 @@ async def test_media_mode_image_only_downloads_images(app: App, monkeypatch):
     try:
         images = parser.create_image_contents(["https://example.com/1.jpg", "https://example.com/2.jpg"])
         assert len(images) == 2
+        # 延迟下载, 预取时才开始
+        assert calls["img"] == 0
+        for cont in images:
+            cont.prefetch()
         assert calls["img"] == 2
         assert all(isinstance(cont, ImageContent) for cont in images)
+        assert [await cont.get_path() for cont in images] == [Path("img.jpg")] * 2
 
         video = parser.create_video_content("https://example.com/v.mp4")
         assert video is None
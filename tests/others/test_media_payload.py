@@ -0,0 +1,44 @@
+async def test_media_payload_shared_between_sends(tmp_path, monkeypatch):
+    import asyncio
+    from pathlib import Path
+
+    from nonebot_plugin_alconna.uniseg import Image, Video
+
+    from nonebot_plugin_parser.config import pconfig
+    from nonebot_plugin_parser.helper import MEDIA_PAYLOADS, UniHelper
+
+    monkeypatch.setattr(pconfig, "parser_use_base64", True)
+    monkeypatch.setattr(pconfig, "parser_base64_max_size", 1)
+
+    reads: list[str] = []
+    read_bytes = Path.read_bytes
+
+    def record(path: Path) -> bytes:
+        reads.append(path.name)
+        return read_bytes(path)
+
+    monkeypatch.setattr(Path, "read_bytes", record)
+
+    img_path = tmp_path / "img.jpg"
+    img_path.write_bytes(b"image" * 1024)
+    segs = await asyncio.gather(*[UniHelper.img_seg(img_path) for _ in range(5)])
+
+    # 并发发送只读取一次, 共享同一份内容
+    assert reads == ["img.jpg"]
+    assert all(seg.raw is segs[0].raw for seg in segs)
+    assert isinstance(segs[0], Image)
+
+    # 文件未变化时复用缓存的内容
+    seg = await UniHelper.img_seg(img_path)
+    assert seg.raw is segs[0].raw
+    assert reads == ["img.jpg"]
+
+    # 超过大小限制时使用文件路径发送, 不读取文件
+    video_path = tmp_path / "video.mp4"
+    video_path.write_bytes(b"\0" * (2 * 1024 * 1024))
+    seg = await UniHelper.video_seg(video_path)
+    assert isinstance(seg, Video)
+    assert seg.raw is None
+    assert seg.path == video_path
+    assert reads == ["img.jpg"]
+    assert MEDIA_PAYLOADS._cached_size <= MEDIA_PAYLOADS.max_cached  # pyright: ignore[reportPrivateUsage]
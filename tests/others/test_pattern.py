@@ -38,3 +38,57 @@ def test_pattern_matching():
         for url in failed_urls:
             logger.error(f"- {url}")
         pytest.fail(f"共有 {len(failed_urls)} 个 URL 未能匹配成功，请检查日志。")
+
+
+def test_key_pattern_list_find_keywords():
+    from nonebot_plugin_parser.parsers import BaseParser
+    from nonebot_plugin_parser.matchers.rule import KeyPatternList
+
+    parser_classes = BaseParser.get_all_subclass()
+    key_pattern_list = KeyPatternList(*(p for _cls in parser_classes for p in _cls._key_patterns))
+    keywords = {k for k, _ in key_pattern_list}
+
+    urls_file = Path(__file__).parent / "test_urls.md"
+    with urls_file.open("r", encoding="utf-8") as f:
+        urls = [line.removeprefix("-").strip() for line in f if line.startswith("-")]
+
+    texts = [*urls, "今天天气不错", "BV1xx411c7mD 2", "https://weibo.com/tv/show/1034:1?mid=2 weibo.com/1/a"]
+    for text in texts:
+        # 单次扫描的结果应与逐个关键词 in 判断一致
+        assert key_pattern_list.find_keywords(text) == {k for k in keywords if k in text}, text
+
+
+def test_key_pattern_list_no_keyword_not_slower():
+    import timeit
+
+    from nonebot_plugin_parser.parsers import BaseParser
+    from nonebot_plugin_parser.matchers.rule import KeyPatternList
+
+    parser_classes = BaseParser.get_all_subclass()
+    key_pattern_list = KeyPatternList(*(p for _cls in parser_classes for p in _cls._key_patterns))
+    keywords = [k for k, _ in key_pattern_list]
+
+    # 不含链接的普通聊天消息, 最常见的情况
+    texts = [
+        "今天天气不错啊, 大家晚上一起去吃火锅吧? 我觉得那家店的味道还挺好的, 价格也合适, 顺便可以看看电影",
+        "hello everyone, I think we should meet at the station tomorrow morning around nine, "
+        "bring your umbrella because it might rain a lot; also remember the tickets please ok",
+        "收到, 晚上 8 点见 see you",
+    ]
+    for text in texts:
+        assert not key_pattern_list.find_keywords(text)
+
+    def baseline():
+        for text in texts:
+            for keyword in keywords:
+                if keyword in text:
+                    break
+
+    def single_pass():
+        for text in texts:
+            key_pattern_list.find_keywords(text)
+
+    baseline_time = min(timeit.repeat(baseline, number=2000, repeat=5))
+    single_pass_time = min(timeit.repeat(single_pass, number=2000, repeat=5))
+    logger.info(f"无关键词消息: 逐个 in 判断 {baseline_time:.4f}s, 单次扫描 {single_pass_time:.4f}s")
+    assert single_pass_time <= baseline_time
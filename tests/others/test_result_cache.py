@@ -0,0 +1,171 @@
+from pathlib import Path
+
+
+async def test_result_cache_roundtrip(tmp_path: Path):
+    from nonebot_plugin_parser.parsers import Author, Platform, ParseResult, ImageContent, VideoContent
+    from nonebot_plugin_parser.matchers.cache import ResultCache
+
+    img_path = tmp_path / "img.jpg"
+    img_path.write_bytes(b"img")
+    video_path = tmp_path / "video.mp4"
+    video_path.write_bytes(b"video")
+
+    result = ParseResult(
+        platform=Platform(name="weibo", display_name="微博"),
+        author=Author(name="Tester", avatar=img_path),
+        title="title",
+        text="text",
+        timestamp=1700000000,
+        contents=[ImageContent(img_path), VideoContent(video_path, img_path, 12.0)],
+        extra={"info": "extra"},
+        repost=ParseResult(platform=Platform(name="weibo", display_name="微博"), text="repost"),
+    )
+
+    cache = ResultCache(tmp_path / "result_cache.db")
+    try:
+        await cache.set("key", result)
+
+        cached = await cache.get("key")
+        assert cached is not None
+        assert cached.title == "title"
+        assert cached.author is not None
+        assert cached.author.avatar == img_path
+        assert [type(cont) for cont in cached.contents] == [ImageContent, VideoContent]
+        assert cached.video_contents[0].duration == 12.0
+        assert cached.repost is not None
+        assert cached.repost.text == "repost"
+
+        # 媒体文件被删除后条目失效
+        video_path.unlink()
+        assert await cache.get("key") is None
+    finally:
+        cache.close()
+
+
+async def test_result_cache_keeps_lazy_media_url(tmp_path: Path):
+    from nonebot_plugin_parser.parsers import Platform, ParseResult, VideoContent
+    from nonebot_plugin_parser.download import DOWNLOADER, LazyMedia
+    from nonebot_plugin_parser.matchers.cache import ResultCache
+
+    headers = {"referer": "https://weibo.com/"}
+    result = ParseResult(
+        platform=Platform(name="weibo", display_name="微博"),
+        contents=[VideoContent(DOWNLOADER.lazy("video", "https://example.com/v.mp4", ext_headers=headers))],
+    )
+
+    cache = ResultCache(tmp_path / "result_cache.db")
+    try:
+        # 仅发送卡片时视频未下载, 结果仍可缓存, 命中后按需下载
+        await cache.set("key", result)
+
+        cached = await cache.get("key")
+        assert cached is not None
+        path_task = cached.video_contents[0].path_task
+        assert isinstance(path_task, LazyMedia)
+        assert not path_task.started
+        assert (path_task.kind, path_task.url, path_task.ext_headers) == ("video", "https://example.com/v.mp4", headers)
+    finally:
+        cache.close()
+
+
+async def test_result_cache_lru_eviction(tmp_path: Path):
+    from nonebot_plugin_parser.config import pconfig
+    from nonebot_plugin_parser.parsers import Platform, ParseResult
+    from nonebot_plugin_parser.matchers.cache import ResultCache
+
+    cache = ResultCache(tmp_path / "result_cache.db")
+    old_max_entries = pconfig.parser_result_cache_max_entries
+    pconfig.parser_result_cache_max_entries = 2
+    try:
+        for key in ("a", "b"):
+            await cache.set(key, ParseResult(platform=Platform(name="nga", display_name="NGA"), text=key))
+        # 访问 a, 使 b 成为最久未使用
+        assert await cache.get("a") is not None
+        await cache.set("c", ParseResult(platform=Platform(name="nga", display_name="NGA"), text="c"))
+
+        assert await cache.get("b") is None
+        assert await cache.get("a") is not None
+        assert await cache.get("c") is not None
+    finally:
+        pconfig.parser_result_cache_max_entries = old_max_entries
+        cache.close()
+
+
+async def test_result_cache_platform_ttl(tmp_path: Path):
+    import time
+
+    from nonebot_plugin_parser.config import pconfig
+    from nonebot_plugin_parser.parsers import Platform, ParseResult
+    from nonebot_plugin_parser.constants import PlatformEnum
+    from nonebot_plugin_parser.matchers.cache import ResultCache
+
+    cache = ResultCache(tmp_path / "result_cache.db")
+    old_platform_ttl = pconfig.parser_result_cache_platform_ttl
+    pconfig.parser_result_cache_platform_ttl = {PlatformEnum.WEIBO: 60}
+    try:
+        for name in ("weibo", "nga"):
+            assert await cache.set(name, ParseResult(platform=Platform(name=name, display_name=name), text=name))
+        now = time.time()
+        rows = dict(cache.conn.execute("SELECT key, expires_at FROM results").fetchall())
+        assert now < rows["weibo"] <= now + 60
+        assert rows["nga"] > now + pconfig.parser_result_cache_ttl - 60
+    finally:
+        pconfig.parser_result_cache_platform_ttl = old_platform_ttl
+        cache.close()
+
+
+async def test_result_cache_set_keeps_expiry(tmp_path: Path):
+    from nonebot_plugin_parser.parsers import Platform, ParseResult
+    from nonebot_plugin_parser.matchers.cache import ResultCache
+
+    cache = ResultCache(tmp_path / "result_cache.db")
+    try:
+        platform = Platform(name="nga", display_name="NGA")
+        assert await cache.set("key", ParseResult(platform=platform, text="old"))
+        (expires_at,) = cache.conn.execute("SELECT expires_at FROM results").fetchone()
+
+        # 再次写入只更新内容, 不延长有效期
+        assert await cache.set("key", ParseResult(platform=platform, text="new"))
+        assert cache.conn.execute("SELECT expires_at FROM results").fetchone() == (expires_at,)
+        cached = await cache.get("key")
+        assert cached is not None
+        assert cached.text == "new"
+    finally:
+        cache.close()
+
+
+async def test_concurrent_parses_are_coalesced(monkeypatch):
+    import re
+    import asyncio
+
+    from nonebot_plugin_parser import matchers
+    from nonebot_plugin_parser.parsers import Platform, ParseResult
+    from nonebot_plugin_parser.matchers.rule import SearchResult
+
+    calls = 0
+
+    class FakeParser:
+        async def parse(self, keyword: str, searched: re.Match[str]) -> ParseResult:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return ParseResult(platform=Platform(name="nga", display_name="NGA"), text=searched.group(0))
+
+    async def no_store(key: str):
+        return None
+
+    monkeypatch.setitem(matchers.KEYWORD_PARSER_MAP, "fake.kw", FakeParser())
+    monkeypatch.setattr(matchers._RESULT_STORE, "get", no_store)
+
+    text = "fake.kw/123"
+    searched = re.search(r"fake\.kw/\d+", text)
+    assert searched is not None
+    sr = SearchResult(text=text, keyword="fake.kw", searched=searched)
+
+    results = await asyncio.gather(*(matchers.get_or_parse(text, sr) for _ in range(5)))
+    assert calls == 1
+    assert all(result is results[0] for result in results)
+    # 解析完成后即写入内存缓存
+    assert matchers._RESULT_CACHE.get(text) is results[0]
+    assert text not in matchers._INFLIGHT_PARSES
+    matchers._RESULT_CACHE.pop(text, None)
@@ -20,3 +20,46 @@ async def test_clean_plugin_cache():
     from nonebot_plugin_parser import clean_plugin_cache
 
     await clean_plugin_cache()
+
+
+def test_file_digest_survives_touch(tmp_path, monkeypatch):
+    import hashlib
+
+    from nonebot_plugin_parser.utils import touch_file, file_digest
+
+    path = tmp_path / "media.jpg"
+    path.write_bytes(b"media")
+    digest = file_digest(path)
+
+    calls = 0
+    blake2b = hashlib.blake2b
+
+    def counting(*args, **kwargs):
+        nonlocal calls
+        calls += 1
+        return blake2b(*args, **kwargs)
+
+    monkeypatch.setattr(hashlib, "blake2b", counting)
+    # 淘汰器刷新使用时间后不重新计算哈希
+    touch_file(path)
+    assert file_digest(path) == digest
+    assert calls == 0
+
+
+def test_file_digest_recreated_file(tmp_path):
+    import pytest
+
+    from nonebot_plugin_parser.utils import file_digest
+
+    path = tmp_path / "media.jpg"
+    path.write_bytes(b"old")
+    digest = file_digest(path)
+    inode = path.stat().st_ino
+
+    # 删除后立即创建的文件通常复用同一 inode
+    path.unlink()
+    path.write_bytes(b"new")
+    if path.stat().st_ino != inode:
+        pytest.skip("文件系统未复用 inode")
+    assert path.stat().st_size == 3
+    assert file_digest(path) != digest
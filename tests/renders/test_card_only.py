@@ -1,6 +1,9 @@
 import pytest
 
 class _ExplodingContent:
+    def prefetch(self):
+        pass
+
     async def get_path(self):
         raise AssertionError("render_contents should not be called when parser_card_only=true")
 
@@ -93,3 +96,51 @@ async def test_only_send_card_skips_contents_for_all_renderers(app):
     finally:
         pconfig.parser_card_only = old_card_only
         pconfig.parser_only_send_card = old_only_send_card
+
+
+@pytest.mark.asyncio
+async def test_card_only_downloads_card_media_only(app, tmp_path):
+    import asyncio
+
+    from nonebot_plugin_parser.config import pconfig
+    from nonebot_plugin_parser.renders import CommonRenderer
+    from nonebot_plugin_parser.parsers.data import Platform, ParseResult, ImageContent, VideoContent
+    from nonebot_plugin_parser.download.task import LazyTask
+
+    started: list[str] = []
+
+    def lazy(name: str) -> LazyTask:
+        async def download():
+            return tmp_path / name
+
+        def start():
+            started.append(name)
+            return asyncio.create_task(download())
+
+        return LazyTask(start, name=name)
+
+    class _TestRenderer(CommonRenderer):
+        MAX_IMAGES_DISPLAY = 2
+
+        async def render_image(self, result: ParseResult) -> bytes:
+            return b"\x89PNG\r\n\x1a\n"
+
+    result = ParseResult(
+        platform=Platform(name="dummy", display_name="Dummy"),
+        text="card only",
+        contents=[
+            VideoContent(lazy("video.mp4")),
+            *[ImageContent(lazy(f"{idx}.jpg")) for idx in range(4)],
+        ],
+    )
+
+    old = pconfig.parser_card_only
+    pconfig.parser_card_only = True
+    try:
+        messages = [m async for m in _TestRenderer().render_messages(result)]
+        assert len(messages) == 1
+    finally:
+        pconfig.parser_card_only = old
+
+    # 只下载卡片中绘制的图片, 视频及未显示的图片不下载
+    assert sorted(started) == ["0.jpg", "1.jpg"]
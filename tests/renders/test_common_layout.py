@@ -5,8 +5,8 @@ import pytest
 async def test_common_text_before_images_for_twitter_and_bilibili(tmp_path):
     from PIL import Image as PILImage
 
-    from nonebot_plugin_parser.parsers.data import Author, ImageContent, ParseResult, Platform
-    from nonebot_plugin_parser.renders.common import CommonRenderer, ImageGridSectionData, TextSectionData
+    from nonebot_plugin_parser.parsers.data import Author, Platform, ParseResult, ImageContent
+    from nonebot_plugin_parser.renders.common import CommonRenderer, TextSectionData, ImageGridSectionData
 
     img_path = tmp_path / "img.jpg"
     PILImage.new("RGB", (64, 64), (255, 0, 0)).save(img_path)
@@ -51,3 +51,323 @@ def test_common_wrap_text_does_not_replace_emoji():
     font = renderer.fontset.text
     lines = renderer._wrap_text("🍡", 9999, font)  # pyright: ignore[reportPrivateUsage]
     assert "".join(lines) == "🍡"
+
+
+def test_common_wrap_text_line_breaks():
+    from nonebot_plugin_parser.renders.common import CommonRenderer
+
+    renderer = CommonRenderer()
+    font = renderer.fontset.text
+    family = "👨‍👩‍👧‍👦"
+    text = ("中文English混排，" + family) * 20 + "\n\n结尾。"
+    max_width = font.cjk_width * 10
+    lines = renderer._wrap_text(text, max_width, font)  # pyright: ignore[reportPrivateUsage]
+
+    assert "".join(lines) == text.replace("\n", "")
+    assert lines[-2:] == ["", "结尾。"]
+    for line in lines:
+        assert not line or line[0] not in "，。"
+        # 组合 emoji 不会被拆开
+        assert line.count("\u200d") % 3 == 0
+        # 只有行尾的标点可能超出宽度
+        if family not in line:
+            assert font.get_text_width(line.rstrip("，。")) <= max_width
+
+
+@pytest.mark.asyncio
+async def test_common_slow_avatar_does_not_block_card(tmp_path, monkeypatch):
+    import asyncio
+
+    from PIL import Image as PILImage
+
+    from nonebot_plugin_parser.config import pconfig
+    from nonebot_plugin_parser.parsers.data import Author, Platform, ParseResult, ImageContent
+    from nonebot_plugin_parser.renders.common import CommonRenderer, HeaderSectionData, ImageGridSectionData
+
+    img_path = tmp_path / "img.jpg"
+    PILImage.new("RGB", (64, 64), (255, 0, 0)).save(img_path)
+
+    async def slow_avatar():
+        await asyncio.sleep(10)
+        return img_path
+
+    monkeypatch.setattr(pconfig, "parser_render_avatar_timeout", 0.05)
+    avatar_task = asyncio.create_task(slow_avatar())
+    result = ParseResult(
+        platform=Platform(name="weibo", display_name="微博"),
+        author=Author(name="Tester", avatar=avatar_task),
+        contents=[ImageContent(img_path)],
+    )
+
+    renderer = CommonRenderer()
+    content_width = renderer.DEFAULT_CARD_WIDTH - 2 * renderer.PADDING
+    sections = await asyncio.wait_for(renderer._calculate_sections(result, content_width), 1)  # pyright: ignore[reportPrivateUsage]
+
+    header = next(s for s in sections if isinstance(s, HeaderSectionData))
+    assert header.avatar is None, "avatar should fall back to placeholder"
+    assert any(isinstance(s, ImageGridSectionData) for s in sections)
+    # 超时不取消下载
+    assert not avatar_task.done()
+    avatar_task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_common_render_runs_pil_off_loop(tmp_path, monkeypatch):
+    import threading
+
+    from PIL import Image as PILImage
+
+    from nonebot_plugin_parser.renders import common
+    from nonebot_plugin_parser.parsers.data import Author, Platform, ParseResult, ImageContent
+    from nonebot_plugin_parser.renders.common import CommonRenderer
+
+    img_path = tmp_path / "img.jpg"
+    PILImage.new("RGB", (64, 64), (255, 0, 0)).save(img_path)
+
+    threads: set[str] = set()
+    run_in_render_pool = common.run_in_render_pool
+
+    async def record(func, *args, **kwargs):
+        def wrapped():
+            threads.add(threading.current_thread().name)
+            return func(*args, **kwargs)
+
+        return await run_in_render_pool(wrapped)
+
+    monkeypatch.setattr(common, "run_in_render_pool", record)
+
+    result = ParseResult(
+        platform=Platform(name="weibo", display_name="微博"),
+        author=Author(name="Tester", avatar=img_path),
+        text="hello world",
+        contents=[ImageContent(img_path), ImageContent(img_path)],
+    )
+    raw = await CommonRenderer().render_image(result)
+
+    assert raw
+    assert threads
+    assert all(name.startswith("parser-render") for name in threads)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("card_format", "with_image", "suffix"),
+    [
+        ("auto", True, ".jpg"),
+        ("auto", False, ".png"),
+        ("png", True, ".png"),
+        ("webp", False, ".webp"),
+    ],
+)
+async def test_common_card_format(tmp_path, monkeypatch, card_format: str, with_image: bool, suffix: str):
+    from PIL import Image as PILImage
+
+    from nonebot_plugin_parser.config import pconfig
+    from nonebot_plugin_parser.constants import CardFormat
+    from nonebot_plugin_parser.parsers.data import Author, Platform, ParseResult, ImageContent
+    from nonebot_plugin_parser.renders.base import sniff_image_suffix
+    from nonebot_plugin_parser.renders.common import CommonRenderer
+
+    img_path = tmp_path / "img.jpg"
+    PILImage.new("RGB", (64, 64), (255, 0, 0)).save(img_path)
+
+    monkeypatch.setattr(pconfig, "parser_card_format", CardFormat(card_format))
+    result = ParseResult(
+        platform=Platform(name="weibo", display_name="微博"),
+        author=Author(name="Tester"),
+        text="hello world",
+        contents=[ImageContent(img_path)] if with_image else [],
+    )
+    raw = await CommonRenderer().render_image(result)
+    assert sniff_image_suffix(raw) == suffix
+
+    image_path = await CommonRenderer.save_img(raw)
+    assert image_path.suffix == suffix
+    image_path.unlink()
+
+
+def test_common_large_jpeg_decoded_near_target_size(tmp_path, monkeypatch):
+    from PIL import Image as PILImage
+
+    from nonebot_plugin_parser.renders import common
+    from nonebot_plugin_parser.renders.common import CommonRenderer
+
+    img_path = tmp_path / "large.jpg"
+    PILImage.new("RGB", (4000, 3000), (0, 128, 255)).save(img_path, quality=80)
+
+    drafted: list[tuple[int, int]] = []
+    draft_for = common.draft_for
+
+    def record(img, size):
+        draft_for(img, size)
+        drafted.append(img.size)
+
+    monkeypatch.setattr(common, "draft_for", record)
+
+    renderer = CommonRenderer()
+    content_width = renderer.DEFAULT_CARD_WIDTH - 2 * renderer.PADDING
+    img = renderer._process_grid_image(img_path, content_width, 9)  # pyright: ignore[reportPrivateUsage]
+
+    assert img.width == img.height <= renderer.IMAGE_3_GRID_SIZE
+    # DCT 缩放后解码尺寸远小于原图
+    assert drafted[0][0] <= 1000
+
+
+@pytest.mark.asyncio
+async def test_common_repost_drawn_at_scale(tmp_path, monkeypatch):
+    from PIL import Image as PILImage
+
+    from nonebot_plugin_parser.parsers.data import Author, Platform, ParseResult, ImageContent
+    from nonebot_plugin_parser.renders.common import CommonRenderer, RepostSectionData
+
+    img_path = tmp_path / "img.jpg"
+    PILImage.new("RGB", (1200, 900), (0, 128, 255)).save(img_path)
+
+    renderer = CommonRenderer()
+    repost = ParseResult(
+        platform=Platform(name="weibo", display_name="微博"),
+        author=Author(name="Reposted"),
+        text="原帖内容",
+        contents=[ImageContent(img_path) for _ in range(3)],
+    )
+    result = ParseResult(
+        platform=Platform(name="weibo", display_name="微博"),
+        author=Author(name="Tester"),
+        text="转发",
+        repost=repost,
+    )
+
+    resized: list[tuple[int, int]] = []
+    resize = PILImage.Image.resize
+
+    def record(img, size, *args, **kwargs):
+        resized.append(size)
+        return resize(img, size, *args, **kwargs)
+
+    monkeypatch.setattr(PILImage.Image, "resize", record)
+    content_width = renderer.DEFAULT_CARD_WIDTH - 2 * renderer.PADDING
+    sections = await renderer._calculate_sections(result, content_width)  # pyright: ignore[reportPrivateUsage]
+    repost_section = next(s for s in sections if isinstance(s, RepostSectionData))
+
+    scaled = renderer.scaled(renderer.REPOST_SCALE)
+    assert repost_section.scaled_image.width == scaled.DEFAULT_CARD_WIDTH
+    assert scaled.fontset.text.font.size == round(renderer.fontset.text.font.size * renderer.REPOST_SCALE)
+    # 字体集按比例缓存, 原渲染器不受影响
+    assert renderer.scaled(renderer.REPOST_SCALE).fontset is scaled.fontset
+    assert renderer.PADDING == CommonRenderer.PADDING
+    # 不再整体缩放转发卡片
+    assert repost_section.scaled_image.size not in resized
+
+
+def test_common_thumbnail_cache(tmp_path):
+    from PIL import Image as PILImage
+
+    from nonebot_plugin_parser.renders.thumbnail import ThumbnailCache
+
+    img_path = tmp_path / "avatar.png"
+    PILImage.new("RGB", (400, 400), (255, 0, 0)).save(img_path)
+
+    calls = 0
+
+    def factory():
+        nonlocal calls
+        calls += 1
+        with PILImage.open(img_path) as img:
+            return img.resize((80, 80))
+
+    cache = ThumbnailCache(tmp_path / "thumbs", max_items=8)
+    first = cache.get_or_create(img_path, "avatar", (80, 80), factory)
+    second = cache.get_or_create(img_path, "avatar", (80, 80), factory)
+    assert calls == 1
+    assert first is not None
+    assert second is not None
+    assert first is not second
+    assert second.size == (80, 80)
+
+    # 不同尺寸使用不同的缓存键
+    cache.get_or_create(img_path, "avatar", (40, 40), factory)
+    assert calls == 2
+
+    # 内存缓存清空后从磁盘读取
+    cache.clear()
+    third = cache.get_or_create(img_path, "avatar", (80, 80), factory)
+    assert calls == 2
+    assert third is not None
+    assert third.size == (80, 80)
+
+
+@pytest.mark.asyncio
+async def test_card_cache_reuses_identical_posts(tmp_path, monkeypatch):
+    from PIL import Image as PILImage
+
+    from nonebot_plugin_parser.parsers.data import Author, Platform, ParseResult, ImageContent
+    from nonebot_plugin_parser.renders.base import ImageRenderer
+    from nonebot_plugin_parser.renders.cache import CARD_CACHE
+
+    monkeypatch.setattr(CARD_CACHE, "root", tmp_path / "cards")
+    img_path = tmp_path / "img.jpg"
+    PILImage.new("RGB", (64, 64), (255, 0, 0)).save(img_path)
+
+    calls = 0
+
+    class _CountingRenderer(ImageRenderer):
+        async def render_image(self, result: ParseResult) -> bytes:
+            nonlocal calls
+            calls += 1
+            return img_path.read_bytes()
+
+    def make_result(text: str) -> ParseResult:
+        return ParseResult(
+            platform=Platform(name="weibo", display_name="微博"),
+            author=Author(name="Tester", avatar=img_path),
+            text=text,
+            contents=[ImageContent(img_path)],
+        )
+
+    renderer = _CountingRenderer()
+    first, second = make_result("hello"), make_result("hello")
+    await renderer.cache_or_render_image(first)
+    await renderer.cache_or_render_image(second)
+
+    assert calls == 1
+    assert first.render_image is not None
+    assert first.render_image == second.render_image
+    assert first.render_image.parent == tmp_path / "cards"
+    assert first.render_image.suffix == ".jpg"
+
+    # 内容不同时重新渲染
+    await renderer.cache_or_render_image(make_result("world"))
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_emoji_atlas_offline_bundle(tmp_path):
+    from PIL import Image as PILImage
+    from apilmoji import EmojiCDNSource
+
+    from nonebot_plugin_parser.renders.common import CommonRenderer
+    from nonebot_plugin_parser.renders.emoji_atlas import EmojiAtlas
+
+    bundle = tmp_path / "bundle"
+    bundle.mkdir()
+    PILImage.new("RGBA", (160, 160), (255, 200, 0, 255)).save(bundle / "😀.png")
+
+    source = EmojiCDNSource(cache_dir=tmp_path / "downloads")
+    atlas = EmojiAtlas(tmp_path / "atlas", source, bundle=bundle)
+    await atlas.prefetch(["hello 😀"])
+
+    sprite = atlas.sprite("😀", 22)
+    assert sprite is not None
+    assert sprite.size == (22, 22)
+    assert (tmp_path / "atlas" / "sheet-0.png").exists()
+
+    # 图集持久化, 重新加载后无需离线包
+    reloaded = EmojiAtlas(tmp_path / "atlas", source)
+    assert reloaded.sprite("😀", 22) is not None
+
+    font = CommonRenderer.fontset.text
+    image = PILImage.new("RGB", (200, 60), (255, 255, 255))
+    reloaded.text(image, (0, 0), ["hi 😀"], font.font, fill=font.fill, line_height=font.line_height)
+    # emoji 中心为图集中的颜色
+    center = (int(font.font.getlength("hi ")) + font.font.size // 2, font.line_height // 2)
+    assert image.getpixel(center) == (255, 200, 0)
@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_completion_delivery_sends_ready_media_first(tmp_path, monkeypatch):
+    from nonebot_plugin_alconna.uniseg import Image, Video
+
+    from nonebot_plugin_parser.config import pconfig
+    from nonebot_plugin_parser.constants import DeliveryMode
+    from nonebot_plugin_parser.parsers.data import Platform, ParseResult, ImageContent, VideoContent
+    from nonebot_plugin_parser.renders.default import DefaultRenderer
+
+    video_path = tmp_path / "video.mp4"
+    video_path.write_bytes(b"video")
+    img_paths = [tmp_path / f"{idx}.jpg" for idx in range(3)]
+    for img_path in img_paths:
+        img_path.write_bytes(b"image")
+
+    async def download(path, delay: float):
+        await asyncio.sleep(delay)
+        return path
+
+    monkeypatch.setattr(pconfig, "parser_delivery_mode", DeliveryMode.completion)
+    monkeypatch.setattr(pconfig, "parser_need_forward_contents", False)
+    monkeypatch.setattr(pconfig, "parser_forward_quorum", 2)
+    monkeypatch.setattr(pconfig, "parser_forward_deadline", 10)
+
+    result = ParseResult(
+        platform=Platform(name="weibo", display_name="微博"),
+        contents=[
+            VideoContent(asyncio.create_task(download(video_path, 0.3))),
+            ImageContent(asyncio.create_task(download(img_paths[0], 0.05))),
+            ImageContent(asyncio.create_task(download(img_paths[1], 0.01))),
+            ImageContent(asyncio.create_task(download(img_paths[2], 0.2))),
+        ],
+    )
+
+    messages = [msg async for msg in DefaultRenderer().render_contents(result)]
+
+    # 前两张图片达到数量后立即发送, 不等待视频; 视频下载完成即发送, 剩余图片随后发送
+    assert [msg.has(Video) for msg in messages] == [False, True, False]
+    assert [len(msg[Image]) for msg in messages] == [2, 0, 1]
+    # 批内保持原始顺序
+    assert [str(seg.path) for seg in messages[0][Image]] == [str(img_paths[0]), str(img_paths[1])]
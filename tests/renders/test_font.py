@@ -26,3 +26,28 @@ def test_cjk_width():
             count += 1
     cjk_count = ord("\u9fff") - ord("\u4e00") + 1
     logger.info(f"CJK 字符数: {cjk_count}，不等于 CJK 宽度的字符数: {count}，占比: {count / cjk_count:.2%}")
+
+
+def test_glyph_table_persisted(tmp_path):
+    from PIL import ImageFont
+
+    from nonebot_plugin_parser.renders import CommonRenderer
+    from nonebot_plugin_parser.renders.glyphs import GlyphTable, text_length
+
+    font_path = CommonRenderer.DEFAULT_FONT_PATH
+    font = ImageFont.truetype(font_path, 24)
+
+    table = GlyphTable.load(font, font_path, tmp_path)
+    files = list(tmp_path.glob("*.glyphs"))
+    assert len(files) == 1
+
+    # 再次加载时直接读取已保存的字形表
+    cached = GlyphTable.load(font, font_path, tmp_path)
+    for char in "中A1a,。 ":
+        code = ord(char)
+        assert cached.width(code) == table.width(code) == text_length(font, char)
+        assert cached.covered(code)
+
+    fontset = CommonRenderer.fontset.text
+    assert fontset.glyphs is not None
+    assert fontset.get_char_width_fast("A") == fontset.get_char_width("A")